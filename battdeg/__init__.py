@@ -1,2 +1,14 @@
 from .version import __version__  # noqa
 from .battdeg import * # noqa
+from .cache import SheetCache, default_cache_dir # noqa
+from .store import CellStore # noqa
+from .incremental import cx2_incremental_reader # noqa
+from .fleet import fleet_reader, fleet_specs # noqa
+from .registry import ModelRegistry, model_registry # noqa
+from .matfile import MatCellFile, pl_samples_mat_reader # noqa
+from .summary import cycle_summary, pl_samples_cycle_summary # noqa
+from .training import WindowSequence, sequence_training # noqa
+from .sweep import grid_trials, hyperparameter_sweep, random_trials # noqa
+from .numpy_lstm import NumpyLSTM, export_numpy_model # noqa
+from .synthetic import capacity_fade, synthetic_cx2_frames, synthetic_pl_frames, write_cx2_files, write_pl_files # noqa
+from .instrument import Instrumentation, instrumentation # noqa
@@ -6,7 +6,10 @@ It can also be used to train and test a LSTM model and predict discharge capacit
 using the LSTM model.
 """
 
+from concurrent.futures import ProcessPoolExecutor
 import datetime
+from functools import partial
+import json
 import os
 from os import listdir
 from os.path import isfile, join
@@ -16,13 +19,54 @@ import re
 import pandas as pd
 import numpy as np
 
-from sklearn.model_selection import train_test_split
-from keras.models import Sequential
-from keras.layers import Dense
-from keras.layers import LSTM
-from keras.models import load_model
 
-# @profile
+from .cache import resolve_cache
+from .instrument import instrumentation
+from .registry import model_registry
+
+# Files of a checkpoint of 'model_training': the weights of the last and of
+# the best epochs and the state of the training
+_CHECKPOINT_LAST = 'last.weights.h5'
+_CHECKPOINT_BEST = 'best.weights.h5'
+_CHECKPOINT_STATE = 'training_state.json'
+
+# Matlab datenum of the unix epoch (1970-01-01) and the nanoseconds in a day
+_MATLAB_EPOCH_DATENUM = 719529
+_NS_PER_DAY = 86400 * 10 ** 9
+
+# Columns of the PL csv files and of the CX2/CS2 excel sheets that are needed
+# to stitch the files and calculate the capacities per cycle
+PL_COLUMNS = ['Time_sec', 'Cycle', 'Current_Amp', 'Voltage_Volt',
+              'Charge_Ah', 'Discharge_Ah']
+CX2_COLUMNS = ['Test_Time(s)', 'Cycle_Index', 'Current(A)', 'Voltage(V)',
+               'Charge_Capacity(Ah)', 'Discharge_Capacity(Ah)']
+
+# Cumulative columns which continue from one file to the next
+_PL_OFFSET_COLUMNS = ['Cycle', 'Time_sec', 'Charge_Ah', 'Discharge_Ah']
+_CX2_OFFSET_COLUMNS = ['Cycle_Index', 'Test_Time(s)', 'Charge_Capacity(Ah)',
+                       'Discharge_Capacity(Ah)']
+
+# Compact dtypes used for the columns when only some columns are read.
+# The cumulative time and capacities stay float64, as the per cycle values
+# are obtained from differences of these large cumulative values.
+COMPACT_DTYPES = {
+    'Cycle': np.int32, 'Step': np.int32,
+    'Current_Amp': np.float32, 'Voltage_Volt': np.float32,
+    'Time_sec': np.float64,
+    'Charge_Ah': np.float64, 'Discharge_Ah': np.float64,
+    'Data_Point': np.int32, 'Cycle_Index': np.int32, 'Step_Index': np.int32,
+    'Current(A)': np.float32, 'Voltage(V)': np.float32,
+    'Test_Time(s)': np.float64, 'Step_Time(s)': np.float64,
+    'Charge_Capacity(Ah)': np.float64, 'Discharge_Capacity(Ah)': np.float64,
+    'Charge_Energy(Wh)': np.float64, 'Discharge_Energy(Wh)': np.float64}
+
+# Float columns kept in float64 by 'compact_dtypes': the cumulative values
+# and the matlab datenums lose too much precision in float32
+_WIDE_COLUMNS = {'Time_sec', 'Date_Time', 'Charge_Ah', 'Discharge_Ah',
+                 'Test_Time(s)', 'Charge_Capacity(Ah)', 'Discharge_Capacity(Ah)',
+                 'Charge_Energy(Wh)', 'Discharge_Energy(Wh)'}
+
+
 def date_time_converter(date_time_list):
     """
     This function gets the numpy array with date_time in matlab format
@@ -47,10 +91,133 @@ def date_time_converter(date_time_list):
 
     return date_time_human
 
-# @profile
+
+def datenum_to_datetime64(datenums):
+    """
+    This function converts date_time in matlab datenum format into numpy
+    datetime64[ns] values. The conversion is done on the whole array at once,
+    unlike 'date_time_converter' which builds one datetime object per value.
+
+    Args:
+        datenums (numpy.ndarray, pandas.Series or list): Matlab datenums, i.e.
+        days (with fraction) since the year 0. NaN values are converted to NaT.
+
+    Returns:
+        A numpy array of dtype datetime64[ns] with the same shape as the input.
+    """
+
+    if isinstance(datenums, (str, bytes)) or np.ndim(datenums) == 0:
+        raise TypeError("datenums should be a numpy array, series or list")
+
+    datenums = np.asarray(datenums, dtype=np.float64)
+
+    # Split the whole days from the fraction of the day so that the precision
+    # of the day fraction is not lost in the large day count
+    days = np.floor(datenums)
+    fraction = datenums - days
+    missing = np.isnan(datenums)
+    days[missing] = _MATLAB_EPOCH_DATENUM
+    fraction[missing] = 0
+
+    nanoseconds = ((days - _MATLAB_EPOCH_DATENUM).astype(np.int64) * _NS_PER_DAY +
+                   np.round(fraction * _NS_PER_DAY).astype(np.int64))
+
+    date_time = nanoseconds.view('datetime64[ns]')
+    date_time[missing] = np.datetime64('NaT')
+    return date_time
+
+
+def _map_files(parse, file_paths, workers=None):
+    """
+    This function applies the parsing function to every file path and returns
+    the parsed values in the same order as the file paths. When more than one
+    worker is requested the files are parsed concurrently in a process pool.
+    """
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        raise TypeError('workers should be a positive integer')
+
+    if workers is None or workers == 1 or len(file_paths) < 2:
+        return [parse(file_path) for file_path in file_paths]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(file_paths))) as pool:
+        return list(pool.map(parse, file_paths))
+
+
+def compact_dtypes(df_data):
+    """
+    This function converts the columns of a dataframe to compact dtypes: the
+    integer columns, like the cycle and step indices, to the smallest integer
+    type holding their values and the float columns to float32, except the
+    cumulative columns and the datenums which stay float64. Columns of other
+    dtypes are not changed.
+
+    Args:
+        df_data (pandas.DataFrame): Dataframe to convert.
+
+    Returns:
+        A new dataframe with the compact dtypes.
+    """
+    if not isinstance(df_data, pd.DataFrame):
+        raise TypeError('df_data is not of type pandas dataframe')
+
+    dtypes = {}
+    for col, dtype in df_data.dtypes.items():
+        if np.issubdtype(dtype, np.integer) and len(df_data):
+            values = df_data[col].values
+            dtypes[col] = _smallest_int_dtype(values.min(), values.max())
+        elif np.issubdtype(dtype, np.floating) and col not in _WIDE_COLUMNS:
+            dtypes[col] = np.float32
+    return df_data.astype(dtypes, copy=False)
+
+
+def _smallest_int_dtype(min_value, max_value):
+    # Signed types, so that differences of indices do not wrap around
+    for dtype in (np.int8, np.int16, np.int32):
+        if np.iinfo(dtype).min <= min_value and max_value <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _projection(usecols, required=None, compact=False):
+    """
+    This function returns the keyword arguments for the pandas readers to only
+    parse the columns in 'usecols' (together with the 'required' columns),
+    with the compact dtypes if 'compact' is True. An empty dictionary is
+    returned if 'usecols' is None, so that every column is read.
+    """
+    if usecols is None:
+        return {}
+
+    if not isinstance(usecols, (list, tuple, set)) or \
+            not all(isinstance(col, str) for col in usecols):
+        raise TypeError('usecols should be a list of column names')
+
+    columns = list(usecols) + [col for col in required or []
+                               if col not in usecols]
+    if not compact:
+        return {'usecols': columns}
+    dtype = {col: COMPACT_DTYPES[col] for col in columns
+             if col in COMPACT_DTYPES}
+    return {'usecols': columns, 'dtype': dtype}
 
 
-def get_dict_files(data_dir, file_name_format, ignore_file_indices):
+def _read_csv(file_path, **kwargs):
+    """
+    This function reads a csv file with pandas. When the compact dtypes can
+    not be applied, e.g. to a cycle column with blank cells, the file is read
+    again with the dtypes inferred by pandas.
+    """
+    try:
+        return pd.read_csv(file_path, **kwargs)
+    except ValueError:
+        if not kwargs.get('dtype'):
+            raise
+        kwargs.pop('dtype')
+        return pd.read_csv(file_path, **kwargs)
+
+
+def get_dict_files(data_dir, file_name_format, ignore_file_indices,
+                   workers=None, usecols=None, compact=False):
     """
     This function finds all the files at the location of the file name
     format as specified and then creates a dictionary after ignoring the
@@ -62,19 +229,53 @@ def get_dict_files(data_dir, file_name_format, ignore_file_indices):
         files.
         ignore_file_indices (list, int): This list of ints tells
         which to ignore.
+        workers (int): Number of processes used to parse the files
+        concurrently. None or 1 parse the files one after another.
+        usecols (list, string): Names of the columns to read. None reads every
+        column.
+        compact (bool): Whether to parse the columns in 'usecols' with the
+        compact dtypes of 'COMPACT_DTYPES'.
 
     Returns:
         The dictionary with all data from files dataframes.
     """
 
+    # Get the numbers and paths of the files to keep in ascending order
+    with instrumentation.stage('listing'):
+        wanted_keys, file_paths = _pl_file_paths(
+            data_dir, file_name_format, ignore_file_indices)
+
+    # Only the files which are kept are parsed
+    with instrumentation.stage('parsing') as stage:
+        dataframes = _map_files(
+            partial(_read_csv, **_projection(usecols, compact=compact)),
+            file_paths, workers)
+        stage.rows = sum(len(df) for df in dataframes)
+
+    # Give a value of dataframe to each key in ascending order
+    dict_ord_cycling_data = dict(zip(wanted_keys, dataframes))
+
+    return dict_ord_cycling_data
+
+
+def _pl_file_paths(data_dir, file_name_format, ignore_file_indices):
+    """
+    This function finds the numbered files of the experiment named in the
+    file name format, e.g. 'PL12(1).csv', 'PL12(2).csv', ...
+
+    Returns:
+        The numbers of the files which are not ignored, in ascending order,
+        and the list of the corresponding file paths.
+    """
+
     # get the list of files in the directory
     onlyfiles = [f for f in listdir(data_dir) if isfile(join(data_dir, f))]
 
     # Extract the experiment name from the file_name_format
     exp_name = file_name_format[0:4]
 
-    # Empty dictionary to hold all the dataframe for various files
-    dict_files = {}
+    # Empty dictionary to hold the file name for various file numbers
+    dict_file_names = {}
 
     # Iterate over all the files of certain type and get the file number from
     # them
@@ -84,27 +285,17 @@ def get_dict_files(data_dir, file_name_format, ignore_file_indices):
             file_number = re.search(
                 exp_name + r'\((.+?)\).csv',
                 filename).group(1)
-            # Give a value of dataframe to each key
-            dict_files[int(file_number)] = pd.read_csv(
-                join(data_dir, filename))
-
-    # Empty dictionary to hold the ordered dictionaries
-    dict_ordered = {}
-    # Sort the dictionary based on keys
-    for key in sorted(dict_files.keys()):
-        dict_ordered[key] = dict_files[key]
+            dict_file_names[int(file_number)] = filename
 
     # Keys with files to keep, remove the ignore indices from all keys
     wanted_keys = np.array(
-        list(set(dict_ordered.keys()) - set(ignore_file_indices)))
+        sorted(set(dict_file_names.keys()) - set(ignore_file_indices)))
 
-    # Remove the ignored dataframes for characterization
-    dict_ord_cycling_data = {k: dict_ordered[k] for k in wanted_keys}
-
-    return dict_ord_cycling_data
+    file_paths = [join(data_dir, dict_file_names[k]) for k in wanted_keys]
+    return wanted_keys, file_paths
 
 
-def concat_dict_dataframes(dict_ord_cycling_data):
+def concat_dict_dataframes(dict_ord_cycling_data, compact=False):
     """
     This function takes in a dictionary with ordered keys
     and concatenates the dataframes in the values of the
@@ -113,6 +304,7 @@ def concat_dict_dataframes(dict_ord_cycling_data):
     Args:
         dict_ord_cycling_data (dict):
             The dictionary with ordered integer keys and dataframes as values
+        compact (bool): Whether to convert the columns with 'compact_dtypes'.
 
     Returns:
         The dataframe after concatenation
@@ -148,29 +340,66 @@ def concat_dict_dataframes(dict_ord_cycling_data):
                             ", 'Charge_Ah', 'Discharge_Ah', " +
                             "'Time_sec', 'Voltage_Volt', 'Current_Amp' ")
 
-    # Concatenate the dataframes to create the total dataframe
-    df_out = None
-    for k in dict_ord_cycling_data.keys():
-        if df_out is None:
-            df_next = dict_ord_cycling_data[k]
-            df_out = pd.DataFrame(data=None, columns=df_next.columns)
-            df_out = pd.concat([df_out, df_next])
-        else:
-            df_next = dict_ord_cycling_data[k]
-            df_next['Cycle'] = np.array(
-                df_next['Cycle']) + max(np.array(df_out['Cycle']))
-            df_next['Time_sec'] = np.array(
-                df_next['Time_sec']) + max(np.array(df_out['Time_sec']))
-            df_next['Charge_Ah'] = np.array(
-                df_next['Charge_Ah']) + max(np.array(df_out['Charge_Ah']))
-            df_next['Discharge_Ah'] = np.array(
-                df_next['Discharge_Ah']) + max(np.array(df_out['Discharge_Ah']))
-            df_out = pd.concat([df_out, df_next])
+    # Nothing to concatenate
+    if not dict_ord_cycling_data:
+        return None
+
+    # Offset the cumulative columns of every file by the running maxima of
+    # the previous files and concatenate the dataframes only once
+    chunks, _ = _stitch_dataframes(
+        dict_ord_cycling_data.values(), _PL_OFFSET_COLUMNS)
+    df_out = pd.concat(chunks)
+
+    if compact:
+        df_out = compact_dtypes(df_out)
 
     return df_out
 
 
-def get_cycle_capacities(df_out):
+def _stitch_dataframes(dataframes, offset_columns, offsets=None):
+    """
+    This function shifts the cumulative columns of consecutive dataframes
+    so that each dataframe continues where the previous ones stopped.
+
+    Args:
+        dataframes (iterable): Dataframes in chronological order.
+        offset_columns (list): Names of the cumulative columns.
+        offsets (dict): Maxima of the cumulative columns of the data preceding
+        the first dataframe, if any.
+
+    Returns:
+        The list of shifted dataframes, ready to be concatenated, and the
+        dictionary of running maxima of the cumulative columns after the last
+        dataframe. The input dataframes are not modified.
+    """
+    offsets = dict(offsets) if offsets else {}
+    chunks = []
+    for df_next in dataframes:
+        if offsets:
+            # 'assign' returns a new dataframe, so the caller's data is untouched
+            df_next = df_next.assign(**{
+                col: np.array(df_next[col]) + offsets[col]
+                for col in offset_columns})
+        chunks.append(df_next)
+        # Only the maximum of the new data is needed to update the offsets
+        _update_maxima(offsets, df_next, offset_columns)
+    return chunks, offsets
+
+
+def _update_maxima(maxima, df_next, columns):
+    """
+    This function updates, in place, the dictionary of running maxima of the
+    columns with the values of a new dataframe, ignoring missing values.
+    """
+    for col in columns:
+        col_max = df_next[col].max()
+        if col not in maxima or pd.isnull(maxima[col]):
+            maxima[col] = col_max
+        elif not pd.isnull(col_max):
+            maxima[col] = max(maxima[col], col_max)
+
+
+def get_cycle_capacities(df_out, compact=False):
     """
     This function takes the dataframe, creates a new index and then calculates
     capacities per cycle from cumulative charge and discharge capacities
@@ -178,6 +407,7 @@ def get_cycle_capacities(df_out):
     Args:
         df_out (pandas.DataFrame):
             Concatenated dataframe
+        compact (bool): Whether to store the capacities per cycle as float32.
 
     Returns:
         the dataframe with capacities per cycle
@@ -194,37 +424,19 @@ def get_cycle_capacities(df_out):
     # Reset the index and drop the old index
     df_out_indexed = df_out.reset_index(drop=True)
 
-    # Proceed further with correcting the capacity
-    df_grouped = df_out_indexed.groupby(['Cycle']).count()
-
-    # Get the indices when a cycle starts
-    cycle_start_indices = df_grouped['Time_sec'].cumsum()
-
-    # Get the charge_Ah per cycle
-    # Create numpy array to store the old charge_Ah row, and then
-    # perform transformation on it, rather than in the pandas series
-    # this is a lot faster in this case
-    charge_cycle_ah = np.array(df_out_indexed['Charge_Ah'])
-    charge_ah = np.array(df_out_indexed['Charge_Ah'])
+    # Get the charge_Ah and discharge_Ah per cycle from the cumulative values
+    charge_cycle_ah, discharge_cycle_ah, capacity_ah = per_cycle_capacities(
+        df_out_indexed['Cycle'].values,
+        df_out_indexed['Charge_Ah'].values,
+        df_out_indexed['Discharge_Ah'].values)
 
-    for i in range(1, len(cycle_start_indices)):
-        begin_value = cycle_start_indices.iloc[i - 1]
-        end_value = cycle_start_indices.iloc[i]
-        charge_cycle_ah[begin_value:end_value] = charge_ah[begin_value:end_value] - \
-            charge_ah[begin_value - 1]
+    if compact:
+        # The differences are taken in float64 before being narrowed
+        charge_cycle_ah, discharge_cycle_ah, capacity_ah = [
+            values.astype(np.float32) for values in
+            (charge_cycle_ah, discharge_cycle_ah, capacity_ah)]
 
     df_out_indexed['charge_cycle_ah'] = charge_cycle_ah
-
-    # Get the discharge_Ah per cycle
-    discharge_cycle_ah = np.array(df_out_indexed['Discharge_Ah'])
-    discharge_ah = np.array(df_out_indexed['Discharge_Ah'])
-
-    for i in range(1, len(cycle_start_indices)):
-        begin_value = cycle_start_indices.iloc[i - 1]
-        end_value = cycle_start_indices.iloc[i]
-        discharge_cycle_ah[begin_value:end_value] = discharge_ah[begin_value:end_value] - \
-            discharge_ah[begin_value - 1]
-
     df_out_indexed['discharge_cycle_ah'] = discharge_cycle_ah
 
     # This is the data column we can use for prediction.
@@ -232,29 +444,17 @@ def get_cycle_capacities(df_out):
     # due to incorrect discharge_Ah values every few cycles.
     # But the machine learning algorithm should consider these as outliers and
     # hopefully get over it. We can come back and correct this.
-    df_out_indexed['capacity_ah'] = charge_cycle_ah - discharge_cycle_ah
+    df_out_indexed['capacity_ah'] = capacity_ah
     df_out_indexed.rename(columns={'Current_Amp':'Current(A)','Voltage_Volt':'Voltage(V)'},
                           inplace=True)
     return df_out_indexed
 
-# @profile
-
-
-def pl_samples_file_reader(data_dir, file_name_format, ignore_file_indices):
+def _check_pl_samples_inputs(data_dir, file_name_format, ignore_file_indices):
     """
-    This function reads in the data for PL Samples experiment and returns a
-    nice dataframe with cycles in ascending order.
-
-    Args:
-        data_dir (string): This is the absolute path to the data directory.
-        file_name_format (string): Format of the filename, used to deduce other files.
-        ignore_file_indices (list, int): This list of ints tells which to ignore.
-
-    Returns:
-        The complete test data in a dataframe with extra column for capacity in Ah.
+    This function raises an exception if the inputs of the PL samples readers
+    are not of the correct type or the file is not found.
     """
 
-    # Raise an exception if the type of the inputs is not correct
     if not isinstance(data_dir, str):
         raise TypeError('data_dir is not of type string')
 
@@ -273,31 +473,218 @@ def pl_samples_file_reader(data_dir, file_name_format, ignore_file_indices):
         raise FileNotFoundError("File {} not found in the location {}"
                                 .format(file_name_format, data_dir))
 
-    dict_ord_cycling_data = get_dict_files(
-        data_dir, file_name_format, ignore_file_indices)
 
-    df_out = concat_dict_dataframes(dict_ord_cycling_data)
+def pl_samples_file_reader(data_dir, file_name_format, ignore_file_indices,
+                           workers=None, date_time=False, usecols=None,
+                           compact=False):
+    """
+    This function reads in the data for PL Samples experiment and returns a
+    nice dataframe with cycles in ascending order.
 
-    ####
-    # This has been commented out for performance, as we do not need date_time
-    ####
-    # Convert the Date_Time from matlab datenum to human readable Date_Time
-    # First convert the series into a numpy array
-    # date_time_matlab = df_out['Date_Time'].tolist()
+    Args:
+        data_dir (string): This is the absolute path to the data directory.
+        file_name_format (string): Format of the filename, used to deduce other files.
+        ignore_file_indices (list, int): This list of ints tells which to ignore.
+        workers (int): Number of processes used to parse the files
+        concurrently. None or 1 parse the files one after another.
+        date_time (bool): Whether to add the column 'Date_Time_new' with the
+        matlab datenums of 'Date_Time' converted to timestamps.
+        usecols (list, string): Names of the columns to read from the files in
+        addition to the columns in 'PL_COLUMNS'. None reads every column.
+        compact (bool): Whether to return the columns with the compact dtypes
+        of 'compact_dtypes', which roughly halves the memory used.
 
-    # # Apply the conversion to the numpy array
-    # df_out['Date_Time_new'] =  date_time_converter(date_time_matlab)
+    Returns:
+        The complete test data in a dataframe with extra column for capacity in Ah.
+    """
 
-    # Get the cycle capacities from cumulative capacities
-    df_out_indexed = get_cycle_capacities(df_out)
+    # Raise an exception if the type of the inputs is not correct
+    _check_pl_samples_inputs(data_dir, file_name_format, ignore_file_indices)
+
+    if usecols is not None:
+        usecols = _projection(
+            usecols, PL_COLUMNS + (['Date_Time'] if date_time else []))['usecols']
+
+    with instrumentation.stage('pl_samples_file_reader') as reader_stage:
+        dict_ord_cycling_data = get_dict_files(
+            data_dir, file_name_format, ignore_file_indices, workers=workers,
+            usecols=usecols, compact=compact)
+
+        with instrumentation.stage('stitching') as stage:
+            df_out = concat_dict_dataframes(dict_ord_cycling_data,
+                                            compact=compact)
+
+            # Convert the Date_Time from matlab datenum to human readable
+            # Date_Time only when asked for, as most users do not need it
+            if date_time:
+                df_out['Date_Time_new'] = datenum_to_datetime64(
+                    df_out['Date_Time'].values)
+            stage.rows = len(df_out)
+
+        # Get the cycle capacities from cumulative capacities
+        with instrumentation.stage('capacity', rows=len(df_out)):
+            df_out_indexed = get_cycle_capacities(df_out, compact=compact)
+        reader_stage.rows = len(df_out_indexed)
 
     return df_out_indexed
 
+def pl_samples_file_stream(data_dir, file_name_format, ignore_file_indices,
+                           chunksize=100000, by_cycle=False, date_time=False,
+                           usecols=None):
+    """
+    This function reads in the data for PL Samples experiment chunk by chunk,
+    so that the memory used does not depend on the size of the data. The
+    chunks are stitched and corrected in the same way as in
+    'pl_samples_file_reader', i.e. concatenating all the chunks gives the
+    same dataframe.
+
+    Args:
+        data_dir (string): This is the absolute path to the data directory.
+        file_name_format (string): Format of the filename, used to deduce other files.
+        ignore_file_indices (list, int): This list of ints tells which to ignore.
+        chunksize (int): Number of rows read from the files at a time.
+        by_cycle (bool): Whether to yield one dataframe per cycle instead of
+        one dataframe per chunk of rows.
+        date_time (bool): Whether to add the column 'Date_Time_new' with the
+        matlab datenums of 'Date_Time' converted to timestamps.
+        usecols (list, string): Names of the columns to read from the files in
+        addition to the columns in 'PL_COLUMNS'. None reads every column.
+
+    Returns:
+        A generator of dataframes with the cumulative values continued across
+        the files and the extra columns for capacity in Ah.
+    """
+
+    # Raise an exception if the type of the inputs is not correct
+    _check_pl_samples_inputs(data_dir, file_name_format, ignore_file_indices)
+
+    if not isinstance(chunksize, int) or chunksize < 1:
+        raise TypeError('chunksize should be a positive integer')
+
+    if usecols is not None:
+        usecols = _projection(
+            usecols, PL_COLUMNS + (['Date_Time'] if date_time else []))['usecols']
+
+    _, file_paths = _pl_file_paths(
+        data_dir, file_name_format, ignore_file_indices)
+
+    chunks = _pl_samples_chunks(file_paths, chunksize, date_time, usecols)
+    if by_cycle:
+        return _split_cycles(chunks, 'Cycle')
+    return chunks
+
+
+def _pl_samples_chunks(file_paths, chunksize, date_time, usecols):
+    """
+    This generator reads the files chunk by chunk, continues the cumulative
+    columns across the files and calculates the capacities per cycle, carrying
+    the state needed for both across the chunk and file boundaries.
+    """
+    offset_columns = _PL_OFFSET_COLUMNS
+    # Offsets applied to the current file and running maxima of the data read
+    offsets, running_max = {}, {}
+    carry = None
+    first_row = 0
+
+    for file_path in file_paths:
+        for df_chunk in pd.read_csv(file_path, chunksize=chunksize,
+                                    **_projection(usecols)):
+            chunks, _ = _stitch_dataframes([df_chunk], offset_columns, offsets)
+            df_chunk = chunks[0]
+            _update_maxima(running_max, df_chunk, offset_columns)
+            df_chunk.index = pd.RangeIndex(first_row, first_row + len(df_chunk))
+            first_row += len(df_chunk)
+
+            if date_time:
+                df_chunk['Date_Time_new'] = datenum_to_datetime64(
+                    df_chunk['Date_Time'].values)
+
+            charge_cycle_ah, discharge_cycle_ah, carry = _carried_capacities(
+                df_chunk['Cycle'].values, df_chunk['Charge_Ah'].values,
+                df_chunk['Discharge_Ah'].values, carry)
+            df_chunk['charge_cycle_ah'] = charge_cycle_ah
+            df_chunk['discharge_cycle_ah'] = discharge_cycle_ah
+            df_chunk['capacity_ah'] = charge_cycle_ah - discharge_cycle_ah
+            df_chunk.rename(columns={'Current_Amp': 'Current(A)',
+                                     'Voltage_Volt': 'Voltage(V)'},
+                            inplace=True)
+            yield df_chunk
+
+        # The next file continues from the maxima of all the data so far
+        offsets = dict(running_max)
+
+
+def _carried_capacities(cycle_index, charge_ah, discharge_ah, carry=None):
+    """
+    This function calculates the capacities per cycle of a chunk of data,
+    when the chunk may start in the middle of a cycle.
+
+    Args:
+        cycle_index, charge_ah, discharge_ah (array): Data of the chunk.
+        carry (tuple): State returned for the previous chunk, None for the
+        first chunk.
+
+    Returns:
+        charge_cycle_ah(array), discharge_cycle_ah(array) and the state to pass
+        with the next chunk: the last cycle number, the last cumulative
+        charge and discharge and the baselines of the last cycle.
+    """
+    charge_cycle_ah, discharge_cycle_ah, _ = per_cycle_capacities(
+        cycle_index, charge_ah, discharge_ah)
+    if len(cycle_index) == 0:
+        return charge_cycle_ah, discharge_cycle_ah, carry
+
+    starts = cycle_start_indices(cycle_index)
+    charge_base = discharge_base = 0
+    if carry is not None:
+        last_cycle, last_charge, last_discharge, cycle_charge_base, \
+            cycle_discharge_base = carry
+        if cycle_index[0] == last_cycle:
+            # The chunk continues the cycle of the previous chunk
+            charge_base, discharge_base = cycle_charge_base, cycle_discharge_base
+        else:
+            # A new cycle starts with the chunk
+            charge_base, discharge_base = last_charge, last_discharge
+        first_end = starts[1] if len(starts) > 1 else len(cycle_index)
+        charge_cycle_ah[:first_end] -= charge_base
+        discharge_cycle_ah[:first_end] -= discharge_base
+
+    # Baselines of the last cycle of the chunk, which may go on in the next one
+    if len(starts) > 1:
+        charge_base = charge_ah[starts[-1] - 1]
+        discharge_base = discharge_ah[starts[-1] - 1]
+
+    carry = (cycle_index[-1], charge_ah[-1], discharge_ah[-1],
+             charge_base, discharge_base)
+    return charge_cycle_ah, discharge_cycle_ah, carry
+
+
+def _split_cycles(chunks, cycle_column):
+    """
+    This generator regroups a generator of dataframes into one dataframe
+    per cycle, holding back the last cycle of a chunk until it is complete.
+    """
+    pending = None
+    for df_chunk in chunks:
+        if pending is not None:
+            df_chunk = pd.concat([pending, df_chunk])
+        starts = cycle_start_indices(df_chunk[cycle_column].values)
+        if len(starts) == 0:
+            continue
+        for begin_value, end_value in zip(starts[:-1], starts[1:]):
+            yield df_chunk.iloc[begin_value:end_value]
+        pending = df_chunk.iloc[starts[-1]:]
+    if pending is not None:
+        yield pending
+
 # Wrapping function to train the LSTM model and calculate model_loss,
 # and response to the testing data set.
 
 
-def model_training(data_dir, file_name_format, sheet_name):
+def model_training(data_dir, file_name_format, sheet_name, cache=None,
+                   workers=None, n_in=1, n_out=1, epochs=50, patience=None,
+                   checkpoint_dir=None, checkpoint_every=1, resume=True,
+                   return_model=False):
     """
     This function converts cumulative battery cycling data into individual cycle data
     and trains the LSTM model with the converted data set.
@@ -307,10 +694,32 @@ def model_training(data_dir, file_name_format, sheet_name):
         file_name_format (string): Format of the filename, used to deduce other files.
         sheet_name(string or int): Sheet name or sheet number in the excel file containing
         the relevant data.
+        cache (None, bool, string or SheetCache): On-disk cache for the parsed
+        excel sheets, see 'cx2_file_reader'.
+        workers (int): Number of processes used to parse the excel files
+        concurrently, see 'cx2_file_reader'.
+        n_in (int): Number of lag observations used as input of the model.
+        n_out (int): Number of future discharge capacities predicted.
+        epochs (int): Maximum number of epochs of training.
+        patience (int): Number of epochs without improvement of the validation
+        loss after which the training stops. None trains for all the epochs.
+        checkpoint_dir (string): Directory where the weights of the last and
+        of the best epochs and the training state are saved, see
+        'checkpoint_every'. None saves nothing.
+        checkpoint_every (int): Number of epochs between two checkpoints of
+        the last weights. The best weights are saved whenever they improve.
+        resume (bool): Whether to resume the training from the last
+        checkpoint in 'checkpoint_dir', if there is one. The optimizer state
+        is not saved and starts again from the checkpoint.
+        return_model (bool): Whether to return the model as well.
 
     Returns:
         model_loss(dictionary): Returns the history dictionary (more info to be added)
         y_hat(array): Predicted response for the testing dataset.
+        model: The trained model, only if 'return_model' is True. When
+        'patience' or 'checkpoint_dir' is given, the model has the weights of
+        the epoch with the lowest validation loss, which are also used for
+        'y_hat' and saved to 'best.weights.h5' in 'checkpoint_dir'.
         # y_prediction(array): Predicted response for the completely new dataset
         # (The input has to be the time series cycling data including values of
         #  Current, Voltage and Discharge Capacity)
@@ -318,27 +727,40 @@ def model_training(data_dir, file_name_format, sheet_name):
     # The function 'cx2_file_reader' is used to read all the excel files
     # in the given path and convert the given cumulative data into individual
     # cycle data.
-    individual_cycle_data = cx2_file_reader(data_dir, file_name_format, sheet_name)
-
-    # The function 'data_formatting' is used to drop the unnecesary columns
-    # from the training data i.e. only the features considered in the model
-    # (Current, Voltage and Discharge capacity) are retained.
-    formatted_data = data_formatting(individual_cycle_data)
-
-    # The function 'series_to_supervised' is used to frame the time series training
-    # data as supervised learning dataset.
-    learning_df = series_to_supervised(
-        formatted_data, n_in=1, n_out=1, dropnan=True)
-
-    # The function 'long_short_term_memory' is used to train the model
-    # and predict response for the new input dataset.
-    model_loss, y_hat = long_short_term_memory(learning_df)
-
+    with instrumentation.stage('model_training') as training_stage:
+        individual_cycle_data = cx2_file_reader(
+            data_dir, file_name_format, sheet_name, cache=cache,
+            workers=workers)
+
+        with instrumentation.stage('framing') as stage:
+            # The function 'feature_array' is used to copy only the features
+            # considered in the model (Current, Voltage and Discharge
+            # capacity) into a single float32 array.
+            features = feature_array(individual_cycle_data)
+
+            # The function 'supervised_arrays' is used to frame the time
+            # series training data as supervised learning dataset, as views
+            # of the features.
+            train_x, train_y = supervised_arrays(features, n_in=n_in,
+                                                 n_out=n_out)
+            stage.rows = len(train_x)
+
+        # The model is trained and used to predict the response for the
+        # testing dataset, like in 'long_short_term_memory'.
+        with instrumentation.stage('training', rows=len(train_x)):
+            model_loss, y_hat, model = _train_lstm(
+                train_x, train_y, epochs=epochs, patience=patience,
+                checkpoint_dir=checkpoint_dir,
+                checkpoint_every=checkpoint_every, resume=resume)
+        training_stage.rows = len(train_x)
+
+    if return_model:
+        return model_loss, y_hat, model
     return model_loss, y_hat
 
 
 # Function to predict the discharge capacity using the trained LSTM model.
-def model_prediction(input_data):
+def model_prediction(input_data, model=None, batch_size=None):
     """
     This function can be used to forecast the discharge capacity of a battery using
     the trained LSTM model
@@ -347,6 +769,12 @@ def model_prediction(input_data):
     input_data(dataframe): This is the dataframe containing the current, voltage and
     discharge capacity values at a prior time which can be used to forecast discharge
     capacity at a further time.
+    model(None, string or model): The model used to predict. None uses the trained
+    model shipped with the package and a string is the path of a saved model. The
+    saved models are loaded once and kept in memory by 'model_registry', until their
+    file is modified.
+    batch_size(int): Number of samples predicted at a time, defaults to the keras
+    default.
 
     Returns:
     y_predicted: The forecasted values of discharge capacity.
@@ -354,23 +782,127 @@ def model_prediction(input_data):
 
     # The function 'series_to_supervised' is used to frame the time series training
     # data as supervised learning dataset.
-    learning_df = series_to_supervised(
-        input_data, n_in=1, n_out=1, dropnan=True)
-    learning_df = learning_df.iloc[:, 0:3].values
-    # Reshaping the input dataset.
-    learning_df = learning_df.reshape(
-        (learning_df.shape[0], 1, learning_df.shape[1]))
-    # Predicting the discharge values using the saved LSTM model.
-    module_dir = os.path.dirname(os.path.abspath(__file__))
-    model_path = join(module_dir,'models')
-    model = load_model(join(model_path,'lstm_trained_model.h5'))
-    y_predicted = model.predict(learning_df)
+    with instrumentation.stage('model_prediction') as prediction_stage:
+        with instrumentation.stage('framing') as stage:
+            learning_df = series_to_supervised(
+                input_data, n_in=1, n_out=1, dropnan=True)
+            learning_df = learning_df.iloc[:, 0:3].values
+            # Reshaping the input dataset.
+            learning_df = learning_df.reshape(
+                (learning_df.shape[0], 1, learning_df.shape[1]))
+            stage.rows = len(learning_df)
+
+        # Loading the saved LSTM model, or reusing the loaded model.
+        with instrumentation.stage('loading'):
+            model = model_registry.resolve(model)
+
+        # Predicting the discharge values using the saved LSTM model.
+        with instrumentation.stage('predicting', rows=len(learning_df)):
+            y_predicted = model.predict(learning_df, batch_size=batch_size)
+        prediction_stage.rows = len(learning_df)
     return y_predicted
 
 
+def model_prediction_stream(chunks, model=None, batch_size=1024, out=None):
+    """
+    This function forecasts the discharge capacity like 'model_prediction', for
+    data given chunk by chunk, so that the memory used does not depend on the
+    size of the data. The last point of every chunk is carried over as the
+    input of the first prediction of the next chunk, and the predictions are
+    made in batches of 'batch_size' samples across the chunks, so the result is
+    the same as 'model_prediction' with the same 'batch_size'.
+
+    Args:
+    chunks(iterable or array): Chunks of the data without missing values in
+    order, either dataframes with the current, voltage and discharge capacity
+    columns, e.g. from 'pl_samples_file_stream' or 'data_formatting', or arrays
+    of shape [samples, 3] as from 'feature_array'. A single 2-D array, e.g. a
+    numpy.memmap, is read in chunks.
+    model(None, string or model): The model used to predict, see
+    'model_prediction'.
+    batch_size(int): Number of samples predicted at a time.
+    out(array): Array of shape [samples - 1, 1], e.g. a numpy.memmap, to write
+    the predictions to instead of yielding them.
+
+    Returns:
+    A generator of the forecasted values of discharge capacity, one array of
+    shape [batch_size, 1] per batch, or 'out' filled with all the forecasted
+    values.
+    """
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise TypeError('batch_size should be a positive integer')
+
+    if isinstance(chunks, np.ndarray):
+        if chunks.ndim != 2:
+            raise ValueError('the array of the data should be 2-D')
+        # Slices of a memmap are only read from the disk when used
+        rows = max(batch_size, 65536)
+        data = chunks
+        chunks = (data[start:start + rows]
+                  for start in range(0, len(data), rows))
+
+    predictions = _predict_batches(
+        _carried_windows(chunks), model_registry.resolve(model), batch_size)
+    if out is None:
+        return predictions
+
+    first_row = 0
+    for y_batch in predictions:
+        out[first_row:first_row + len(y_batch)] = y_batch
+        first_row += len(y_batch)
+    if first_row != len(out):
+        raise ValueError('out has {} rows for {} predictions'
+                         .format(len(out), first_row))
+    return out
+
+
+def _carried_windows(chunks):
+    """
+    This generator yields the input windows of every chunk, starting with the
+    window made of the last point of the previous chunk.
+    """
+    last_row = None
+    for chunk in chunks:
+        if isinstance(chunk, pd.DataFrame):
+            features = feature_array(chunk)
+        else:
+            features = _feature_matrix(chunk)
+        if len(features) == 0:
+            continue
+        if last_row is not None:
+            features = np.concatenate((last_row, features))
+        x_values, _ = supervised_arrays(features, n_in=1)
+        if len(x_values):
+            yield x_values
+        last_row = features[-1:].copy()
+
+
+def _predict_batches(windows, model, batch_size):
+    """
+    This generator regroups the windows into batches of 'batch_size' samples
+    and yields the predictions of the model for every batch.
+    """
+    pending, n_pending = [], 0
+    for x_values in windows:
+        pending.append(x_values)
+        n_pending += len(x_values)
+        if n_pending < batch_size:
+            continue
+        x_values = np.concatenate(pending)
+        n_full = len(x_values) // batch_size * batch_size
+        for start in range(0, n_full, batch_size):
+            yield np.asarray(model.predict_on_batch(
+                x_values[start:start + batch_size]))
+        pending = [x_values[n_full:]]
+        n_pending = len(pending[0])
+    if n_pending:
+        yield np.asarray(model.predict_on_batch(np.concatenate(pending)))
+
+
 # Wrapping function only to merge and convert cumulative data to
 # individual cycle data.
-def cx2_file_reader(data_dir, file_name_format, sheet_name):
+def cx2_file_reader(data_dir, file_name_format, sheet_name, cache=None,
+                    workers=None, usecols=None, compact=False):
     """
     This function reads in the data for CX2 samples experiment and returns
     a well formatted dataframe with cycles in ascending order.
@@ -379,11 +911,61 @@ def cx2_file_reader(data_dir, file_name_format, sheet_name):
     data_dir (string): This is the absolute path to the data directory.
     file_name_format (string): Format of the filename, used to deduce other files.
     sheet_name (string): Sheet name containing the data in the excel file.
+    cache (None, bool, string or SheetCache): On-disk cache for the parsed
+    excel sheets. None or False parse every file, True uses the default cache
+    directory and a string is used as the cache directory.
+    workers (int): Number of processes used to parse the excel files
+    concurrently. None or 1 parse the files one after another.
+    usecols (list, string): Names of the columns to read from the sheets in
+    addition to the columns in 'CX2_COLUMNS'. None reads every column.
+    compact (bool): Whether to return the columns with the compact dtypes
+    of 'compact_dtypes', which roughly halves the memory used.
 
     Returns:
     The complete test data in a dataframe with extra column for capacity in Ah.
     """
     # Raise an exception if the type of the inputs is not correct
+    _check_cx2_inputs(data_dir, file_name_format, sheet_name)
+
+    with instrumentation.stage('cx2_file_reader') as reader_stage:
+        # Get the sorted list of excel files in the directory
+        path = join(data_dir, file_name_format)
+        with instrumentation.stage('listing'):
+            sorted_name_list = _cx2_file_names(path)
+
+        # Reading dataframes according to the date of experimentation
+        # using 'reading_dataframes' function.
+        if usecols is not None:
+            usecols = _projection(usecols, CX2_COLUMNS)['usecols']
+
+        with instrumentation.stage('parsing') as stage:
+            sorted_df = reading_dataframes(sorted_name_list, sheet_name, path,
+                                           cache=cache, workers=workers,
+                                           usecols=usecols, compact=compact)
+            stage.rows = sum(len(df) for df in sorted_df.values())
+
+        # Merging all the dataframes and adjusting the cycle index
+        # using the 'concat_df' function.
+        with instrumentation.stage('stitching') as stage:
+            cycle_data = concat_df(sorted_df, compact=compact)
+            stage.rows = len(cycle_data)
+
+        # Calculating the net capacity of the battery at every datapoint
+        # using the function 'capacity'.
+        with instrumentation.stage('capacity', rows=len(cycle_data)):
+            capacity_data = capacity(cycle_data, compact=compact)
+        reader_stage.rows = len(capacity_data)
+
+    # Returns the dataframe with new cycle indices and capacity data.
+    return capacity_data
+
+
+def _check_cx2_inputs(data_dir, file_name_format, sheet_name):
+    """
+    This function raises an exception if the inputs of the CX2 readers
+    are not of the correct type or the directory is not found.
+    """
+
     if not isinstance(data_dir, str):
         raise TypeError('data_dir is not of type string')
 
@@ -397,34 +979,21 @@ def cx2_file_reader(data_dir, file_name_format, sheet_name):
         raise FileNotFoundError("File {} not found in the location {}"
                                 .format(file_name_format, data_dir))
 
+
+def _cx2_file_names(path):
+    """
+    This function returns the names of the excel files in the directory,
+    sorted according to the date on the file name.
+    """
     # Get the list of files in the directory
-    path = join(data_dir, file_name_format)
     files = listdir(path)
 
-    # Extract the experiment name from the file_name_format
-    # exp_name = file_name_format[0:6]
-
     # Filtering out and reading the excel files in the data directory
     file_names = list(filter(lambda x: x[-5:] == '.xlsx', files))
 
     # Sorting the file names using the
     # 'file_name_sorting' function.
-    sorted_name_list = file_name_sorting(file_names)
-
-    # Reading dataframes according to the date of experimentation
-    # using 'reading_dataframes' function.
-    sorted_df = reading_dataframes(sorted_name_list, sheet_name, path)
-
-    # Merging all the dataframes and adjusting the cycle index
-    # using the 'concat_df' function.
-    cycle_data = concat_df(sorted_df)
-
-    # Calculating the net capacity of the battery at every datapoint
-    # using the function 'capacity'.
-    capacity_data = capacity(cycle_data)
-
-    # Returns the dataframe with new cycle indices and capacity data.
-    return capacity_data
+    return file_name_sorting(file_names)
 
 
 def file_name_sorting(file_name_list):
@@ -460,7 +1029,8 @@ def file_name_sorting(file_name_list):
     return sorted_file_names
 
 
-def reading_dataframes(file_names, sheet_name, path):
+def reading_dataframes(file_names, sheet_name, path, cache=None,
+                       workers=None, usecols=None, compact=False):
     """
     This function reads all the files in the sorted
     file names list as a dataframe
@@ -468,60 +1038,74 @@ def reading_dataframes(file_names, sheet_name, path):
     Args(list):
     file_names: Sorted file names list
     sheet_name: Sheet name in the excel file containing the data.
+    cache (None, bool, string or SheetCache): On-disk cache for the parsed
+    sheets, see 'cx2_file_reader'.
+    workers (int): Number of processes used to parse the files concurrently.
+    None or 1 parse the files one after another.
+    usecols (list, string): Names of the columns to read. None reads every
+    column.
+    compact (bool): Whether to parse the columns in 'usecols' with the compact
+    dtypes of 'COMPACT_DTYPES'.
 
     Returns:
     Dictionary of dataframes in the order of the sorted file names.
     """
-    # Empty dictionary to store all the dataframes according
-    # to the order in the sorted files name list
-    df_raw = {}
+    sheet_cache = resolve_cache(cache)
+    file_paths = [join(path, filename) for filename in file_names]
     # Reading the dataframes
-    for i, filename in enumerate(file_names):
-        df_raw[i] = pd.read_excel(
-            join(
-                path,
-                filename),
-            sheet_name=sheet_name)
+    dataframes = _map_files(
+        partial(_read_sheet, sheet_name=sheet_name, sheet_cache=sheet_cache,
+                **_projection(usecols, compact=compact)),
+        file_paths, workers)
+    # Dictionary to store all the dataframes according
+    # to the order in the sorted files name list
+    df_raw = dict(enumerate(dataframes))
     return df_raw
 
 
-def concat_df(df_dict):
+def _read_sheet(file_path, sheet_name, sheet_cache=None, usecols=None,
+                dtype=None):
+    """
+    This function reads a single sheet of an excel file, through the
+    on-disk cache if one is given. When the compact dtypes can not be
+    applied, the sheet is read again with the dtypes inferred by pandas.
+    """
+    try:
+        if sheet_cache is None:
+            return pd.read_excel(file_path, sheet_name=sheet_name,
+                                 usecols=usecols, dtype=dtype)
+        return sheet_cache.read_excel(file_path, sheet_name,
+                                      usecols=usecols, dtype=dtype)
+    except ValueError:
+        if not dtype:
+            raise
+        return _read_sheet(file_path, sheet_name, sheet_cache, usecols)
+
+
+def concat_df(df_dict, compact=False):
     """
     This function concatenates all the dataframes and edits
     the cycle index for the concatenated dataframes.
 
     Args:
     df_dict(dictionary): Dictionary of dataframes to be concatenated.
+    compact(bool): Whether to convert the columns with 'compact_dtypes'.
 
     Returns:
     A concatenated dataframe with editted cycle index
 
     """
-    df_concat = None
-    for data in df_dict:
-        if df_concat is None:
-            df_next = df_dict[data]
-            df_concat = pd.DataFrame(data=None, columns=df_next.columns)
-            # df_next['Cycle'] = df_next['Cycle'] + max(df_pl12['Cycle'])
-            df_concat = pd.concat([df_concat, df_next])
-        else:
-            df_next = df_dict[data]
-            df_next['Cycle_Index'] = np.array(
-                df_next['Cycle_Index']) + max(np.array(df_concat['Cycle_Index']))
-            df_next['Test_Time(s)'] = np.array(
-                df_next['Test_Time(s)']) + max(np.array(df_concat['Test_Time(s)']))
-            df_next['Charge_Capacity(Ah)'] = np.array(
-                df_next['Charge_Capacity(Ah)']) + max(np.array(df_concat['Charge_Capacity(Ah)']))
-            df_next['Discharge_Capacity(Ah)'] = np.array(
-                df_next['Discharge_Capacity(Ah)']) + max(
-                    np.array(df_concat['Discharge_Capacity(Ah)']))
-            df_concat = pd.concat([df_concat, df_next])
+    # Offset the cumulative columns of every file by the running maxima of
+    # the previous files and concatenate the dataframes only once
+    chunks, _ = _stitch_dataframes(df_dict.values(), _CX2_OFFSET_COLUMNS)
     # Reset the index and drop the old index
-    df_reset = df_concat.reset_index(drop=True)
+    df_reset = pd.concat(chunks, ignore_index=True)
+    if compact:
+        df_reset = compact_dtypes(df_reset)
     return df_reset
 
 
-def capacity(df_data):
+def capacity(df_data, compact=False):
     """
     This function calculates the net capacity of the battery
     from the charge capacity and discharge capacity values.
@@ -530,42 +1114,25 @@ def capacity(df_data):
     df_data(dataframe): Concatenated dataframe which has the values of charge
     capacity and discharge capacity for which net capacity has to be
     calculated.
+    compact(bool): Whether to store the capacities per cycle as float32.
 
     Returns:
     Dataframe with net capacity of the battery for every point of the charge
     and discharge cycle.
     """
-    # Grouping rows by the cycle index.
-    group = df_data.groupby(['Cycle_Index']).count()
-
-    # Get the indices when a cycle starts
-    cycle_start_indices = group['Data_Point'].cumsum()
-
-    # Get the charge_Ah per cycle
-    # Create numpy array to store the old charge_Ah row, and then
-    # perform transformation on it, rather than in the pandas series
-    # this is a lot faster in this case
-    charge_cycle_ah = np.array(df_data['Charge_Capacity(Ah)'])
-    charge_ah = np.array(df_data['Charge_Capacity(Ah)'])
-
-    for i in range(1, len(cycle_start_indices)):
-        begin_value = cycle_start_indices.iloc[i - 1]
-        end_value = cycle_start_indices.iloc[i]
-        charge_cycle_ah[begin_value:end_value] = charge_ah[begin_value:end_value] - \
-            charge_ah[begin_value - 1]
+    # Get the charge_Ah and discharge_Ah per cycle from the cumulative values
+    charge_cycle_ah, discharge_cycle_ah, capacity_ah = per_cycle_capacities(
+        df_data['Cycle_Index'].values,
+        df_data['Charge_Capacity(Ah)'].values,
+        df_data['Discharge_Capacity(Ah)'].values)
+
+    if compact:
+        # The differences are taken in float64 before being narrowed
+        charge_cycle_ah, discharge_cycle_ah, capacity_ah = [
+            values.astype(np.float32) for values in
+            (charge_cycle_ah, discharge_cycle_ah, capacity_ah)]
 
     df_data['charge_cycle_ah'] = charge_cycle_ah
-
-    # Get the discharge_Ah per cycle
-    discharge_cycle_ah = np.array(df_data['Discharge_Capacity(Ah)'])
-    discharge_ah = np.array(df_data['Discharge_Capacity(Ah)'])
-
-    for i in range(1, len(cycle_start_indices)):
-        begin_value = cycle_start_indices.iloc[i - 1]
-        end_value = cycle_start_indices.iloc[i]
-        discharge_cycle_ah[begin_value:end_value] = discharge_ah[begin_value:end_value] - \
-            discharge_ah[begin_value - 1]
-
     df_data['discharge_cycle_ah'] = discharge_cycle_ah
 
     # This is the data column we can use for prediction.
@@ -573,11 +1140,79 @@ def capacity(df_data):
     # due to incorrect discharge_Ah values every few cycles.
     # But the machine learning algorithm should consider these as outliers and
     # hopefully get over it. We can come back and correct this.
-    df_data['capacity_ah'] = df_data['charge_cycle_ah'] - df_data['discharge_cycle_ah']
+    df_data['capacity_ah'] = capacity_ah
 
     return df_data
 
 
+def cycle_start_indices(cycle_index):
+    """
+    This function finds the rows at which a new cycle starts.
+
+    Args:
+    cycle_index(array): Cycle number of every datapoint, with the datapoints of
+    a cycle next to each other.
+
+    Returns:
+    Numpy array with the index of the first datapoint of every cycle, starting
+    with 0 for the first cycle.
+    """
+    cycle_index = np.asarray(cycle_index)
+    if cycle_index.size == 0:
+        return np.zeros(0, dtype=np.intp)
+    # A cycle starts wherever the cycle number differs from the previous row
+    return np.concatenate(
+        ([0], np.flatnonzero(cycle_index[1:] != cycle_index[:-1]) + 1))
+
+
+def per_cycle_capacities(cycle_index, charge_ah, discharge_ah):
+    """
+    This function converts the cumulative charge and discharge capacities into
+    capacities per cycle, by subtracting from every cycle the last cumulative
+    value of the previous cycle. The computation is vectorized over all the
+    cycles, so it can be used on plain numpy arrays without a dataframe.
+
+    Args:
+    cycle_index(array): Cycle number of every datapoint, with the datapoints of
+    a cycle next to each other.
+    charge_ah(array): Cumulative charge capacity of every datapoint.
+    discharge_ah(array): Cumulative discharge capacity of every datapoint.
+
+    Returns:
+    charge_cycle_ah(array): Charge capacity within the cycle.
+    discharge_cycle_ah(array): Discharge capacity within the cycle.
+    capacity_ah(array): Net capacity, i.e. charge_cycle_ah - discharge_cycle_ah.
+    """
+    charge_ah = np.asarray(charge_ah)
+    discharge_ah = np.asarray(discharge_ah)
+
+    if not len(cycle_index) == len(charge_ah) == len(discharge_ah):
+        raise ValueError('cycle_index, charge_ah and discharge_ah should ' +
+                         'have the same length')
+
+    # Index of the first datapoint and the number of datapoints of every cycle
+    starts = cycle_start_indices(cycle_index)
+    lengths = np.diff(np.append(starts, len(charge_ah)))
+
+    charge_cycle_ah = charge_ah - np.repeat(
+        _cycle_baselines(charge_ah, starts), lengths)
+    discharge_cycle_ah = discharge_ah - np.repeat(
+        _cycle_baselines(discharge_ah, starts), lengths)
+    capacity_ah = charge_cycle_ah - discharge_cycle_ah
+
+    return charge_cycle_ah, discharge_cycle_ah, capacity_ah
+
+
+def _cycle_baselines(cumulative, starts):
+    """
+    This function returns the value to subtract from every cycle, i.e. the
+    last cumulative value of the previous cycle and zero for the first cycle.
+    """
+    baselines = np.zeros(len(starts), dtype=cumulative.dtype)
+    baselines[1:] = cumulative[starts[1:] - 1]
+    return baselines
+
+
 def data_formatting(merged_df):
     """
     This function formats the merged dataframe so that it can be used to frame the given
@@ -598,9 +1233,147 @@ def data_formatting(merged_df):
     return formatted_df
 
 
+def feature_array(merged_df):
+    """
+    This function is the array equivalent of 'data_formatting': it copies the
+    current, voltage and discharge capacity columns once into a contiguous
+    float32 array, without building an intermediate dataframe.
+
+    Args:
+        merged_df(dataframe): The merged dataframe which can be obtained by using the
+        function 'cx2_file_reader' or 'pl_samples_file_reader'.
+
+    Returns:
+        A C-contiguous float32 array of shape [samples, 3] with the columns in
+        the order of 'data_formatting'.
+    """
+    columns = [col for col in merged_df.columns
+               if re.search('Current|Voltage|discharge_cycle_ah', str(col))]
+    features = np.empty((len(merged_df), len(columns)), dtype=np.float32)
+    for i, col in enumerate(columns):
+        features[:, i] = merged_df[col].values
+    return features
+
+
+def supervised_arrays(features, n_in=1, n_out=1):
+    """
+    This function frames a time series as a supervised learning dataset
+    without copying it: the input windows and the target are strided views of
+    the features, so the memory used does not depend on the window sizes.
+
+    Args:
+        features(array): Array of shape [samples, features], e.g. from
+        'feature_array', or a list of 1-D arrays of the same length, which
+        are stacked into one array. The last feature is the target.
+        n_in(int): Number of lag observations as input.
+        n_out(int): Number of future values of the target as output.
+
+    Returns:
+        x(array): Read-only view of shape [windows, n_in, features] with the
+        observations at times t-n_in, ..., t-1 of every window, where windows
+        is samples - n_in - n_out + 1.
+        y(array): Read-only view of shape [windows] with the target at time t,
+        or of shape [windows, n_out] with the target at times t, ...,
+        t+n_out-1 if n_out is more than 1.
+    """
+    _check_window(n_in, n_out)
+
+    features = _feature_matrix(features)
+    windows = _windows(features, n_in + n_out)
+    x_values = windows[:, :n_in, :]
+    if n_out == 1:
+        y_values = windows[:, n_in, -1]
+    else:
+        y_values = windows[:, n_in:, -1]
+    return x_values, y_values
+
+
+def supervised_batches(features, n_in=1, n_out=1, batch_size=72,
+                       shuffle=False, seed=None):
+    """
+    This generator yields the windows of 'supervised_arrays' batch by batch,
+    e.g. to train a model on long windows without building all the windows.
+
+    Args:
+        features(array): Array of shape [samples, features], see
+        'supervised_arrays'.
+        n_in(int): Number of lag observations as input.
+        n_out(int): Number of future values of the target as output.
+        batch_size(int): Number of windows in a batch.
+        shuffle(bool): Whether to yield the windows in a random order.
+        seed(int): Seed of the random order.
+
+    Returns:
+        A generator of (x, y) tuples with the arrays of a batch. Without
+        shuffling the batches are views of the features, otherwise only
+        the windows of the batch are copied.
+    """
+    if not isinstance(batch_size, int) or batch_size < 1:
+        raise TypeError('batch_size should be a positive integer')
+
+    x_values, y_values = supervised_arrays(features, n_in, n_out)
+    if shuffle:
+        order = np.random.RandomState(seed).permutation(len(x_values))
+    for start in range(0, len(x_values), batch_size):
+        if shuffle:
+            rows = np.sort(order[start:start + batch_size])
+        else:
+            rows = slice(start, start + batch_size)
+        yield x_values[rows], y_values[rows]
+
+
+def _check_window(n_in, n_out):
+    """
+    This function raises an exception if the sizes of the input and output
+    windows are not positive integers.
+    """
+    if not isinstance(n_in, int) or n_in < 1:
+        raise TypeError('n_in should be a positive integer')
+
+    if not isinstance(n_out, int) or n_out < 1:
+        raise TypeError('n_out should be a positive integer')
+
+
+def _feature_matrix(features):
+    """
+    This function returns the features as a C-contiguous 2-D array, copying
+    them only if they are not already laid out that way. A list of values is
+    a single variable and a list of 1-D arrays holds one variable per array.
+    """
+    if isinstance(features, (list, tuple)):
+        if all(np.ndim(value) == 0 for value in features):
+            features = np.asarray(features).reshape(-1, 1)
+        else:
+            features = np.column_stack(features)
+    features = np.asarray(features)
+    if features.ndim == 1:
+        features = features.reshape(-1, 1)
+    if features.ndim != 2:
+        raise ValueError('features should be a 2-D array')
+    return np.ascontiguousarray(features)
+
+
+def _windows(values, length):
+    """
+    This function returns the sliding windows of 'length' rows of a
+    C-contiguous 2-D array, as a read-only view of shape
+    [rows - length + 1, length, columns].
+    """
+    n_windows = max(values.shape[0] - length + 1, 0)
+    return np.lib.stride_tricks.as_strided(
+        values, shape=(n_windows, length, values.shape[1]),
+        strides=(values.strides[0], values.strides[0], values.strides[1]),
+        writeable=False)
+
+
 def series_to_supervised(data, n_in=1, n_out=1, dropnan=True):
     """
     Frame a time series as a supervised learning dataset.
+    The inputs are all the variables at times t-n_in, ..., t-1 and the
+    outputs are the last variable, the target, at times t, ..., t+n_out-1.
+    The windows are strided views of the data like in 'supervised_arrays',
+    only the returned dataframe is a copy. Its size grows with the window
+    sizes, use 'supervised_arrays' or 'supervised_batches' for long windows.
     
     Arguments:
         data: Sequence of observations as a list or NumPy array.
@@ -609,37 +1382,61 @@ def series_to_supervised(data, n_in=1, n_out=1, dropnan=True):
         dropnan: Boolean whether or not to drop rows with NaN values.
     
     Returns:
-        Pandas DataFrame of series framed for supervised learning.
+        Pandas DataFrame of series framed for supervised learning. With the
+        three variables of 'data_formatting' the columns are named
+        'Current(t-1)', 'Voltage(t-1)', 'discharge_capacity(t-1)', ...,
+        'discharge_capacity(t)', ..., otherwise 'var1(t-1)', ...
     
     """
-    n_vars = 1 if isinstance(data, list) else data.shape[1]
-    df_data = pd.DataFrame(data)
-    cols, names = list(), list()
+    _check_window(n_in, n_out)
+
+    index = data.index if isinstance(data, (pd.DataFrame, pd.Series)) \
+        else pd.RangeIndex(len(data))
+    values = _feature_matrix(data)
+    n_vars = values.shape[1]
+    # Shifting introduces missing values, so the integers become floats
+    if values.dtype.kind in 'biu':
+        values = values.astype(np.float64)
+    if not dropnan:
+        # The rows shifted in from outside the series are missing values
+        values = np.concatenate(
+            (np.full((n_in, n_vars), np.nan, dtype=values.dtype), values,
+             np.full((max(n_out - 1, 0), n_vars), np.nan, dtype=values.dtype)))
+    else:
+        index = index[n_in:len(index) - n_out + 1]
+
+    if n_vars == 3:
+        var_names = ['Current', 'Voltage', 'discharge_capacity']
+    else:
+        var_names = ['var%d' % (j + 1) for j in range(n_vars)]
+    names = list()
     # input sequence (t-n, ... t-1)
     for i in range(n_in, 0, -1):
-        cols.append(df_data.shift(i))
-        names += [('var%d(t-%d)' % (j + 1, i)) for j in range(n_vars)]
-    # forecast sequence (t, t+1, ... t+n)
+        names += [('%s(t-%d)' % (name, i)) for name in var_names]
+    # forecast sequence of the target (t, t+1, ... t+n)
     for i in range(0, n_out):
-        cols.append(df_data.shift(-i))
         if i == 0:
-            names += [('var%d(t)' % (j + 1)) for j in range(n_vars)]
+            names.append('%s(t)' % var_names[-1])
         else:
-            names += [('var%d(t+%d)' % (j + 1, i)) for j in range(n_vars)]
-    # put it all together
-    sl_df = pd.concat(cols, axis=1)
-    sl_df.columns = names
-    # drop rows with NaN values
-    if dropnan:
-        sl_df.dropna(inplace=True)
-    sl_df.drop(sl_df.columns[[3, 4]], axis=1, inplace=True)
-    sl_df.rename(columns={'var1(t-1)':'Current(t-1)','var2(t-1)':'Voltage(t-1)',
-                 'var3(t-1)':'discharge_capacity(t-1)','var3(t)':'discharge_capacity(t)'},
-                 inplace = True)
+            names.append('%s(t+%d)' % (var_names[-1], i))
+
+    # Every row is a window of n_in + n_out observations of the series,
+    # viewed without copying the data, and only the rows of the dataframe
+    # are copied. A series shorter than a window gives an empty dataframe.
+    windows = _windows(values, n_in + n_out)
+    lags = np.concatenate(
+        (windows[:, :n_in, :].reshape(windows.shape[0], n_in * n_vars),
+         windows[:, n_in:, -1]), axis=1)
+    if dropnan and np.isnan(values).any():
+        # drop rows with NaN values
+        keep = ~np.isnan(lags).any(axis=1)
+        lags, index = lags[keep], index[keep]
+    sl_df = pd.DataFrame(lags, index=index, columns=names)
     return sl_df
 
 
-def long_short_term_memory(model_data):
+def long_short_term_memory(model_data, n_in=1, n_out=1, units=50, epochs=50,
+                           batch_size=72, learning_rate=None):
     """
     This function splits the input dataset into training
     and testing datasets. The keras LSTM model is then
@@ -648,6 +1445,13 @@ def long_short_term_memory(model_data):
     Args:
         model_data(dataframe): Values of input and output variables
         of time series data framed as a supervised learning dataset.
+        n_in(int): Number of lag observations used to frame 'model_data'.
+        n_out(int): Number of outputs used to frame 'model_data'.
+        units(int): Number of units of the LSTM layer.
+        epochs(int): Number of epochs of training.
+        batch_size(int): Number of samples per gradient update.
+        learning_rate(float): Learning rate of the Adam optimizer, defaults to
+        the keras default.
 
 
     Returns:
@@ -655,41 +1459,243 @@ def long_short_term_memory(model_data):
         y_hat(array): Predicted response for the testing dataset.
         y_prediction(array): Predicted response for the completely new dataset.
     """
-    # Splitting the input dataset into training and testing data
-    train, test = train_test_split(model_data, test_size=0.2, random_state=944)
+    _check_window(n_in, n_out)
+
     # split into input and outputs
-    train_x, train_y = train[train.columns[0:3]
-                             ].values, train[train.columns[3]].values
-    test_x, test_y = test[test.columns[0:3]
-                          ].values, test[test.columns[3]].values
+    values = model_data.values
+    n_vars = (values.shape[1] - n_out) // n_in
     # reshape input to be 3D [samples, timesteps, features]
-    train_x = train_x.reshape((train_x.shape[0], 1, train_x.shape[1]))
-    test_x = test_x.reshape((test_x.shape[0], 1, test_x.shape[1]))
-    # print(train_x.shape, train_y.shape, test_x.shape, test_y.shape)
+    model_x = values[:, :n_in * n_vars].reshape((values.shape[0], n_in, n_vars))
+    model_y = values[:, n_in * n_vars]
+    if n_out > 1:
+        model_y = values[:, n_in * n_vars:]
+    model_loss, yhat, _ = _train_lstm(
+        model_x, model_y, units=units, epochs=epochs, batch_size=batch_size,
+        learning_rate=learning_rate)
+    return model_loss, yhat
+
+
+def _train_lstm(model_x, model_y, units=50, epochs=50, batch_size=72,
+                learning_rate=None, patience=None, checkpoint_dir=None,
+                checkpoint_every=1, resume=True):
+    """
+    This function splits the input windows of shape [samples, timesteps,
+    features] and the targets into training and testing datasets, then trains
+    and tests the keras LSTM model like 'long_short_term_memory'. The early
+    stopping and the checkpoints are described in 'model_training'.
+
+    Returns:
+        The history dictionary, the predicted response for the testing
+        dataset and the model.
+    """
+    # Splitting the input dataset into training and testing data
+    # scikit-learn is only imported for training
+    from sklearn.model_selection import train_test_split
+
+    train_x, test_x, train_y, test_y = train_test_split(
+        model_x, model_y, test_size=0.2, random_state=944)
 
     # Designing the network
-    model = Sequential()
-    model.add(LSTM(50, input_shape=(train_x.shape[1], train_x.shape[2])))
-    model.add(Dense(1))
-    model.compile(loss='mae', optimizer='adam')
-    # Fitting the network with training and testing data
-    history = model.fit(
-        train_x,
-        train_y,
-        epochs=50,
-        batch_size=72,
-        validation_data=(
-            test_x,
-            test_y),
-        verbose=0,
-        shuffle=False)
-    model_loss = history.history
-    # Prediction for the test dataset.
+    model = _build_lstm(train_x.shape[1], train_x.shape[2],
+                        1 if model_y.ndim == 1 else model_y.shape[1],
+                        units=units, learning_rate=learning_rate)
+
+    if patience is None and checkpoint_dir is None:
+        # Fitting the network with training and testing data
+        history = model.fit(
+            train_x,
+            train_y,
+            epochs=epochs,
+            batch_size=batch_size,
+            validation_data=(
+                test_x,
+                test_y),
+            verbose=0,
+            shuffle=False)
+        model_loss = history.history
+        # Prediction for the test dataset.
+        yhat = model.predict(test_x)
+        return model_loss, yhat, model
+
+    checkpoint = _checkpoint_callback_class()(
+        checkpoint_dir, patience, checkpoint_every, model_x.shape)
+    if resume:
+        checkpoint.restore(model)
+    if checkpoint.epoch < epochs and not checkpoint.stopped:
+        model.fit(
+            train_x,
+            train_y,
+            epochs=epochs,
+            initial_epoch=checkpoint.epoch,
+            batch_size=batch_size,
+            validation_data=(
+                test_x,
+                test_y),
+            verbose=0,
+            shuffle=False,
+            callbacks=[checkpoint])
+    # The model of the best epoch is used for the prediction
+    checkpoint.restore_best(model)
     yhat = model.predict(test_x)
-    # model.save('lstm_trained_model.h5')
-    return model_loss, yhat
+    return checkpoint.history, yhat, model
+
+
+# Subclass of 'keras.callbacks.Callback' built on first use
+_CHECKPOINT_CALLBACK = None
+
 
-def file_reader(data_dir, file_name_format, sheet_name, ignore_file_indices):
+def _checkpoint_callback_class():
+    """
+    This function imports keras and defines the callback which saves the
+    checkpoints of the training and stops it early.
+    """
+    global _CHECKPOINT_CALLBACK
+    if _CHECKPOINT_CALLBACK is not None:
+        return _CHECKPOINT_CALLBACK
+
+    from keras.callbacks import Callback
+
+    class _TrainingCheckpoint(Callback):
+        """
+        Callback keeping the history, the best weights and the number of
+        epochs without improvement of the validation loss, and saving them
+        to 'checkpoint_dir' so that the training can be resumed.
+        """
+
+        def __init__(self, checkpoint_dir, patience, every, data_shape):
+            super(_TrainingCheckpoint, self).__init__()
+            if patience is not None and (not isinstance(patience, int) or
+                                         patience < 0):
+                raise TypeError('patience should be a non-negative integer')
+            if not isinstance(every, int) or every < 1:
+                raise TypeError('checkpoint_every should be a positive integer')
+            if checkpoint_dir is not None:
+                if not isinstance(checkpoint_dir, str):
+                    raise TypeError('checkpoint_dir is not of type string')
+                os.makedirs(checkpoint_dir, exist_ok=True)
+
+            self.checkpoint_dir = checkpoint_dir
+            self.patience = patience
+            self.every = every
+            self.data_shape = [int(n) for n in data_shape]
+            self.history = {}
+            self.epoch = 0
+            self.best = np.inf
+            self.wait = 0
+            self.stopped = False
+            self.best_weights = None
+
+        def _path(self, name):
+            return join(self.checkpoint_dir, name)
+
+        def restore(self, model):
+            """
+            This function loads the last checkpoint into the model and the
+            callback, if there is one.
+            """
+            if self.checkpoint_dir is None or not isfile(
+                    self._path(_CHECKPOINT_STATE)):
+                return
+            with open(self._path(_CHECKPOINT_STATE)) as state_file:
+                state = json.load(state_file)
+            if state['data_shape'] != self.data_shape:
+                raise ValueError('the checkpoint in {} was trained on other '
+                                 'data'.format(self.checkpoint_dir))
+            model.load_weights(self._path(_CHECKPOINT_LAST))
+            self.history = state['history']
+            self.epoch = state['epoch']
+            self.best = state['best']
+            self.wait = state['wait']
+            self.stopped = state['stopped']
+
+        def restore_best(self, model):
+            """
+            This function sets the weights of the best epoch in the model.
+            """
+            if self.best_weights is not None:
+                model.set_weights(self.best_weights)
+            elif (self.checkpoint_dir is not None and
+                  isfile(self._path(_CHECKPOINT_BEST))):
+                model.load_weights(self._path(_CHECKPOINT_BEST))
+
+        def on_epoch_end(self, epoch, logs=None):
+            logs = logs or {}
+            for key, value in logs.items():
+                self.history.setdefault(key, []).append(float(value))
+            self.epoch = epoch + 1
+
+            val_loss = logs.get('val_loss')
+            if val_loss is not None and val_loss < self.best:
+                self.best = float(val_loss)
+                self.wait = 0
+                self.best_weights = self.model.get_weights()
+                if self.checkpoint_dir is not None:
+                    self._save_weights(_CHECKPOINT_BEST)
+            else:
+                self.wait += 1
+                if self.patience is not None and self.wait >= self.patience:
+                    self.stopped = True
+                    self.model.stop_training = True
+
+            if self.checkpoint_dir is not None and (
+                    self.epoch % self.every == 0 or self.stopped):
+                self._save_checkpoint()
+
+        def on_train_end(self, logs=None):
+            if self.checkpoint_dir is not None:
+                self._save_checkpoint()
+
+        def _save_checkpoint(self):
+            self._save_weights(_CHECKPOINT_LAST)
+            state = {'epoch': self.epoch, 'history': self.history,
+                     'best': self.best, 'wait': self.wait,
+                     'stopped': self.stopped, 'data_shape': self.data_shape}
+            # The files are replaced at once, a killed job leaves the
+            # previous checkpoint intact
+            tmp_path = self._path(_CHECKPOINT_STATE + '.tmp')
+            with open(tmp_path, 'w') as state_file:
+                json.dump(state, state_file)
+            os.replace(tmp_path, self._path(_CHECKPOINT_STATE))
+
+        def _save_weights(self, name):
+            tmp_path = self._path('tmp.' + name)
+            self.model.save_weights(tmp_path)
+            os.replace(tmp_path, self._path(name))
+
+    _CHECKPOINT_CALLBACK = _TrainingCheckpoint
+    return _CHECKPOINT_CALLBACK
+
+
+def _build_lstm(n_in, n_features, n_out, units=50, learning_rate=None):
+    """
+    This function builds and compiles the LSTM network for input windows of
+    n_in timesteps of n_features features and n_out outputs, with 'units'
+    LSTM units and the Adam optimizer.
+    """
+    # keras and tensorflow take seconds to import, they are only imported
+    # when a model is built so that reading the data does not need them
+    from keras.models import Sequential
+    from keras.layers import Dense
+    from keras.layers import LSTM
+
+    model = Sequential()
+    model.add(LSTM(units, input_shape=(n_in, n_features)))
+    # One output per future value of the target
+    model.add(Dense(n_out))
+    optimizer = 'adam'
+    if learning_rate is not None:
+        from keras.optimizers import Adam
+        try:
+            optimizer = Adam(learning_rate=learning_rate)
+        except TypeError:
+            # Older keras versions name the learning rate 'lr'
+            optimizer = Adam(lr=learning_rate)
+    model.compile(loss='mae', optimizer=optimizer)
+    return model
+
+
+def file_reader(data_dir, file_name_format, sheet_name, ignore_file_indices,
+                cache=None, workers=None, usecols=None, compact=False):
     """
     This function reads PL sample, CX2 and CS2 files and returns a nice 
     dataframe with cyclic values of charge and discharge capacity with 
@@ -700,22 +1706,43 @@ def file_reader(data_dir, file_name_format, sheet_name, ignore_file_indices):
     file_name_format (string): Format of the filename, used to deduce other files.
     sheet_name (string): Sheet name containing the data in the excel file.
     ignore_file_indices (list, int): This list of ints tells which to ignore.
+    cache (None, bool, string or SheetCache): On-disk cache for the parsed
+    excel sheets of CX2 and CS2 files, see 'cx2_file_reader'.
+    workers (int): Number of processes used to parse the data files
+    concurrently. None or 1 parse the files one after another.
+    usecols (list, string): Names of extra columns to read from the files.
+    Only the columns needed to calculate the capacities and the model features
+    are read by default.
+    compact (bool): Whether to read the data with the compact dtypes of
+    'compact_dtypes'.
 
     Returns:
     The complete test data in a dataframe with extra column for capacity in Ah.
     """
 
-    # For excel files (CX2 and CS2 datafiles), the function 'cx2_file_reader'
-    # is used.
-    if file_name_format[:3] == 'CX2' or file_name_format[:3] == 'CS2':
-        df_output = cx2_file_reader(data_dir,file_name_format,sheet_name) 
-    else:
-        df_output = pl_samples_file_reader(data_dir,file_name_format,ignore_file_indices)
-   
-    # The function 'data_formatting' is used to drop the unnecesary columns
-    # from the training data i.e. only the features considered in the model
-    # (Current, Voltage and Discharge capacity) are retained.
-    formatted_data = data_formatting(df_output)
+    # Only the columns needed for the model features are parsed from the
+    # files, the readers add the columns needed for the capacities.
+    if usecols is None:
+        usecols = []
+
+    with instrumentation.stage('file_reader') as reader_stage:
+        # For excel files (CX2 and CS2 datafiles), the function
+        # 'cx2_file_reader' is used.
+        if file_name_format[:3] == 'CX2' or file_name_format[:3] == 'CS2':
+            df_output = cx2_file_reader(data_dir,file_name_format,sheet_name,
+                                        cache=cache, workers=workers,
+                                        usecols=usecols, compact=compact)
+        else:
+            df_output = pl_samples_file_reader(data_dir,file_name_format,ignore_file_indices,
+                                               workers=workers, usecols=usecols,
+                                               compact=compact)
+
+        # The function 'data_formatting' is used to drop the unnecesary columns
+        # from the training data i.e. only the features considered in the model
+        # (Current, Voltage and Discharge capacity) are retained.
+        with instrumentation.stage('formatting', rows=len(df_output)):
+            formatted_data = data_formatting(df_output)
+        reader_stage.rows = len(formatted_data)
 
     # The function 'series_to_supervised' is used to frame the time series training
     # data as supervised learning dataset.
@@ -0,0 +1,243 @@
+"""
+This module provides an on-disk cache for parsed cycling data sheets.
+Parsing the Arbin excel exports is slow, so every parsed sheet is stored
+as an uncompressed numpy ``.npz`` archive with one array per column. A
+cached sheet is keyed by the absolute path of the source file and the sheet
+name, and is only reused while the size and modification time of the source
+file are unchanged. The total size of the cache directory is bounded and the
+least recently used entries are evicted first.
+"""
+
+import hashlib
+import os
+from os.path import join
+import tempfile
+import pandas as pd
+import numpy as np
+
+# Environment variables to override the default location and size of the cache
+CACHE_DIR_ENV = 'BATTDEG_CACHE_DIR'
+CACHE_SIZE_ENV = 'BATTDEG_CACHE_MAX_BYTES'
+
+# Default upper bound on the size of the cache directory (2 GB)
+DEFAULT_CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Name of the array holding the metadata of an entry in the archive
+_META_KEY = '__battdeg_meta__'
+
+
+def default_cache_dir():
+    """
+    This function returns the directory used by the cache when no directory
+    is given explicitly.
+
+    Returns:
+        The value of the BATTDEG_CACHE_DIR environment variable if it is set,
+        otherwise ``~/.cache/battdeg``.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENV)
+    if cache_dir:
+        return cache_dir
+    return join(os.path.expanduser('~'), '.cache', 'battdeg')
+
+
+class SheetCache(object):
+    """
+    Size-bounded on-disk cache of parsed dataframes.
+
+    Args:
+        cache_dir (string): Directory holding the cached archives. Defaults to
+        the value returned by 'default_cache_dir'.
+        max_bytes (int): Upper bound on the total size of the cached archives.
+        Defaults to the BATTDEG_CACHE_MAX_BYTES environment variable or 2 GB.
+    """
+
+    def __init__(self, cache_dir=None, max_bytes=None):
+        if cache_dir is None:
+            cache_dir = default_cache_dir()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_SIZE_ENV,
+                                           DEFAULT_CACHE_MAX_BYTES))
+
+        if not isinstance(cache_dir, str):
+            raise TypeError('cache_dir is not of type string')
+
+        if not isinstance(max_bytes, int) or max_bytes < 0:
+            raise TypeError('max_bytes should be a non-negative integer')
+
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def entry_path(self, path, key):
+        """
+        This function returns the location of the archive holding the
+        cached dataframe for a source file and key (e.g. the sheet name).
+        """
+        digest = hashlib.sha1(
+            '{}\0{!r}'.format(os.path.abspath(path), key).encode('utf-8'))
+        return join(self.cache_dir, digest.hexdigest() + '.npz')
+
+    def get(self, path, key):
+        """
+        This function returns the cached dataframe for a source file and key,
+        or None if there is no valid entry. An entry whose source file has
+        changed size or modification time is removed.
+        """
+        entry = self.entry_path(path, key)
+        if not os.path.exists(entry):
+            return None
+
+        try:
+            with np.load(entry, allow_pickle=False) as archive:
+                meta = archive[_META_KEY]
+                if tuple(meta[:2]) != _fingerprint(path):
+                    raise KeyError('stale entry')
+                columns = [str(col) for col in archive['columns']]
+                data = {col: archive['col_{}'.format(i)]
+                        for i, col in enumerate(columns)}
+        except (KeyError, ValueError, OSError, EOFError):
+            # The entry is stale or unreadable, drop it and re-parse
+            _remove(entry)
+            return None
+
+        # Mark the entry as recently used for the eviction policy
+        os.utime(entry, None)
+        return pd.DataFrame(data, columns=columns)
+
+    def put(self, path, key, df_data):
+        """
+        This function stores a dataframe as the cached value for a source file
+        and key. Dataframes with columns of object dtype can not be stored as
+        plain arrays and are silently not cached.
+
+        Returns:
+            True if the dataframe was stored, False otherwise.
+        """
+        if any(dtype == np.dtype('O') for dtype in df_data.dtypes):
+            return False
+
+        arrays = {'col_{}'.format(i): df_data[col].values
+                  for i, col in enumerate(df_data.columns)}
+        arrays['columns'] = np.array([str(col) for col in df_data.columns])
+        arrays[_META_KEY] = np.array(_fingerprint(path), dtype=np.int64)
+
+        # Write to a temporary file first so a concurrent reader
+        # never sees a partially written archive
+        file_desc, tmp_path = tempfile.mkstemp(dir=self.cache_dir,
+                                               suffix='.tmp')
+        try:
+            with os.fdopen(file_desc, 'wb') as tmp_file:
+                np.savez(tmp_file, **arrays)
+            os.replace(tmp_path, self.entry_path(path, key))
+        except BaseException:
+            _remove(tmp_path)
+            raise
+
+        self.evict()
+        return True
+
+    def fetch(self, path, key, loader):
+        """
+        This function returns the cached dataframe for a source file and key,
+        calling 'loader' to parse the source file and filling the cache
+        if there is no valid entry.
+        """
+        df_data = self.get(path, key)
+        if df_data is None:
+            df_data = loader()
+            self.put(path, key, df_data)
+        return df_data
+
+    def read_excel(self, path, sheet_name, usecols=None, dtype=None):
+        """
+        This function is a cached equivalent of 'pandas.read_excel' for
+        a single sheet. A projection on 'usecols' with 'dtype' is cached
+        separately from the full sheet.
+        """
+        key = sheet_name
+        if usecols is not None or dtype is not None:
+            key = (sheet_name, _freeze(usecols), _freeze(dtype))
+        return self.fetch(path, key,
+                          lambda: pd.read_excel(path, sheet_name=sheet_name,
+                                                usecols=usecols, dtype=dtype))
+
+    def size(self):
+        """
+        This function returns the total size in bytes of the cached archives.
+        """
+        return sum(os.path.getsize(entry) for entry, _ in self._entries())
+
+    def evict(self):
+        """
+        This function removes the least recently used archives until the total
+        size of the cache is below 'max_bytes'.
+        """
+        entries = sorted(self._entries(), key=lambda entry: entry[1].st_mtime)
+        total = sum(stat.st_size for _, stat in entries)
+        for entry, stat in entries:
+            if total <= self.max_bytes:
+                break
+            _remove(entry)
+            total -= stat.st_size
+
+    def clear(self):
+        """
+        This function removes all the archives from the cache.
+        """
+        for entry, _ in self._entries():
+            _remove(entry)
+
+    def _entries(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                entry = join(self.cache_dir, name)
+                try:
+                    yield entry, os.stat(entry)
+                except OSError:
+                    continue
+
+
+def resolve_cache(cache):
+    """
+    This function converts the 'cache' argument accepted by the readers into
+    a SheetCache or None.
+
+    Args:
+        cache (None, bool, string or SheetCache): None or False disable the
+        cache, True uses the default cache directory and a string is used as
+        the cache directory.
+
+    Returns:
+        A SheetCache instance, or None if caching is disabled.
+    """
+    if cache is None or cache is False:
+        return None
+    if cache is True:
+        return SheetCache()
+    if isinstance(cache, str):
+        return SheetCache(cache)
+    if isinstance(cache, SheetCache):
+        return cache
+    raise TypeError('cache should be None, a bool, a string or a SheetCache')
+
+
+def _freeze(value):
+    # Hashable and reproducible representation of the reader arguments
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), np.dtype(v).str) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set)):
+        return tuple(sorted(str(v) for v in value))
+    return value
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
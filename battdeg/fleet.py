@@ -0,0 +1,238 @@
+"""
+This module reads the data of a fleet of cells, i.e. many CX2, CS2 and PL
+cell directories, in one call. The pipeline of every cell ('cx2_file_reader'
+or 'pl_samples_file_reader') runs in a bounded pool of worker processes and
+the results are concatenated into a single long-format dataframe with the
+cell id in the first column. The columns of the PL cells are renamed to the
+names of the CX2 and CS2 columns holding the same values, so that every cell
+has its cycle number in 'Cycle_Index' and its test time in 'Test_Time(s)'.
+A cell which can not be read does not stop the other cells, its error is
+returned with the data.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from os import listdir
+from os.path import isdir, isfile, join
+import re
+import numpy as np
+import pandas as pd
+
+from .battdeg import (compact_dtypes, cx2_file_reader, datenum_to_datetime64,
+                      pl_samples_file_reader)
+
+# Name of the column holding the cell id in the fleet dataframe
+CELL_ID_COLUMN = 'cell_id'
+
+# Default sheet of the CX2 and CS2 excel files holding the cycling data
+_DEFAULT_SHEET = 1
+
+# Names of the columns of the PL cells in the fleet dataframe, the names of
+# the columns of the CX2 and CS2 cells holding the same values
+_PL_FLEET_COLUMNS = {'Time_sec': 'Test_Time(s)', 'Step': 'Step_Index',
+                     'Cycle': 'Cycle_Index', 'Current_Amp': 'Current(A)',
+                     'Voltage_Volt': 'Voltage(V)',
+                     'Charge_Ah': 'Charge_Capacity(Ah)',
+                     'Discharge_Ah': 'Discharge_Capacity(Ah)'}
+
+
+def fleet_specs(root_dir, sheet_name=_DEFAULT_SHEET):
+    """
+    This function finds the cell directories in a root directory, like the
+    'CX2_16', 'CS2_34' and 'PL12' directories in 'battdeg/data', and returns
+    the arguments to read each of them.
+
+    Args:
+        root_dir (string): Directory holding one sub-directory per cell.
+        sheet_name (string or int): Sheet name containing the data in the
+        excel files of the CX2 and CS2 cells.
+
+    Returns:
+        List of (data_dir, file_name_format, sheet_name, ignore_file_indices)
+        tuples, one per cell, sorted by the name of the cell directory.
+    """
+    if not isinstance(root_dir, str):
+        raise TypeError('root_dir is not of type string')
+
+    if not isdir(root_dir):
+        raise FileNotFoundError('Directory {} not found'.format(root_dir))
+
+    specs = []
+    for name in sorted(listdir(root_dir)):
+        cell_dir = join(root_dir, name)
+        if not isdir(cell_dir):
+            continue
+        if _is_cx2(name):
+            # The excel files are found from the parent and the cell name
+            specs.append((root_dir, name, sheet_name, []))
+            continue
+        # The PL files are numbered csv files, e.g. 'PL12(1).csv'
+        csv_names = sorted(f for f in listdir(cell_dir)
+                           if isfile(join(cell_dir, f)) and
+                           re.match(r'.+\(\d+\)\.csv$', f))
+        if csv_names:
+            specs.append((cell_dir, csv_names[0], sheet_name, []))
+    return specs
+
+
+def cell_id(spec):
+    """
+    This function returns the id of the cell read with a spec, i.e. the name
+    of the cell directory for CX2 and CS2 cells, e.g. 'CX2_16', and the name
+    of the experiment for PL cells, e.g. 'PL12' for 'PL12(1).csv'.
+    """
+    file_name_format = spec[1]
+    if _is_cx2(file_name_format):
+        return file_name_format
+    return file_name_format.split('(')[0]
+
+
+def fleet_reader(cells, sheet_name=_DEFAULT_SHEET, workers=None, cache=None,
+                 usecols=None, compact=False):
+    """
+    This function reads the data of many cells concurrently and returns it
+    as a single dataframe.
+
+    Args:
+        cells (string or list): Root directory holding the cell directories,
+        see 'fleet_specs', or list of (data_dir, file_name_format, sheet_name,
+        ignore_file_indices) tuples as passed to 'file_reader'.
+        sheet_name (string or int): Sheet name of the excel files of the CX2
+        and CS2 cells, used when 'cells' is a root directory.
+        workers (int): Number of processes reading cells at the same time.
+        None or 1 read the cells one after another.
+        cache (None, bool, string or SheetCache): On-disk cache for the parsed
+        excel sheets, see 'cx2_file_reader'.
+        usecols (list, string): Names of the columns to read in addition to
+        the columns needed for the capacities. None reads every column.
+        compact (bool): Whether to read the cells with the compact dtypes of
+        'compact_dtypes', which roughly halves the memory used by the fleet.
+        The dtypes are applied again to the fleet dataframe, as the columns
+        missing from some cells hold NaN for them.
+
+    Returns:
+        The dataframe of all the cells which were read, with the cell id in
+        the column 'cell_id' and the rows of each cell in the order of the
+        specs (None if no cell was read), and a dictionary with the cell ids
+        of the cells which could not be read as keys and the exceptions
+        raised as values. The columns of the PL cells have the names of the
+        CX2 and CS2 columns and 'Date_Time' holds timestamps for every cell.
+    """
+    if isinstance(cells, str):
+        specs = fleet_specs(cells, sheet_name)
+    else:
+        specs = _check_specs(cells)
+
+    if workers is not None and (not isinstance(workers, int) or workers < 1):
+        raise TypeError('workers should be a positive integer')
+
+    cell_ids = [cell_id(spec) for spec in specs]
+    duplicates = sorted(set(c for c in cell_ids if cell_ids.count(c) > 1))
+    if duplicates:
+        raise ValueError('the cell ids {} are not unique'
+                         .format(', '.join(duplicates)))
+
+    read = partial(_read_cell, cache=cache, usecols=usecols,
+                   compact=compact)
+    if workers is None or workers == 1 or len(specs) < 2:
+        results = [_run(read, spec) for spec in specs]
+    else:
+        # Every cell is read in its own task, the pool bounds the number of
+        # cells held in memory and parsed at the same time
+        with ProcessPoolExecutor(max_workers=min(workers, len(specs))) as pool:
+            futures = [pool.submit(read, spec) for spec in specs]
+            results = [_result(future) for future in futures]
+
+    frames = []
+    errors = {}
+    for id_cell, (df_cell, error) in zip(cell_ids, results):
+        if error is not None:
+            errors[id_cell] = error
+        else:
+            df_cell = _fleet_schema(df_cell)
+            df_cell.insert(0, CELL_ID_COLUMN, id_cell)
+            frames.append(df_cell)
+
+    if not frames:
+        return None, errors
+
+    df_fleet = pd.concat(frames, ignore_index=True, sort=False)
+    if compact:
+        # The columns missing from some cells were promoted to float64
+        df_fleet = compact_dtypes(df_fleet)
+    # The categorical column stores every cell id only once
+    df_fleet[CELL_ID_COLUMN] = pd.Categorical(
+        df_fleet[CELL_ID_COLUMN],
+        categories=[c for c in cell_ids if c not in errors])
+    return df_fleet, errors
+
+
+def _check_specs(specs):
+    """
+    This function raises an exception if the specs of the cells are not of
+    the correct type and returns them as a list of tuples.
+    """
+    if not isinstance(specs, (list, tuple)):
+        raise TypeError('cells should be a directory or a list of specs')
+
+    checked = []
+    for spec in specs:
+        if not isinstance(spec, (list, tuple)) or len(spec) != 4:
+            raise TypeError('a spec should be a tuple (data_dir, ' +
+                            'file_name_format, sheet_name, ignore_file_indices)')
+        if not isinstance(spec[0], str) or not isinstance(spec[1], str):
+            raise TypeError('data_dir and file_name_format should be strings')
+        checked.append(tuple(spec))
+    return checked
+
+
+def _is_cx2(file_name_format):
+    return file_name_format[:3] == 'CX2' or file_name_format[:3] == 'CS2'
+
+
+def _read_cell(spec, cache=None, usecols=None, compact=False):
+    """
+    This function reads the data of one cell with the reader of its type.
+    The files of a cell are parsed one after another, the cells are read
+    concurrently by 'fleet_reader'.
+    """
+    data_dir, file_name_format, sheet_name, ignore_file_indices = spec
+    if _is_cx2(file_name_format):
+        return cx2_file_reader(data_dir, file_name_format, sheet_name,
+                               cache=cache, usecols=usecols, compact=compact)
+    return pl_samples_file_reader(data_dir, file_name_format,
+                                  ignore_file_indices, usecols=usecols,
+                                  compact=compact)
+
+
+def _fleet_schema(df_cell):
+    """
+    This function renames the columns of the data of a PL cell to the names
+    of the CX2 and CS2 columns, and converts the matlab datenums in
+    'Date_Time' to timestamps like in the CX2 and CS2 data.
+    """
+    df_cell = df_cell.rename(columns=_PL_FLEET_COLUMNS)
+    if 'Date_Time' not in df_cell:
+        return df_cell
+    if np.issubdtype(df_cell['Date_Time'].dtype, np.number):
+        df_cell['Date_Time'] = datenum_to_datetime64(
+            df_cell['Date_Time'].values.astype(np.float64))
+    elif df_cell['Date_Time'].dtype == np.dtype('O'):
+        df_cell['Date_Time'] = pd.to_datetime(df_cell['Date_Time'],
+                                              errors='coerce')
+    return df_cell
+
+
+def _run(read, spec):
+    # The error of a cell is returned instead of stopping the other cells
+    try:
+        return read(spec), None
+    except Exception as error:
+        return None, error
+
+
+def _result(future):
+    try:
+        return future.result(), None
+    except Exception as error:
+        return None, error
@@ -0,0 +1,132 @@
+"""
+This module reads the CX2 and CS2 cell directories incrementally. The
+cyclers add a new excel file every day, so instead of reading and stitching
+the whole history again, the processed data is kept in a CellStore together
+with the state needed to continue it: the files already read with their size
+and modification time, the running maxima of the cumulative columns used to
+offset the next file and the baselines of the last cycle. Only the new files
+are parsed, stitched and appended to the store.
+"""
+
+import os
+from os.path import join
+import pandas as pd
+import numpy as np
+
+from .battdeg import (CX2_COLUMNS, _CX2_OFFSET_COLUMNS, _carried_capacities,
+                      _check_cx2_inputs, _cx2_file_names, _projection,
+                      _stitch_dataframes, reading_dataframes)
+from .store import CellStore, MANIFEST_NAME
+
+# Version of the state saved in the metadata of the store
+_STATE_VERSION = 1
+
+
+def cx2_incremental_reader(data_dir, file_name_format, sheet_name, store_path,
+                           cache=None, workers=None, usecols=None):
+    """
+    This function brings the store of a CX2 or CS2 cell up to date with the
+    excel files in the cell directory and returns it. The first call reads
+    every file, later calls only read the files added since. If a file which
+    was already read has changed, disappeared or a new file is dated before
+    the files already read, the store is rebuilt from all the files.
+
+    Args:
+    data_dir (string): This is the absolute path to the data directory.
+    file_name_format (string): Format of the filename, used to deduce other files.
+    sheet_name (string): Sheet name containing the data in the excel file.
+    store_path (string): Directory of the CellStore holding the processed data.
+    cache (None, bool, string or SheetCache): On-disk cache for the parsed
+    excel sheets, see 'cx2_file_reader'.
+    workers (int): Number of processes used to parse the new excel files
+    concurrently, see 'cx2_file_reader'.
+    usecols (list, string): Names of the columns to read from the sheets in
+    addition to the columns in 'CX2_COLUMNS'. None reads every column.
+
+    Returns:
+    The CellStore with the same data as the dataframe returned by
+    'cx2_file_reader'. Use 'CellStore.to_dataframe' to get the dataframe.
+    """
+    # Raise an exception if the type of the inputs is not correct
+    _check_cx2_inputs(data_dir, file_name_format, sheet_name)
+
+    if not isinstance(store_path, str):
+        raise TypeError('store_path is not of type string')
+
+    if usecols is not None:
+        usecols = _projection(usecols, CX2_COLUMNS)['usecols']
+
+    path = join(data_dir, file_name_format)
+    sorted_name_list = list(_cx2_file_names(path))
+    fingerprints = [_file_fingerprint(join(path, file_name))
+                    for file_name in sorted_name_list]
+    settings = {'sheet_name': sheet_name, 'usecols': usecols}
+
+    store, state = _load_state(store_path)
+    if state is None or state['settings'] != settings or \
+            state['files'] != fingerprints[:len(state['files'])]:
+        # Nothing to continue from, read all the files into a new store
+        store, state = None, {'version': _STATE_VERSION, 'settings': settings,
+                              'files': [], 'offsets': {}, 'carry': None}
+
+    new_names = sorted_name_list[len(state['files']):]
+    if not new_names and store is not None:
+        return store
+
+    # Read and stitch only the new files, continuing from the saved offsets
+    df_dict = reading_dataframes(new_names, sheet_name, path, cache=cache,
+                                 workers=workers, usecols=usecols)
+    chunks, offsets = _stitch_dataframes(
+        df_dict.values(), _CX2_OFFSET_COLUMNS, state['offsets'])
+    df_new = pd.concat(chunks, ignore_index=True)
+
+    # Calculate the capacities per cycle, continuing the last cycle read
+    carry = state['carry']
+    charge_cycle_ah, discharge_cycle_ah, carry = _carried_capacities(
+        df_new['Cycle_Index'].values, df_new['Charge_Capacity(Ah)'].values,
+        df_new['Discharge_Capacity(Ah)'].values,
+        None if carry is None else tuple(carry))
+    df_new['charge_cycle_ah'] = charge_cycle_ah
+    df_new['discharge_cycle_ah'] = discharge_cycle_ah
+    df_new['capacity_ah'] = charge_cycle_ah - discharge_cycle_ah
+
+    state = {'version': _STATE_VERSION, 'settings': settings,
+             'files': fingerprints,
+             'offsets': {col: _to_json(value) for col, value in offsets.items()},
+             'carry': None if carry is None else [_to_json(v) for v in carry]}
+
+    # The data and the state are saved together in the manifest of the store
+    if store is None:
+        return CellStore.write(store_path, df_new, overwrite=True,
+                               metadata=state)
+    return store.append(df_new, metadata=state)
+
+
+def _load_state(store_path):
+    """
+    This function opens the store and returns it with the saved state, or
+    None for both if there is no usable store.
+    """
+    if not os.path.exists(join(store_path, MANIFEST_NAME)):
+        return None, None
+
+    store = CellStore.open(store_path)
+    state = store.metadata
+    if not isinstance(state, dict) or state.get('version') != _STATE_VERSION:
+        return None, None
+
+    # JSON turns the fingerprint tuples into lists
+    state['files'] = [tuple(fingerprint) for fingerprint in state['files']]
+    return store, state
+
+
+def _file_fingerprint(file_path):
+    stat = os.stat(file_path)
+    return (os.path.basename(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def _to_json(value):
+    # numpy scalars are not JSON serializable
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,322 @@
+"""
+This module times the stages of the reading, training and prediction
+functions, e.g. the listing, parsing, stitching, capacity and formatting
+stages of 'file_reader', without editing the source for a profiler. Every
+stage records its wall time, the number of rows it processed and the peak of
+the memory allocated by python while it ran. The records are kept in memory
+for 'report' and passed to the hooks, e.g. to send them to a metrics system.
+
+The instrumentation is off by default and costs a function call per stage.
+It is turned on with 'instrumentation.enable()', 'instrumentation.recording()'
+or by setting the BATTDEG_INSTRUMENT environment variable before battdeg is
+imported, to 1 for the times and the memory or to 'time' for the times only.
+"""
+
+from contextlib import contextmanager
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import warnings
+import pandas as pd
+
+try:
+    import resource
+except ImportError:
+    # Not available on windows
+    resource = None
+
+# Environment variable turning the instrumentation on
+INSTRUMENT_ENV = 'BATTDEG_INSTRUMENT'
+
+# Columns of the report, one row per stage run
+REPORT_COLUMNS = ['stage', 'seconds', 'rows', 'rows_per_second', 'peak_mb',
+                  'max_rss_mb', 'error']
+
+_MB = 1024 ** 2
+
+
+class Stage(object):
+    """
+    Stage being run, yielded by 'Instrumentation.stage'. The number of rows
+    can be set once it is known, e.g. after a file is parsed.
+    """
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+
+
+class Instrumentation(object):
+    """
+    Recorder of the wall time, rows and peak memory of named stages.
+
+    Args:
+        enabled (bool): Whether the stages are recorded.
+        trace_memory (bool): Whether the peak memory is measured with
+        tracemalloc, which slows down the allocations while a stage runs.
+    """
+
+    def __init__(self, enabled=False, trace_memory=True):
+        self.enabled = enabled
+        self.trace_memory = trace_memory
+        self._records = []
+        self._hooks = []
+        self._lock = threading.Lock()
+        # Each thread has its own stack of running stages
+        self._local = threading.local()
+        # Memory of the outer stages, shared by the threads as tracemalloc is
+        self._memory_lock = threading.RLock()
+        self._memory_frames = []
+        self._memory_offset = 0
+        self._started_tracing = False
+
+    @classmethod
+    def from_env(cls):
+        """
+        This function returns an instrumentation enabled by the
+        BATTDEG_INSTRUMENT environment variable: '0', 'false' or unset leave
+        it off and 'time' records the times and rows only.
+        """
+        value = os.environ.get(INSTRUMENT_ENV, '').strip().lower()
+        if value in ['', '0', 'false', 'no', 'off']:
+            return cls()
+        return cls(enabled=True, trace_memory=value != 'time')
+
+    def enable(self, trace_memory=None):
+        """
+        This function starts recording the stages.
+
+        Args:
+            trace_memory (bool): Whether the peak memory is measured, None
+            keeps the current setting.
+        """
+        if trace_memory is not None:
+            self.trace_memory = trace_memory
+        self.enabled = True
+
+    def disable(self):
+        """
+        This function stops recording the stages. The records are kept.
+        """
+        self.enabled = False
+
+    @contextmanager
+    def recording(self, trace_memory=None, reset=True):
+        """
+        This function records the stages run in a with block and restores
+        the previous setting after it, e.g.
+
+            with instrumentation.recording() as recorder:
+                file_reader(data_dir, 'CX2_16', 1, [])
+            print(recorder.report())
+
+        Args:
+            trace_memory (bool): Whether the peak memory is measured, None
+            keeps the current setting.
+            reset (bool): Whether the previous records are dropped first.
+        """
+        previous = (self.enabled, self.trace_memory)
+        if reset:
+            self.reset()
+        self.enable(trace_memory)
+        try:
+            yield self
+        finally:
+            self.enabled, self.trace_memory = previous
+
+    def add_hook(self, hook):
+        """
+        This function registers a function called with the record of every
+        stage when it ends: a dictionary with the keys of 'REPORT_COLUMNS'.
+        The errors raised by a hook are turned into warnings.
+        """
+        if not callable(hook):
+            raise TypeError('hook is not callable')
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook):
+        """
+        This function unregisters a hook added by 'add_hook'.
+        """
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def reset(self):
+        """
+        This function drops the records.
+        """
+        with self._lock:
+            self._records = []
+
+    def records(self):
+        """
+        This function returns the list of the records of the stages, in the
+        order the stages started.
+        """
+        with self._lock:
+            return [dict(record) for record in self._records
+                    if record['seconds'] is not None]
+
+    def report(self, aggregate=False):
+        """
+        This function returns the records of the stages as a dataframe.
+
+        Args:
+            aggregate (bool): Whether to sum the runs of each stage, with
+            the number of 'calls', instead of one row per run.
+
+        Returns:
+            A dataframe with the columns of 'REPORT_COLUMNS'. A stage run
+            within another stage is named after both, e.g.
+            'file_reader/cx2_file_reader/parsing'. The rows per second and
+            the rows are missing when the rows are unknown, and the memory
+            columns when the memory is not measured.
+        """
+        df_report = pd.DataFrame(self.records(), columns=REPORT_COLUMNS)
+        if not aggregate:
+            return df_report
+
+        grouped = df_report.groupby('stage', sort=False)
+        df_total = grouped.agg({'seconds': 'sum', 'peak_mb': 'max',
+                                'max_rss_mb': 'max'})
+        df_total['rows'] = grouped['rows'].sum(min_count=1)
+        df_total['calls'] = grouped.size()
+        df_total['errors'] = grouped['error'].count()
+        df_total['rows_per_second'] = df_total['rows'] / df_total['seconds']
+        return df_total.reset_index()[[
+            'stage', 'calls', 'seconds', 'rows', 'rows_per_second', 'peak_mb',
+            'max_rss_mb', 'errors']]
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """
+        This function records the stage run in a with block, when the
+        instrumentation is enabled.
+
+        Args:
+            name (string): Name of the stage.
+            rows (int): Number of rows processed, which can also be set on
+            the yielded 'Stage' when it is only known at the end.
+        """
+        stage = Stage(name, rows)
+        if not self.enabled:
+            yield stage
+            return
+
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        full_name = '/'.join([s.name for s in stack] + [name])
+        record = dict.fromkeys(REPORT_COLUMNS)
+        record['stage'] = full_name
+        with self._lock:
+            self._records.append(record)
+
+        trace = self.trace_memory
+        if trace:
+            frame = self._enter_memory()
+        stack.append(stage)
+        start = time.perf_counter()
+        try:
+            yield stage
+        except BaseException as error:
+            record['error'] = repr(error)
+            raise
+        finally:
+            record['seconds'] = time.perf_counter() - start
+            stack.pop()
+            if trace:
+                record['peak_mb'] = self._exit_memory(frame) / _MB
+            record['max_rss_mb'] = _max_rss_mb()
+            if stage.rows is not None:
+                record['rows'] = int(stage.rows)
+                if record['seconds'] > 0:
+                    record['rows_per_second'] = \
+                        record['rows'] / record['seconds']
+            self._call_hooks(record)
+
+    def _call_hooks(self, record):
+        with self._lock:
+            hooks = list(self._hooks)
+        for hook in hooks:
+            # A broken metrics system should not stop the reading
+            try:
+                hook(dict(record))
+            except Exception as error:
+                warnings.warn('instrumentation hook {!r} failed: {!r}'
+                              .format(hook, error))
+
+    def _enter_memory(self):
+        """
+        This function starts measuring the peak memory of a stage. The peak
+        of tracemalloc is reset for the stage, so the peak seen so far is
+        first kept for the stages which are still running.
+        """
+        with self._memory_lock:
+            if not self._memory_frames and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+                self._memory_offset = 0
+            current, peak = self._traced()
+            for frame in self._memory_frames:
+                frame[1] = max(frame[1], peak)
+            self._reset_peak()
+            frame = [current, current]
+            self._memory_frames.append(frame)
+            return frame
+
+    def _exit_memory(self, frame):
+        """
+        This function returns the peak of the memory allocated by the stage
+        ending, in bytes, above the memory allocated when it started.
+        """
+        with self._memory_lock:
+            _, peak = self._traced()
+            # The stages of other threads may have started since this one
+            self._memory_frames = [other for other in self._memory_frames
+                                   if other is not frame]
+            for other in self._memory_frames:
+                other[1] = max(other[1], peak)
+            if not self._memory_frames and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+            else:
+                self._reset_peak()
+            return max(frame[1], peak) - frame[0]
+
+    def _traced(self):
+        current, peak = tracemalloc.get_traced_memory()
+        return current + self._memory_offset, peak + self._memory_offset
+
+    def _reset_peak(self):
+        if hasattr(tracemalloc, 'reset_peak'):
+            tracemalloc.reset_peak()
+            return
+        # Before python 3.9 the peak is reset by restarting the tracing, with
+        # the memory traced until then kept as an offset. The memory freed
+        # after the restart is then not subtracted, so the peaks are upper
+        # bounds.
+        self._memory_offset += tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        tracemalloc.start()
+
+
+def _max_rss_mb():
+    """
+    This function returns the largest resident memory of the process so far,
+    which includes the memory of the compiled libraries, in megabytes.
+    """
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on linux, bytes on macos
+    if sys.platform == 'darwin':
+        return max_rss / _MB
+    return max_rss / 1024
+
+
+# Instrumentation of the functions of the package
+instrumentation = Instrumentation.from_env()
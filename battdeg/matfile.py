@@ -0,0 +1,352 @@
+"""
+This module reads the PL Samples data directly from MATLAB v7.3 ``.mat``
+files, which are HDF5 files, without exporting them to csv first. The file
+is opened lazily with h5py and only the channels and rows which are asked
+for are read from the disk.
+
+Every test segment, i.e. the data of one 'PL12(n).csv' file, is expected to
+be a MATLAB struct with one numeric vector per channel ('Time_sec', 'Cycle',
+'Current_Amp', ...). The segments can be top level variables, the fields of
+a struct or the elements of a cell array. MATLAB tables are opaque objects
+in the HDF5 file and can not be read, convert them to structs before saving,
+e.g. ``PL03{2,3} = table2struct(PL03{2,3}, 'ToScalar', true);`` followed by
+``save('PL03.mat', 'PL03', '-v7.3')``.
+"""
+
+import os
+import re
+import pandas as pd
+import numpy as np
+
+from .battdeg import (PL_COLUMNS, _PL_OFFSET_COLUMNS, _carried_capacities,
+                      _stitch_dataframes, concat_dict_dataframes,
+                      get_cycle_capacities)
+
+
+class MatCellFile(object):
+    """
+    Lazy reader of the PL Samples data in a MATLAB v7.3 file.
+
+    Args:
+        path (string): Path of the .mat file.
+    """
+
+    def __init__(self, path):
+        if not isinstance(path, str):
+            raise TypeError('path is not of type string')
+
+        if not os.path.exists(path):
+            raise FileNotFoundError('File {} not found'.format(path))
+
+        # h5py is only needed to read the .mat files
+        import h5py
+
+        if not h5py.is_hdf5(path):
+            raise ValueError('{} is not a MATLAB v7.3 (HDF5) file, save it '
+                             "with save(..., '-v7.3')".format(path))
+
+        self.path = path
+        self._file = h5py.File(path, 'r')
+        try:
+            self._segments = _find_segments(self._file)
+        except ValueError:
+            self.close()
+            raise
+        if not self._segments:
+            self.close()
+            raise ValueError('no struct with the channels {} found in {}'
+                             .format(', '.join(PL_COLUMNS), path))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """
+        This function closes the file.
+        """
+        self._file.close()
+
+    @property
+    def segment_numbers(self):
+        """
+        Numbers of the segments in the file, starting from 1 like the csv
+        files 'PL12(1).csv', 'PL12(2).csv', ...
+        """
+        return list(range(1, len(self._segments) + 1))
+
+    def channels(self, segment):
+        """
+        This function returns the names of the channels of a segment.
+        """
+        return list(self._group(segment).keys())
+
+    def segment_length(self, segment):
+        """
+        This function returns the number of rows of a segment.
+        """
+        return _vector_length(self._group(segment)['Cycle'])
+
+    def read_channel(self, segment, name, start=None, stop=None):
+        """
+        This function reads the rows start to stop of a channel of a segment.
+
+        Returns:
+            1-D numpy array with the values of the channel.
+        """
+        dataset = self._group(segment)[name]
+        return _read_vector(dataset, slice(start, stop))
+
+    def cycle_rows(self, segment, first_cycle, last_cycle):
+        """
+        This function finds the rows of a segment holding the cycles numbered
+        from 'first_cycle' up to, but not including, 'last_cycle', as numbered
+        in the segment. The cycle numbers are found by bisection, reading only
+        a few values of the 'Cycle' channel.
+
+        Returns:
+            The first row and the row after the last row, as a tuple.
+        """
+        dataset = self._group(segment)['Cycle']
+        return (_bisect_vector(dataset, first_cycle),
+                _bisect_vector(dataset, last_cycle))
+
+    def read_segments(self, usecols=None, ignore_file_indices=None):
+        """
+        This function reads the segments into a dictionary of dataframes with
+        the same schema as 'get_dict_files', to be used with
+        'concat_dict_dataframes' and 'get_cycle_capacities'.
+
+        Args:
+            usecols (list, string): Names of the channels to read in addition
+            to the channels in 'PL_COLUMNS'. None reads every channel.
+            ignore_file_indices (list, int): Numbers of the segments to ignore.
+
+        Returns:
+            Dictionary with the segment numbers as keys and the dataframes of
+            the segments as values, in ascending order.
+        """
+        dict_segments = {}
+        for segment in self._wanted_segments(ignore_file_indices):
+            columns = self._columns(segment, usecols)
+            dict_segments[segment] = pd.DataFrame(
+                {col: self.read_channel(segment, col) for col in columns},
+                columns=columns)
+        return dict_segments
+
+    def read_cycles(self, first_cycle, last_cycle, usecols=None,
+                    ignore_file_indices=None):
+        """
+        This function reads the cycles numbered from 'first_cycle' up to, but
+        not including, 'last_cycle' after stitching the segments, i.e. as
+        numbered in the dataframe of 'concat_dict_dataframes'. Only the rows of
+        these cycles are read, together with the last row of every segment and
+        the row before the first cycle. The cumulative channels are assumed to
+        never decrease within a segment, so that their last value is their
+        maximum.
+
+        Returns:
+            The stitched dataframe of the cycles and the last row before the
+            first cycle as a tuple (cycle, charge_ah, discharge_ah), or None
+            if the first cycle is the start of the data.
+        """
+        offsets = {}
+        previous_row = None
+        chunks = []
+        for segment in self._wanted_segments(ignore_file_indices):
+            n_rows = self.segment_length(segment)
+            if n_rows == 0:
+                continue
+            cycle_offset = offsets.get('Cycle', 0)
+            begin_value, end_value = self.cycle_rows(
+                segment, first_cycle - cycle_offset, last_cycle - cycle_offset)
+
+            if end_value > begin_value:
+                columns = self._columns(segment, usecols)
+                df_segment = pd.DataFrame(
+                    {col: self.read_channel(segment, col, begin_value, end_value)
+                     for col in columns}, columns=columns)
+                df_segment, _ = _stitch_dataframes(
+                    [df_segment], _PL_OFFSET_COLUMNS, offsets)
+                chunks.append(df_segment[0])
+                if begin_value > 0 and len(chunks) == 1:
+                    previous_row = self._stitched_row(segment, begin_value - 1,
+                                                      offsets)
+
+            # The next segment continues from the last values of this one
+            last_row = {col: self.read_channel(segment, col, n_rows - 1, n_rows)
+                        for col in _PL_OFFSET_COLUMNS}
+            _, offsets = _stitch_dataframes(
+                [pd.DataFrame(last_row)], _PL_OFFSET_COLUMNS, offsets)
+            if not chunks:
+                previous_row = (offsets['Cycle'], offsets['Charge_Ah'],
+                                offsets['Discharge_Ah'])
+            elif end_value < n_rows:
+                break
+
+        if not chunks:
+            return None, previous_row
+        return pd.concat(chunks, ignore_index=True), previous_row
+
+    def _stitched_row(self, segment, row, offsets):
+        values = [self.read_channel(segment, col, row, row + 1)[0] +
+                  offsets.get(col, 0)
+                  for col in ['Cycle', 'Charge_Ah', 'Discharge_Ah']]
+        return tuple(values)
+
+    def _wanted_segments(self, ignore_file_indices):
+        ignore_file_indices = set(ignore_file_indices or [])
+        return [segment for segment in self.segment_numbers
+                if segment not in ignore_file_indices]
+
+    def _columns(self, segment, usecols):
+        channels = self.channels(segment)
+        if usecols is None:
+            return channels
+        columns = list(usecols) + [col for col in PL_COLUMNS
+                                   if col not in usecols]
+        missing = [col for col in columns if col not in channels]
+        if missing:
+            raise KeyError('channels {} not found in segment {}'
+                           .format(', '.join(missing), segment))
+        return columns
+
+    def _group(self, segment):
+        if segment not in self.segment_numbers:
+            raise KeyError('segment {} not found in {}'
+                           .format(segment, self.path))
+        return self._segments[segment - 1]
+
+
+def pl_samples_mat_reader(mat_path, ignore_file_indices=None, usecols=None,
+                          cycles=None):
+    """
+    This function reads in the data for PL Samples experiment from a MATLAB
+    v7.3 file and returns the same dataframe as 'pl_samples_file_reader'
+    returns for the csv files exported from it.
+
+    Args:
+        mat_path (string): Path of the .mat file.
+        ignore_file_indices (list, int): Numbers of the segments to ignore.
+        usecols (list, string): Names of the channels to read in addition to
+        the channels in 'PL_COLUMNS'. None reads every channel.
+        cycles (tuple, int): The first cycle and the cycle after the last
+        cycle to read, numbered as in the output. None reads every cycle.
+
+    Returns:
+        The test data in a dataframe with extra column for capacity in Ah.
+    """
+    if ignore_file_indices is None:
+        ignore_file_indices = []
+
+    if not isinstance(ignore_file_indices, list):
+        raise TypeError("ignore_file_indices should be a list")
+
+    if cycles is not None and (not isinstance(cycles, (tuple, list)) or
+                               len(cycles) != 2):
+        raise TypeError('cycles should be a tuple (first_cycle, last_cycle)')
+
+    with MatCellFile(mat_path) as mat_file:
+        if cycles is None:
+            dict_segments = mat_file.read_segments(usecols, ignore_file_indices)
+            return get_cycle_capacities(concat_dict_dataframes(dict_segments))
+
+        df_cycles, previous_row = mat_file.read_cycles(
+            cycles[0], cycles[1], usecols, ignore_file_indices)
+
+    if df_cycles is None:
+        return None
+
+    # The first cycle read starts from the last values of the previous cycle
+    carry = None
+    if previous_row is not None:
+        carry = tuple(previous_row) + tuple(previous_row[1:])
+    charge_cycle_ah, discharge_cycle_ah, _ = _carried_capacities(
+        df_cycles['Cycle'].values, df_cycles['Charge_Ah'].values,
+        df_cycles['Discharge_Ah'].values, carry)
+    df_cycles['charge_cycle_ah'] = charge_cycle_ah
+    df_cycles['discharge_cycle_ah'] = discharge_cycle_ah
+    df_cycles['capacity_ah'] = charge_cycle_ah - discharge_cycle_ah
+    df_cycles.rename(columns={'Current_Amp': 'Current(A)',
+                              'Voltage_Volt': 'Voltage(V)'}, inplace=True)
+    return df_cycles
+
+
+def _find_segments(mat_file):
+    """
+    This function finds the groups holding the channels of a segment in the
+    order of the variables, struct fields and cell array elements.
+    """
+    segments = []
+    for name in _natural_sort(mat_file.keys()):
+        # Groups starting with '#' hold the data of references and objects
+        if not name.startswith('#'):
+            _collect_segments(mat_file, mat_file[name], segments)
+    return segments
+
+
+def _collect_segments(mat_file, node, segments):
+    import h5py
+
+    matlab_class = node.attrs.get('MATLAB_class', b'')
+    if isinstance(matlab_class, bytes):
+        matlab_class = matlab_class.decode()
+
+    if isinstance(node, h5py.Group):
+        if set(PL_COLUMNS).issubset(node.keys()):
+            segments.append(node)
+        else:
+            for name in _natural_sort(node.keys()):
+                _collect_segments(mat_file, node[name], segments)
+    elif matlab_class == 'cell':
+        # The references of a cell array, in the MATLAB column-major order
+        for ref in node[()].ravel():
+            if ref:
+                _collect_segments(mat_file, mat_file[ref], segments)
+    elif matlab_class in ('table', 'timetable') or \
+            'MATLAB_object_decode' in node.attrs:
+        raise ValueError('MATLAB {} objects can not be read, convert them '
+                         'with table2struct before saving'
+                         .format(matlab_class or 'class'))
+
+
+def _natural_sort(names):
+    # Sort 'seg2' before 'seg10'
+    return sorted(names, key=lambda name: [
+        int(part) if part.isdigit() else part
+        for part in re.split(r'(\d+)', name)])
+
+
+def _vector_length(dataset):
+    return int(np.prod(dataset.shape)) if dataset.shape else 1
+
+
+def _read_vector(dataset, rows):
+    """
+    This function reads rows of a MATLAB vector, which is stored as a
+    (1, n) or (n, 1) dataset, without reading the rest of the vector.
+    """
+    if len(dataset.shape) == 2 and dataset.shape[0] == 1:
+        return dataset[0, rows]
+    if len(dataset.shape) == 2 and dataset.shape[1] == 1:
+        return dataset[rows, 0]
+    if len(dataset.shape) == 1:
+        return dataset[rows]
+    raise ValueError('the dataset {} is not a vector'.format(dataset.name))
+
+
+def _bisect_vector(dataset, value):
+    """
+    This function returns the first row of an ascending vector whose value is
+    not less than 'value', reading a logarithmic number of values.
+    """
+    low, high = 0, _vector_length(dataset)
+    while low < high:
+        middle = (low + high) // 2
+        if _read_vector(dataset, slice(middle, middle + 1))[0] < value:
+            low = middle + 1
+        else:
+            high = middle
+    return low
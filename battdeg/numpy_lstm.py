@@ -0,0 +1,302 @@
+"""
+This module runs the trained LSTM models with numpy only, so that the
+discharge capacity can be predicted without importing keras and tensorflow.
+The weights of a model are read from its keras HDF5 file, or exported once to
+a .npz file which only needs numpy to be loaded, and the forward pass of the
+LSTM and Dense layers is computed for a whole batch of windows with a few
+matrix products. The predictions match the keras predictions up to the
+rounding of float32 arithmetic.
+"""
+
+import json
+import os
+import numpy as np
+
+# Layers of a sequential model which can be run with numpy
+_LAYERS = ['LSTM', 'Dense']
+
+# Layers without effect at prediction time
+_SKIPPED_LAYERS = ['InputLayer', 'Dropout']
+
+# Number of windows predicted at a time when no batch size is given
+_DEFAULT_BATCH_SIZE = 65536
+
+
+def _hard_sigmoid(x):
+    # Definition of keras 2 and tensorflow 1
+    return np.clip(0.2 * x + 0.5, 0., 1.)
+
+
+def _hard_sigmoid_v3(x):
+    # Definition of keras 3
+    return np.clip(x / 6. + 0.5, 0., 1.)
+
+
+def _sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+_ACTIVATIONS = {
+    'linear': lambda x: x,
+    'tanh': np.tanh,
+    'sigmoid': _sigmoid,
+    'hard_sigmoid': _hard_sigmoid,
+    'hard_sigmoid_v3': _hard_sigmoid_v3,
+    'relu': lambda x: np.maximum(x, 0.)}
+
+
+class NumpyLSTM(object):
+    """
+    Sequential model of LSTM and Dense layers predicting with numpy. It can be
+    used as the 'model' of 'model_prediction' and 'model_prediction_stream',
+    and loaded by a 'ModelRegistry' with 'NumpyLSTM.load' as loader.
+
+    Args:
+        layers (list): Dictionaries describing the layers in order, with the
+        'class_name' ('LSTM' or 'Dense'), the 'weights' as a list of arrays in
+        the order of keras, the 'activation' and, for the LSTM layers, the
+        'recurrent_activation' and whether they 'return_sequences'.
+    """
+
+    def __init__(self, layers):
+        if not isinstance(layers, list) or not layers:
+            raise TypeError('layers should be a non-empty list')
+        for layer in layers:
+            if layer['class_name'] not in _LAYERS:
+                raise ValueError('the layer {} can not be run with numpy'
+                                 .format(layer['class_name']))
+            for key in ['activation', 'recurrent_activation']:
+                if key in layer and layer[key] not in _ACTIVATIONS:
+                    raise ValueError('the activation {} can not be run with '
+                                     'numpy'.format(layer[key]))
+        self.layers = [dict(layer, weights=[np.asarray(w, dtype=np.float32)
+                                            for w in layer['weights']])
+                       for layer in layers]
+
+    @classmethod
+    def from_h5(cls, model_path):
+        """
+        This function reads the layers of a model saved by keras in an HDF5
+        file, e.g. 'models/lstm_trained_model.h5'.
+        """
+        _check_path(model_path)
+        import h5py
+
+        with h5py.File(model_path, 'r') as model_file:
+            if 'model_config' not in model_file.attrs:
+                raise ValueError('{} is not a keras model file'
+                                 .format(model_path))
+            config = json.loads(_text(model_file.attrs['model_config']))
+            keras_version = _text(model_file.attrs.get('keras_version', '2'))
+            weights_group = model_file['model_weights'] \
+                if 'model_weights' in model_file else model_file
+            layers = []
+            for layer_config in _layer_configs(config):
+                group = weights_group[layer_config['config']['name']]
+                weights = [group[_text(name)][()]
+                           for name in group.attrs['weight_names']]
+                layers.append(_layer(layer_config['class_name'],
+                                     layer_config['config'], weights,
+                                     keras_version))
+        return cls(layers)
+
+    @classmethod
+    def from_keras(cls, model):
+        """
+        This function copies the layers of a keras sequential model.
+        """
+        import keras
+
+        layers = []
+        for keras_layer in model.layers:
+            class_name = keras_layer.__class__.__name__
+            if class_name in _SKIPPED_LAYERS:
+                continue
+            layers.append(_layer(class_name, keras_layer.get_config(),
+                                 keras_layer.get_weights(), keras.__version__))
+        return cls(layers)
+
+    @classmethod
+    def load(cls, path):
+        """
+        This function loads a model exported by 'save' (.npz) or saved by
+        keras (.h5).
+        """
+        _check_path(path)
+        if not path.endswith('.npz'):
+            return cls.from_h5(path)
+
+        with np.load(path, allow_pickle=False) as arrays:
+            layers = json.loads(str(arrays['layers']))
+            for i, layer in enumerate(layers):
+                layer['weights'] = [arrays['layer{}_weight{}'.format(i, j)]
+                                    for j in range(layer.pop('n_weights'))]
+        return cls(layers)
+
+    def save(self, path):
+        """
+        This function saves the layers of the model to a .npz file.
+        """
+        arrays = {}
+        layers = []
+        for i, layer in enumerate(self.layers):
+            for j, weight in enumerate(layer['weights']):
+                arrays['layer{}_weight{}'.format(i, j)] = weight
+            description = {key: value for key, value in layer.items()
+                           if key != 'weights'}
+            description['n_weights'] = len(layer['weights'])
+            layers.append(description)
+        np.savez(path, layers=np.array(json.dumps(layers)), **arrays)
+
+    def predict(self, x, batch_size=None, verbose=0):
+        """
+        This function predicts the response for the input windows.
+
+        Args:
+            x (array): Input windows of shape [samples, timesteps, features].
+            batch_size (int): Number of windows computed at a time, which
+            bounds the memory of the intermediate arrays.
+            verbose: Ignored, accepted like in keras.
+
+        Returns:
+            The float32 array of the predicted responses, one row per window.
+        """
+        x = np.asarray(x, dtype=np.float32)
+        if x.ndim != 3:
+            raise ValueError('x should have the shape [samples, timesteps, '
+                             'features]')
+        if batch_size is None:
+            batch_size = _DEFAULT_BATCH_SIZE
+        n_out = self.layers[-1]['weights'][0].shape[-1]
+        y = np.empty((len(x), n_out), dtype=np.float32)
+        for start in range(0, len(x), batch_size):
+            y[start:start + batch_size] = self._forward(
+                x[start:start + batch_size])
+        return y
+
+    def predict_on_batch(self, x):
+        return self.predict(x, batch_size=max(len(x), 1))
+
+    def _forward(self, values):
+        for layer in self.layers:
+            if layer['class_name'] == 'LSTM':
+                values = _lstm_forward(values, layer)
+            else:
+                kernel, bias = layer['weights']
+                values = _ACTIVATIONS[layer['activation']](
+                    np.dot(values, kernel) + bias)
+        return values
+
+
+def export_numpy_model(model_path, out_path):
+    """
+    This function exports the weights of a keras model file to a .npz file
+    which 'NumpyLSTM.load' reads with numpy only.
+
+    Args:
+        model_path (string): Path of the keras HDF5 model file.
+        out_path (string): Path of the .npz file to write.
+
+    Returns:
+        The path of the .npz file.
+    """
+    if not isinstance(out_path, str):
+        raise TypeError('out_path is not of type string')
+    if not out_path.endswith('.npz'):
+        out_path += '.npz'
+    NumpyLSTM.from_h5(model_path).save(out_path)
+    return out_path
+
+
+def _lstm_forward(x, layer):
+    """
+    This function computes the output of an LSTM layer for a batch of
+    windows, with the gates in the keras order input, forget, cell, output.
+    """
+    kernel, recurrent_kernel, bias = layer['weights']
+    activation = _ACTIVATIONS[layer['activation']]
+    recurrent_activation = _ACTIVATIONS[layer['recurrent_activation']]
+    n_samples, n_steps, n_features = x.shape
+    units = recurrent_kernel.shape[0]
+
+    # The input part of the gates is computed for all the timesteps at once
+    z = (np.dot(x.reshape(-1, n_features), kernel) + bias).reshape(
+        n_samples, n_steps, 4 * units)
+
+    if n_steps == 1 and not layer['return_sequences']:
+        # The states start at zero, so the forget gate and the recurrent
+        # kernel have no effect on a single timestep
+        z = z[:, 0]
+        cell = recurrent_activation(z[:, :units]) * \
+            activation(z[:, 2 * units:3 * units])
+        return recurrent_activation(z[:, 3 * units:]) * activation(cell)
+
+    hidden = np.zeros((n_samples, units), dtype=np.float32)
+    cell = np.zeros((n_samples, units), dtype=np.float32)
+    outputs = []
+    for step in range(n_steps):
+        gates = z[:, step] + np.dot(hidden, recurrent_kernel)
+        cell = recurrent_activation(gates[:, units:2 * units]) * cell + \
+            recurrent_activation(gates[:, :units]) * \
+            activation(gates[:, 2 * units:3 * units])
+        hidden = recurrent_activation(gates[:, 3 * units:]) * activation(cell)
+        outputs.append(hidden)
+    if layer['return_sequences']:
+        return np.stack(outputs, axis=1)
+    return hidden
+
+
+def _layer(class_name, config, weights, keras_version):
+    """
+    This function returns the description of a layer from its keras config.
+    """
+    if class_name not in _LAYERS:
+        raise ValueError('the layer {} can not be run with numpy'
+                         .format(class_name))
+    layer = {'class_name': class_name, 'weights': list(weights),
+             'activation': _activation(config['activation'], keras_version)}
+    if class_name == 'LSTM':
+        if config.get('go_backwards') or config.get('stateful') or \
+                not config.get('use_bias', True):
+            raise ValueError('the LSTM layer {} can not be run with numpy'
+                             .format(config['name']))
+        layer['recurrent_activation'] = _activation(
+            config['recurrent_activation'], keras_version)
+        layer['return_sequences'] = bool(config.get('return_sequences'))
+    elif not config.get('use_bias', True):
+        layer['weights'].append(np.zeros(weights[0].shape[-1]))
+    return layer
+
+
+def _activation(name, keras_version):
+    if isinstance(name, dict):
+        # Serialized activation objects of keras 3
+        name = name.get('config', {}).get('name', name.get('class_name'))
+    if name == 'hard_sigmoid' and int(str(keras_version).split('.')[0]) >= 3:
+        return 'hard_sigmoid_v3'
+    return name
+
+
+def _layer_configs(config):
+    """
+    This function returns the configs of the layers of a sequential model
+    which have weights, in order.
+    """
+    if config.get('class_name') != 'Sequential':
+        raise ValueError('only sequential models can be run with numpy')
+    layers = config['config']
+    if isinstance(layers, dict):
+        layers = layers['layers']
+    return [layer for layer in layers
+            if layer['class_name'] not in _SKIPPED_LAYERS]
+
+
+def _check_path(path):
+    if not isinstance(path, str):
+        raise TypeError('path is not of type string')
+    if not os.path.exists(path):
+        raise FileNotFoundError('Model {} not found'.format(path))
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else str(value)
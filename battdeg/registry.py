@@ -0,0 +1,129 @@
+"""
+This module keeps the trained keras models loaded in memory. Loading a model
+from its HDF5 file and rebuilding the graph takes much longer than predicting
+a few thousand points, so every model file is loaded once per process and
+reused until the file is modified. The number of models kept in memory is
+bounded and the least recently used model is dropped first.
+"""
+
+from collections import OrderedDict
+import os
+from os.path import join
+import threading
+
+# Trained model used by 'model_prediction' when no model is given
+DEFAULT_MODEL_PATH = join(os.path.dirname(os.path.abspath(__file__)),
+                          'models', 'lstm_trained_model.h5')
+
+# Default number of models kept in memory
+DEFAULT_MAX_MODELS = 4
+
+
+class ModelRegistry(object):
+    """
+    Size-bounded cache of loaded models, keyed by the path of the model file.
+
+    Args:
+        max_models (int): Number of models kept in memory.
+        loader (callable): Function loading a model from a path. Defaults to
+        'keras.models.load_model'.
+    """
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, loader=None):
+        if not isinstance(max_models, int) or max_models < 1:
+            raise TypeError('max_models should be a positive integer')
+
+        self.max_models = max_models
+        self.loader = _load_model if loader is None else loader
+        self._models = OrderedDict()
+        # The registry is shared by the threads of the process
+        self._lock = threading.Lock()
+
+    def get(self, path=DEFAULT_MODEL_PATH):
+        """
+        This function returns the model saved in a file, loading it only if
+        it is not in memory or if the file was modified since it was loaded.
+
+        Args:
+            path (string): Path of the model file.
+
+        Returns:
+            The loaded model.
+        """
+        if not isinstance(path, str):
+            raise TypeError('path is not of type string')
+
+        if not os.path.exists(path):
+            raise FileNotFoundError('Model {} not found'.format(path))
+
+        key = os.path.abspath(path)
+        with self._lock:
+            fingerprint = _fingerprint(key)
+            entry = self._models.get(key)
+            if entry is not None and entry[0] == fingerprint:
+                # Mark the model as recently used
+                self._models.move_to_end(key)
+                return entry[1]
+
+            model = self.loader(key)
+            self._models[key] = (fingerprint, model)
+            self._models.move_to_end(key)
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+            return model
+
+    def resolve(self, model=None):
+        """
+        This function converts the 'model' argument accepted by the
+        prediction functions into a model.
+
+        Args:
+            model (None, string or model): None uses the default trained
+            model, a string is the path of a model file and any other value
+            is used as the model.
+
+        Returns:
+            The model.
+        """
+        if model is None:
+            return self.get(DEFAULT_MODEL_PATH)
+        if isinstance(model, str):
+            return self.get(model)
+        if not hasattr(model, 'predict'):
+            raise TypeError('model should be None, a path or a model')
+        return model
+
+    def evict(self, path):
+        """
+        This function drops the model of a file from memory, if it is loaded.
+        """
+        with self._lock:
+            self._models.pop(os.path.abspath(path), None)
+
+    def clear(self):
+        """
+        This function drops all the models from memory.
+        """
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+    def __contains__(self, path):
+        return os.path.abspath(path) in self._models
+
+
+def _load_model(path):
+    # keras is only imported when the first model is loaded
+    from keras.models import load_model
+    return load_model(path)
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+# Registry shared by the whole process
+model_registry = ModelRegistry()
@@ -0,0 +1,395 @@
+"""
+This module stores the processed cycling data of a cell, i.e. the dataframe
+returned by 'cx2_file_reader' or 'pl_samples_file_reader', as a directory of
+raw little-endian column files. The columns are opened with numpy.memmap, so
+reading a store does not parse or copy the data and several processes reading
+the same store share the page cache. A small index with the first row of every
+cycle gives the rows of a range of cycles without scanning the data.
+"""
+
+import json
+import os
+from os.path import join
+import tempfile
+import pandas as pd
+import numpy as np
+
+from .battdeg import cycle_start_indices
+
+# Name of the file describing the columns of the store
+MANIFEST_NAME = 'manifest.json'
+
+# Names of the files holding the cycle index. Every append writes the index
+# to files with the next version number in their names, so the files named
+# in the manifest are never modified.
+_CYCLE_STARTS_FILE = 'cycle_starts{}.bin'
+_CYCLE_NUMBERS_FILE = 'cycle_numbers{}.bin'
+
+# Columns which can hold the cycle number, in order of preference
+_CYCLE_COLUMNS = ['Cycle_Index', 'Cycle']
+
+
+class CellStore(object):
+    """
+    Memory-mapped, read-only view of the processed data of a cell.
+    Use 'CellStore.write' to create a store and 'CellStore.open' to read it.
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self.n_rows = manifest['n_rows']
+        self.cycle_column = manifest['cycle_column']
+        self._columns = {}
+        starts_file, numbers_file = _cycle_index_files(manifest)
+        self.cycle_starts = self._map(starts_file, '<i8',
+                                      manifest['n_cycles'] + 1)
+        self.cycle_numbers = self._map(numbers_file, manifest['cycle_dtype'],
+                                       manifest['n_cycles'])
+
+    @classmethod
+    def write(cls, path, df_data, cycle_column=None, overwrite=False,
+              metadata=None):
+        """
+        This function writes the columns of a dataframe and the cycle index
+        to a store directory.
+
+        Args:
+            path (string): Directory of the store, created if needed.
+            df_data (pandas.DataFrame): Processed data of the cell, with the
+            rows of a cycle next to each other.
+            cycle_column (string): Name of the column with the cycle number.
+            Defaults to 'Cycle_Index' or 'Cycle', whichever is present.
+            overwrite (bool): Whether to replace an existing store.
+            metadata (dict): JSON serializable data saved with the store.
+
+        Returns:
+            The CellStore opened on the written directory.
+        """
+        if not isinstance(path, str):
+            raise TypeError('path is not of type string')
+
+        if not isinstance(df_data, pd.DataFrame):
+            raise TypeError('df_data is not of type pandas dataframe')
+
+        if cycle_column is None:
+            cycle_column = next(
+                (col for col in _CYCLE_COLUMNS if col in df_data.columns), None)
+        if cycle_column not in df_data.columns:
+            raise Exception("the dataframe doesnt have the cycle column " +
+                            "'Cycle_Index' or 'Cycle'")
+
+        _check_dtypes(df_data)
+
+        if os.path.exists(join(path, MANIFEST_NAME)) and not overwrite:
+            raise FileExistsError('a cell store already exists in {}'
+                                  .format(path))
+        os.makedirs(path, exist_ok=True)
+
+        # Remove the manifest first, so a partially overwritten store
+        # can never be opened
+        old_column_files = []
+        if os.path.exists(join(path, MANIFEST_NAME)):
+            with open(join(path, MANIFEST_NAME)) as manifest_file:
+                old_manifest = json.load(manifest_file)
+            old_index_files = _cycle_index_files(old_manifest)
+            old_column_files = [col['file'] for col in old_manifest['columns']]
+            os.remove(join(path, MANIFEST_NAME))
+            for file_name in old_index_files:
+                _remove(join(path, file_name))
+
+        columns = []
+        for i, col in enumerate(df_data.columns):
+            file_name = 'col_{}.bin'.format(i)
+            dtype = _write_array(join(path, file_name), df_data[col].values)
+            columns.append({'name': str(col), 'file': file_name,
+                            'dtype': dtype})
+
+        manifest = {'n_rows': 0, 'n_cycles': 0, 'cycle_column': cycle_column,
+                    'cycle_dtype': df_data[cycle_column].dtype.newbyteorder('<').str,
+                    'columns': columns, 'metadata': metadata}
+        _write_cycle_index(path, manifest, np.zeros(0, dtype=np.int64),
+                           np.zeros(0, dtype=manifest['cycle_dtype']),
+                           df_data[cycle_column].values)
+        manifest['n_rows'] = len(df_data)
+        _write_manifest(path, manifest)
+
+        # The columns of the replaced store which are not written again
+        new_column_files = [col['file'] for col in columns]
+        for file_name in old_column_files:
+            if file_name not in new_column_files:
+                _remove(join(path, file_name))
+
+        return cls.open(path)
+
+    def append(self, df_data, metadata=None):
+        """
+        This function appends the rows of a dataframe to the store. The
+        columns are extended in place, the cycle index is written to new
+        files and the manifest, with the new number of rows, the new cycle
+        index and the metadata, is replaced in a single step, so a store
+        interrupted while appending still opens with its previous rows.
+
+        Args:
+            df_data (pandas.DataFrame): Rows to append, with the same columns
+            as the store.
+            metadata (dict): JSON serializable data replacing the metadata
+            saved with the store. None keeps the current metadata.
+
+        Returns:
+            The CellStore opened on the extended directory.
+        """
+        if not isinstance(df_data, pd.DataFrame):
+            raise TypeError('df_data is not of type pandas dataframe')
+
+        if [str(col) for col in df_data.columns] != self.columns:
+            raise ValueError('the columns of the dataframe do not match the '
+                             'columns of the store')
+
+        _check_dtypes(df_data)
+
+        manifest = dict(self.manifest)
+        old_index_files = _cycle_index_files(manifest)
+        for column in manifest['columns']:
+            _write_array(join(self.path, column['file']),
+                         df_data[column['name']].values,
+                         dtype=column['dtype'], offset=self.n_rows)
+
+        _write_cycle_index(self.path, manifest, self.cycle_starts[:-1],
+                           self.cycle_numbers,
+                           df_data[self.cycle_column].values,
+                           offset=self.n_rows)
+        manifest['n_rows'] = self.n_rows + len(df_data)
+        if metadata is not None:
+            manifest['metadata'] = metadata
+        _write_manifest(self.path, manifest)
+
+        # The previous index is no longer named in the manifest. Existing
+        # memory maps of its files remain valid after they are removed.
+        for file_name in old_index_files:
+            _remove(join(self.path, file_name))
+
+        return CellStore.open(self.path)
+
+    @classmethod
+    def open(cls, path):
+        """
+        This function opens an existing store.
+
+        Args:
+            path (string): Directory of the store.
+
+        Returns:
+            A CellStore whose columns are memory-mapped read-only.
+        """
+        if not isinstance(path, str):
+            raise TypeError('path is not of type string')
+
+        if not os.path.exists(join(path, MANIFEST_NAME)):
+            raise FileNotFoundError('No cell store found in the location {}'
+                                    .format(path))
+
+        with open(join(path, MANIFEST_NAME)) as manifest_file:
+            manifest = json.load(manifest_file)
+        return cls(path, manifest)
+
+    @property
+    def columns(self):
+        """
+        Names of the columns in the store.
+        """
+        return [column['name'] for column in self.manifest['columns']]
+
+    @property
+    def metadata(self):
+        """
+        Metadata saved with the store, None if there is none.
+        """
+        return self.manifest.get('metadata')
+
+    @property
+    def n_cycles(self):
+        """
+        Number of cycles in the store.
+        """
+        return len(self.cycle_numbers)
+
+    def __len__(self):
+        return self.n_rows
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def __getitem__(self, name):
+        """
+        This function returns the memory-mapped array of a column.
+        """
+        if name not in self._columns:
+            for column in self.manifest['columns']:
+                if column['name'] == name:
+                    self._columns[name] = self._map(
+                        column['file'], column['dtype'], self.n_rows)
+                    break
+            else:
+                raise KeyError(name)
+        return self._columns[name]
+
+    def cycle_rows(self, first_cycle, last_cycle=None):
+        """
+        This function returns the range of rows holding the cycles numbered
+        from 'first_cycle' up to, but not including, 'last_cycle'.
+
+        Args:
+            first_cycle (int): Number of the first cycle.
+            last_cycle (int): Number of the cycle after the last cycle.
+            Defaults to first_cycle + 1, i.e. a single cycle.
+
+        Returns:
+            The first row and the row after the last row, as a tuple.
+        """
+        if last_cycle is None:
+            last_cycle = first_cycle + 1
+        # The cycle numbers increase with the rows, so the positions of the
+        # cycles are found by bisection of the small cycle index
+        first = np.searchsorted(self.cycle_numbers, first_cycle, side='left')
+        last = np.searchsorted(self.cycle_numbers, last_cycle, side='left')
+        last = max(first, last)
+        return int(self.cycle_starts[first]), int(self.cycle_starts[last])
+
+    def cycles(self, first_cycle, last_cycle=None, columns=None):
+        """
+        This function returns the data of the cycles numbered from
+        'first_cycle' up to, but not including, 'last_cycle'.
+
+        Args:
+            first_cycle (int): Number of the first cycle.
+            last_cycle (int): Number of the cycle after the last cycle.
+            Defaults to first_cycle + 1, i.e. a single cycle.
+            columns (list): Names of the columns to return, defaults to all.
+
+        Returns:
+            A dictionary with the column names as keys and memory-mapped
+            slices of the columns as values. No data is copied.
+        """
+        begin_value, end_value = self.cycle_rows(first_cycle, last_cycle)
+        if columns is None:
+            columns = self.columns
+        return {col: self[col][begin_value:end_value] for col in columns}
+
+    def to_dataframe(self, columns=None):
+        """
+        This function copies the columns of the store into a dataframe.
+        """
+        if columns is None:
+            columns = self.columns
+        return pd.DataFrame({col: np.array(self[col]) for col in columns},
+                            columns=columns)
+
+    def _map(self, file_name, dtype, length):
+        # numpy can not memory-map an empty file
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(join(self.path, file_name), dtype=dtype, mode='r',
+                         shape=(length,))
+
+
+def _check_dtypes(df_data):
+    """
+    This function raises an exception if a column can not be stored as a
+    raw array.
+    """
+    for col, dtype in df_data.dtypes.items():
+        if dtype == np.dtype('O'):
+            raise TypeError('column {} of object dtype can not be '
+                            'stored'.format(col))
+
+
+def _write_array(file_path, values, dtype=None, offset=0):
+    """
+    This function writes the values of an array to a raw file in little-endian
+    byte order and returns the dtype string used. With a non-zero 'offset' the
+    values are written from that row on, keeping the rows before it, and
+    anything after the written values is dropped. Otherwise the file is
+    replaced in a single step, so that existing memory maps of the old file
+    remain valid.
+    """
+    values = np.asarray(values)
+    dtype = np.dtype(dtype or values.dtype).newbyteorder('<')
+    values = np.ascontiguousarray(values, dtype=dtype)
+
+    if offset:
+        with open(file_path, 'r+b') as array_file:
+            array_file.seek(offset * dtype.itemsize)
+            array_file.write(values.tobytes())
+            array_file.truncate()
+    else:
+        file_desc, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(file_path), suffix='.tmp')
+        try:
+            with os.fdopen(file_desc, 'wb') as array_file:
+                array_file.write(values.tobytes())
+            os.replace(tmp_path, file_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+    return dtype.str
+
+
+def _write_cycle_index(path, manifest, starts, numbers, cycle_values,
+                       offset=0):
+    """
+    This function extends the cycle index (first row and number of every
+    cycle) with the cycles of new rows starting at row 'offset', and updates
+    the number of cycles and the version of the index in the manifest. The
+    index is written to the files of the new version, which the manifest
+    only names once it is replaced. New rows continuing the last cycle do
+    not start a new cycle.
+    """
+    new_starts = cycle_start_indices(cycle_values)
+    if len(numbers) and len(new_starts) and \
+            cycle_values[0] == numbers[-1]:
+        new_starts = new_starts[1:]
+
+    n_rows = offset + len(cycle_values)
+    starts = np.concatenate((starts, new_starts + offset, [n_rows]))
+    numbers = np.concatenate((numbers, cycle_values[new_starts]))
+    manifest['index_version'] = manifest.get('index_version', 0) + 1
+    starts_file, numbers_file = _cycle_index_files(manifest)
+    _write_array(join(path, starts_file), starts.astype(np.int64))
+    _write_array(join(path, numbers_file), numbers,
+                 dtype=manifest['cycle_dtype'])
+    manifest['n_cycles'] = len(numbers)
+
+
+def _cycle_index_files(manifest):
+    """
+    This function returns the names of the files of the cycle index named
+    in a manifest. Stores written before the index had versions have no
+    version number in the names.
+    """
+    version = manifest.get('index_version')
+    suffix = '' if version is None else '.{}'.format(version)
+    return (_CYCLE_STARTS_FILE.format(suffix),
+            _CYCLE_NUMBERS_FILE.format(suffix))
+
+
+def _remove(file_path):
+    try:
+        os.remove(file_path)
+    except OSError:
+        # Missing, or still mapped on windows
+        pass
+
+
+def _write_manifest(path, manifest):
+    """
+    This function replaces the manifest of a store in a single step.
+    """
+    file_desc, tmp_path = tempfile.mkstemp(dir=path, suffix='.tmp')
+    try:
+        with os.fdopen(file_desc, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        os.replace(tmp_path, join(path, MANIFEST_NAME))
+    except BaseException:
+        os.remove(tmp_path)
+        raise
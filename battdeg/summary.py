@@ -0,0 +1,196 @@
+"""
+This module summarizes the processed cycling data of a cell into one row per
+cycle: the charge and discharge capacities, the coulombic efficiency, the
+voltage range, the duration and the energies of the cycle. The summary is
+computed with numpy reductions over the rows of every cycle, one chunk of
+data at a time, so the data of a cell can be summarized from the chunks of
+'pl_samples_file_stream' without holding all the points in memory.
+"""
+
+import pandas as pd
+import numpy as np
+
+from .battdeg import cycle_start_indices, pl_samples_file_stream
+
+# Columns of the summary, after the cycle number
+SUMMARY_COLUMNS = ['n_points', 'duration_s', 'charge_ah', 'discharge_ah',
+                   'coulombic_efficiency', 'min_voltage', 'max_voltage',
+                   'charge_energy_wh', 'discharge_energy_wh']
+
+# Names of the columns in the CX2/CS2 and in the PL dataframes
+_SOURCE_COLUMNS = {
+    'cycle': ['Cycle_Index', 'Cycle'],
+    'time': ['Test_Time(s)', 'Time_sec'],
+    'current': ['Current(A)', 'Current_Amp'],
+    'voltage': ['Voltage(V)', 'Voltage_Volt'],
+    'charge': ['charge_cycle_ah'],
+    'discharge': ['discharge_cycle_ah']}
+
+
+def cycle_summary(data):
+    """
+    This function computes the summary of every cycle of a cell.
+
+    Args:
+        data (pandas.DataFrame or iterable): Dataframe returned by
+        'cx2_file_reader' or 'pl_samples_file_reader', or the chunks of such
+        a dataframe in order, e.g. from 'pl_samples_file_stream'. A cycle may
+        be split between consecutive chunks.
+
+    Returns:
+        A dataframe with one row per cycle: the cycle number, the number of
+        points, the duration in seconds, the charge and discharge capacities
+        in Ah, the coulombic efficiency (discharge over charge capacity), the
+        minimum and maximum voltage and the charge and discharge energies in
+        Wh. None if there is no data.
+    """
+    if isinstance(data, pd.DataFrame):
+        chunks = [data]
+    elif hasattr(data, '__iter__') and not isinstance(data, (str, dict)):
+        chunks = data
+    else:
+        raise TypeError('data should be a pandas dataframe or an iterable '
+                        'of dataframes')
+
+    parts = []
+    pending = None
+    last_time = None
+    cycle_column = None
+    for chunk in chunks:
+        if not isinstance(chunk, pd.DataFrame):
+            raise TypeError('a chunk is not a pandas dataframe')
+        if chunk.empty:
+            continue
+        columns = _summary_columns(chunk)
+        cycle_column = columns['cycle']
+        summary, last_time = _chunk_summary(chunk, columns, last_time)
+
+        if pending is not None:
+            if summary['cycle'][0] == pending['cycle'][0]:
+                # The chunk continues the last cycle of the previous chunk
+                summary = _merge_first(pending, summary)
+            else:
+                parts.append(pending)
+        # The last cycle of the chunk may go on in the next chunk
+        parts.append({key: values[:-1] for key, values in summary.items()})
+        pending = {key: values[-1:] for key, values in summary.items()}
+
+    if pending is None:
+        return None
+    parts.append(pending)
+
+    summary = {key: np.concatenate([part[key] for part in parts])
+               for key in pending}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        coulombic_efficiency = summary['discharge_ah'] / summary['charge_ah']
+    df_summary = pd.DataFrame({
+        cycle_column: summary['cycle'],
+        'n_points': summary['n_points'],
+        'duration_s': summary['end_time'] - summary['start_time'],
+        'charge_ah': summary['charge_ah'],
+        'discharge_ah': summary['discharge_ah'],
+        'coulombic_efficiency': np.where(summary['charge_ah'] > 0,
+                                         coulombic_efficiency, np.nan),
+        'min_voltage': summary['min_voltage'],
+        'max_voltage': summary['max_voltage'],
+        'charge_energy_wh': summary['charge_energy_wh'],
+        'discharge_energy_wh': summary['discharge_energy_wh']},
+                              columns=[cycle_column] + SUMMARY_COLUMNS)
+    return df_summary
+
+
+def pl_samples_cycle_summary(data_dir, file_name_format, ignore_file_indices,
+                             chunksize=100000):
+    """
+    This function computes the summary of every cycle of a PL Samples
+    experiment from the files, reading 'chunksize' rows at a time.
+
+    Args:
+        data_dir (string): This is the absolute path to the data directory.
+        file_name_format (string): Format of the filename, used to deduce other files.
+        ignore_file_indices (list, int): This list of ints tells which to ignore.
+        chunksize (int): Number of rows read from the files at a time.
+
+    Returns:
+        The dataframe returned by 'cycle_summary'.
+    """
+    chunks = pl_samples_file_stream(data_dir, file_name_format,
+                                    ignore_file_indices, chunksize=chunksize,
+                                    usecols=[])
+    return cycle_summary(chunks)
+
+
+def _summary_columns(df_data):
+    """
+    This function returns the names of the columns used for the summary,
+    raising an exception if one of them is not in the dataframe.
+    """
+    columns = {}
+    for key, names in _SOURCE_COLUMNS.items():
+        found = [name for name in names if name in df_data.columns]
+        if not found:
+            raise Exception("the dataframe doesnt have the columns " +
+                            "'Cycle_Index' or 'Cycle', 'Test_Time(s)' or " +
+                            "'Time_sec', 'Current(A)', 'Voltage(V)', " +
+                            "'charge_cycle_ah', 'discharge_cycle_ah'")
+        columns[key] = found[0]
+    return columns
+
+
+def _chunk_summary(df_chunk, columns, last_time=None):
+    """
+    This function reduces the rows of every cycle of a chunk. The energy of
+    a row is the power times the time since the previous row, 'last_time'
+    being the time of the last row of the previous chunk.
+
+    Returns:
+        Dictionary of arrays with one value per cycle of the chunk, and the
+        time of the last row of the chunk.
+    """
+    cycle = df_chunk[columns['cycle']].values
+    time = df_chunk[columns['time']].values.astype(np.float64)
+    voltage = df_chunk[columns['voltage']].values.astype(np.float64)
+    power = voltage * df_chunk[columns['current']].values
+
+    # Time since the previous row, zero for the very first row of the data
+    delta_time = np.diff(time, prepend=time[0] if last_time is None
+                         else last_time)
+    energy_wh = power * delta_time / 3600.
+
+    starts = cycle_start_indices(cycle)
+    ends = np.append(starts[1:], len(cycle)) - 1
+
+    # fmax and fmin ignore the missing values like the pandas reductions
+    summary = {
+        'cycle': cycle[starts],
+        'n_points': np.diff(np.append(starts, len(cycle))),
+        'start_time': time[starts],
+        'end_time': time[ends],
+        'charge_ah': np.fmax.reduceat(
+            df_chunk[columns['charge']].values.astype(np.float64), starts),
+        'discharge_ah': np.fmax.reduceat(
+            df_chunk[columns['discharge']].values.astype(np.float64), starts),
+        'min_voltage': np.fmin.reduceat(voltage, starts),
+        'max_voltage': np.fmax.reduceat(voltage, starts),
+        'charge_energy_wh': np.add.reduceat(
+            np.where(energy_wh > 0, energy_wh, 0.), starts),
+        'discharge_energy_wh': np.add.reduceat(
+            np.where(energy_wh < 0, -energy_wh, 0.), starts)}
+    return summary, time[-1]
+
+
+def _merge_first(pending, summary):
+    """
+    This function merges the summary of the last cycle of the previous chunk
+    into the summary of the first cycle of the next chunk.
+    """
+    merged = {key: values.copy() for key, values in summary.items()}
+    merged['n_points'][0] += pending['n_points'][0]
+    merged['start_time'][0] = pending['start_time'][0]
+    for key in ['charge_ah', 'discharge_ah', 'max_voltage']:
+        merged[key][0] = np.fmax(merged[key][0], pending[key][0])
+    merged['min_voltage'][0] = np.fmin(merged['min_voltage'][0],
+                                       pending['min_voltage'][0])
+    for key in ['charge_energy_wh', 'discharge_energy_wh']:
+        merged[key][0] += pending[key][0]
+    return merged
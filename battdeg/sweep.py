@@ -0,0 +1,224 @@
+"""
+This module tunes the LSTM model of 'long_short_term_memory' by training it
+with many combinations of hyperparameters: the number of LSTM units, the
+number of epochs, the batch size, the number of lag observations and the
+learning rate. The features are prepared once and saved to a .npy file which
+every trial memory-maps, and the trials run in a pool of spawned worker
+processes, each limited to a fixed number of CPU threads so that the trials
+do not compete for the cores. The threads of the calling process are not
+changed.
+"""
+
+from functools import partial
+import itertools
+import multiprocessing
+import os
+from os.path import join
+import shutil
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from .battdeg import _train_lstm, feature_array, supervised_arrays
+
+# Hyperparameters of a trial and their values in 'long_short_term_memory'
+DEFAULT_PARAMS = {'units': 50, 'epochs': 50, 'batch_size': 72, 'n_in': 1,
+                  'learning_rate': None}
+
+# Environment variables limiting the threads of the numerical libraries
+_THREAD_VARIABLES = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS',
+                     'OPENBLAS_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS',
+                     'TF_NUM_INTEROP_THREADS']
+
+
+def grid_trials(space):
+    """
+    This function returns every combination of the values of the
+    hyperparameters.
+
+    Args:
+        space (dict): The values to try for each hyperparameter, e.g.
+        {'units': [25, 50], 'n_in': [1, 4]}. The other hyperparameters keep
+        their values of 'DEFAULT_PARAMS'.
+
+    Returns:
+        List of dictionaries of the hyperparameters of the trials.
+    """
+    _check_space(space)
+    names = sorted(space)
+    return [dict(DEFAULT_PARAMS, **dict(zip(names, values)))
+            for values in itertools.product(*[list(space[n]) for n in names])]
+
+
+def random_trials(space, n_trials, seed=None):
+    """
+    This function draws random combinations of the values of the
+    hyperparameters.
+
+    Args:
+        space (dict): For each hyperparameter, a list of values to choose
+        from or a (low, high) tuple. Integers are drawn uniformly between
+        low and high inclusive, floats log-uniformly, as suits a learning
+        rate. The other hyperparameters keep their values of 'DEFAULT_PARAMS'.
+        n_trials (int): Number of trials.
+        seed (int): Seed of the random draws.
+
+    Returns:
+        List of dictionaries of the hyperparameters of the trials.
+    """
+    _check_space(space)
+    if not isinstance(n_trials, int) or n_trials < 1:
+        raise TypeError('n_trials should be a positive integer')
+
+    random = np.random.RandomState(seed)
+    trials = []
+    for _ in range(n_trials):
+        params = dict(DEFAULT_PARAMS)
+        for name in sorted(space):
+            values = space[name]
+            if isinstance(values, tuple):
+                low, high = values
+                if isinstance(low, int) and isinstance(high, int):
+                    params[name] = int(random.randint(low, high + 1))
+                else:
+                    params[name] = float(np.exp(random.uniform(np.log(low),
+                                                               np.log(high))))
+            else:
+                values = list(values)
+                params[name] = values[random.randint(len(values))]
+        trials.append(params)
+    return trials
+
+
+def hyperparameter_sweep(data, trials, workers=None, threads_per_worker=1,
+                         scratch_dir=None):
+    """
+    This function trains and tests the LSTM model for every trial in
+    parallel worker processes and ranks the trials by their validation loss.
+
+    Args:
+        data (pandas.DataFrame or array): Dataframe returned by
+        'data_formatting' or array of shape [samples, features] whose last
+        feature is the target, e.g. from 'feature_array'.
+        trials (list): Dictionaries of hyperparameters, e.g. from 'grid_trials'
+        or 'random_trials'. Missing hyperparameters take their values of
+        'DEFAULT_PARAMS'.
+        workers (int): Number of trials run at the same time, each in a
+        worker process. Defaults to the number of cores divided by
+        'threads_per_worker'.
+        threads_per_worker (int): Number of CPU threads used by a trial.
+        scratch_dir (string): Directory of the memory-mapped features,
+        defaults to a temporary directory removed after the sweep.
+
+    Returns:
+        A dataframe with one row per trial, sorted by the validation loss of
+        the last epoch: the rank, the hyperparameters, the training and
+        validation losses of the last epoch, the best validation loss, the
+        wall time of the trial in seconds and the error of the trials which
+        failed (None otherwise), which come last.
+    """
+    if isinstance(data, pd.DataFrame):
+        features = feature_array(data)
+    elif isinstance(data, np.ndarray) and data.ndim == 2:
+        features = np.ascontiguousarray(data, dtype=np.float32)
+    else:
+        raise TypeError('data should be a pandas dataframe or a 2-D array')
+
+    if not isinstance(trials, list) or not trials:
+        raise TypeError('trials should be a non-empty list of dictionaries')
+    trials = [dict(DEFAULT_PARAMS, **trial) for trial in trials]
+    unknown = set(itertools.chain(*trials)) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError('unknown hyperparameters {}'
+                         .format(', '.join(sorted(unknown))))
+
+    if not isinstance(threads_per_worker, int) or threads_per_worker < 1:
+        raise TypeError('threads_per_worker should be a positive integer')
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    elif not isinstance(workers, int) or workers < 1:
+        raise TypeError('workers should be a positive integer')
+
+    tmp_dir = tempfile.mkdtemp(prefix='battdeg_sweep_', dir=scratch_dir)
+    try:
+        # The features are written once, every trial maps the same file
+        features_path = join(tmp_dir, 'features.npy')
+        np.save(features_path, features)
+        # Even a single worker is a spawned process: the workers import
+        # tensorflow after their threads are limited, and the limits do not
+        # leak into this process
+        pool = multiprocessing.get_context('spawn').Pool(
+            min(workers, len(trials)), initializer=_pin_threads,
+            initargs=(threads_per_worker,))
+        try:
+            results = pool.map(partial(_run_trial, features_path), trials,
+                               chunksize=1)
+        finally:
+            pool.close()
+            pool.join()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    df_results = pd.DataFrame(results, columns=sorted(DEFAULT_PARAMS) + [
+        'loss', 'val_loss', 'best_val_loss', 'wall_time_s', 'error'])
+    df_results = df_results.sort_values('val_loss', na_position='last',
+                                        kind='mergesort')
+    df_results.insert(0, 'rank', np.arange(1, len(df_results) + 1))
+    return df_results.reset_index(drop=True)
+
+
+def _check_space(space):
+    if not isinstance(space, dict):
+        raise TypeError('space should be a dictionary')
+    unknown = set(space) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError('unknown hyperparameters {}'
+                         .format(', '.join(sorted(unknown))))
+
+
+def _pin_threads(threads):
+    """
+    This function limits the number of threads of the numerical libraries
+    and of tensorflow in a worker process, before it runs any trial.
+    """
+    for variable in _THREAD_VARIABLES:
+        os.environ[variable] = str(threads)
+    import tensorflow as tf
+    if hasattr(tf, 'config') and hasattr(tf.config, 'threading'):
+        try:
+            tf.config.threading.set_intra_op_parallelism_threads(threads)
+            tf.config.threading.set_inter_op_parallelism_threads(1)
+        except RuntimeError:
+            # The threads can not be changed once tensorflow is initialized
+            pass
+    else:
+        from keras import backend
+        backend.set_session(tf.Session(config=tf.ConfigProto(
+            intra_op_parallelism_threads=threads,
+            inter_op_parallelism_threads=1)))
+
+
+def _run_trial(features_path, params):
+    """
+    This function trains and tests the model for one trial in a worker
+    process, reading the features from the memory-mapped file.
+    """
+    start = time.perf_counter()
+    result = dict(params, loss=np.nan, val_loss=np.nan, best_val_loss=np.nan,
+                  error=None)
+    # The error of a trial is returned instead of stopping the other trials
+    try:
+        features = np.load(features_path, mmap_mode='r')
+        model_x, model_y = supervised_arrays(features, n_in=params['n_in'])
+        model_loss, _, _ = _train_lstm(
+            model_x, model_y, units=params['units'], epochs=params['epochs'],
+            batch_size=params['batch_size'],
+            learning_rate=params['learning_rate'])
+        result['loss'] = model_loss['loss'][-1]
+        result['val_loss'] = model_loss['val_loss'][-1]
+        result['best_val_loss'] = min(model_loss['val_loss'])
+    except Exception as error:
+        result['error'] = repr(error)
+    result['wall_time_s'] = time.perf_counter() - start
+    return result
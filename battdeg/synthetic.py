@@ -0,0 +1,355 @@
+"""
+This module generates synthetic cycling data of any size in the formats of the
+PL csv files and of the CX2/CS2 excel sheets, for testing and benchmarking the
+readers at production scale. Every cycle charges then discharges the cell at
+a constant current, the capacity of the cycles fades with a configurable
+profile and the voltage follows an open circuit voltage curve with an ohmic
+drop and some noise. Like the real files, every file restarts the time, the
+cycle numbers and the cumulative capacities. The points of a file are
+computed with numpy operations on whole arrays, and the files are generated
+one at a time, so the memory used depends on the size of a file only.
+"""
+
+import datetime
+import os
+from os.path import join
+import numpy as np
+import pandas as pd
+
+# Profiles of the capacity fade, as functions of the fraction of the life of
+# the cell (0 for the first cycle, 1 for the last) returning the fraction of
+# the capacity lost at the last cycle
+FADE_PROFILES = {
+    'linear': lambda t: t,
+    # Fade slowing down, like the growth of the SEI layer
+    'sqrt': np.sqrt,
+    # Slow linear fade followed by a fast drop
+    'knee': lambda t: 0.3 * t + 0.7 * t ** 6,
+}
+
+# Largest number of rows of a sheet of an excel file, after the header
+_EXCEL_MAX_ROWS = 1048575
+
+# Matlab datenum of the unix epoch (1970-01-01)
+_MATLAB_EPOCH_DATENUM = 719529
+
+# Step numbers of the charge and of the discharge
+_CHARGE_STEP = 1
+_DISCHARGE_STEP = 2
+
+# Resistance of the cell in ohm when new
+_RESISTANCE = 0.08
+
+
+def capacity_fade(n_cycles, capacity_ah=1.1, profile='linear',
+                  end_of_life=0.8):
+    """
+    This function returns the capacity of every cycle of a fading cell.
+
+    Args:
+        n_cycles (int): Number of cycles.
+        capacity_ah (float): Capacity of the first cycle in Ah.
+        profile (string or callable): Name of a profile of 'FADE_PROFILES',
+        or function of the fraction of the life of the cell (an array from 0
+        to 1) returning the fraction of the total fade reached.
+        end_of_life (float): Capacity of the last cycle as a fraction of the
+        capacity of the first cycle.
+
+    Returns:
+        Array of the capacities of the cycles in Ah.
+    """
+    if not isinstance(n_cycles, int) or n_cycles < 1:
+        raise TypeError('n_cycles should be a positive integer')
+    if not 0 < end_of_life <= 1:
+        raise ValueError('end_of_life should be in (0, 1]')
+    if isinstance(profile, str):
+        if profile not in FADE_PROFILES:
+            raise ValueError('unknown fade profile {}, use one of {}'.format(
+                profile, ', '.join(sorted(FADE_PROFILES))))
+        profile = FADE_PROFILES[profile]
+    elif not callable(profile):
+        raise TypeError('profile should be a string or a function')
+
+    life = np.linspace(0., 1., n_cycles)
+    return capacity_ah * (1. - (1. - end_of_life) * profile(life))
+
+
+def synthetic_pl_frames(n_cycles=100, points_per_cycle=100, n_files=1,
+                        **options):
+    """
+    This function generates the dataframes of the csv files of a PL cell.
+
+    Args:
+        n_cycles (int): Number of cycles of the cell.
+        points_per_cycle (int): Number of points of a cycle, half of them for
+        the charge and half for the discharge.
+        n_files (int): Number of files the cycles are split into.
+        **options: Options of the cell, see '_synthetic_files': capacity_ah,
+        fade, end_of_life, c_rate, coulombic_efficiency, start_date and seed.
+
+    Returns:
+        Dictionary of the dataframes with the columns of the PL csv files and
+        the file numbers from 1 as keys, like 'get_dict_files'.
+    """
+    return {i + 1: _pl_frame(arrays, start)
+            for i, (arrays, start) in enumerate(_synthetic_files(
+                n_cycles, points_per_cycle, n_files, **options))}
+
+
+def synthetic_cx2_frames(n_cycles=100, points_per_cycle=100, n_files=1,
+                         **options):
+    """
+    This function generates the dataframes of the excel sheets of a CX2 or
+    CS2 cell.
+
+    Args:
+        n_cycles (int): Number of cycles of the cell.
+        points_per_cycle (int): Number of points of a cycle, half of them for
+        the charge and half for the discharge.
+        n_files (int): Number of files the cycles are split into.
+        **options: Options of the cell, see 'synthetic_pl_frames'.
+
+    Returns:
+        Dictionary of the dataframes with the columns of the CX2 sheets and
+        the order of the files from 0 as keys, like 'reading_dataframes'.
+    """
+    return {i: _cx2_frame(arrays, start)
+            for i, (arrays, start) in enumerate(_synthetic_files(
+                n_cycles, points_per_cycle, n_files, **options))}
+
+
+def write_pl_files(data_dir, cell_name='PL99', n_cycles=100,
+                   points_per_cycle=100, n_files=1, **options):
+    """
+    This function writes the csv files of a synthetic PL cell, one file at a
+    time, e.g. 'PL99(1).csv', 'PL99(2).csv'...
+
+    Args:
+        data_dir (string): Directory the files are written to.
+        cell_name (string): Name of the experiment, of four characters like
+        the names 'get_dict_files' expects.
+        n_cycles, points_per_cycle, n_files, **options: See
+        'synthetic_pl_frames'.
+
+    Returns:
+        The file name format to read the files with, e.g. 'PL99(1).csv'.
+    """
+    _check_dir(data_dir)
+    if not isinstance(cell_name, str) or len(cell_name) != 4:
+        raise ValueError('cell_name should be a string of four characters')
+
+    for i, (arrays, start) in enumerate(_synthetic_files(
+            n_cycles, points_per_cycle, n_files, **options)):
+        _pl_frame(arrays, start).to_csv(
+            join(data_dir, '{}({}).csv'.format(cell_name, i + 1)),
+            index=False)
+    return '{}(1).csv'.format(cell_name)
+
+
+def write_cx2_files(data_dir, cell_name='CX2_99', n_cycles=100,
+                    points_per_cycle=100, n_files=1, **options):
+    """
+    This function writes the excel files of a synthetic CX2 or CS2 cell in
+    the directory 'cell_name' of 'data_dir', one file per day from the start
+    date, e.g. 'CX2_99_1_30_12.xlsx'. The data is in the second sheet, after
+    an information sheet. Writing excel files needs an excel writer engine
+    for pandas, e.g. openpyxl.
+
+    Args:
+        data_dir (string): Directory in which the cell directory is created.
+        cell_name (string): Name of the cell, starting with 'CX2' or 'CS2'.
+        n_cycles, points_per_cycle, n_files, **options: See
+        'synthetic_pl_frames'.
+
+    Returns:
+        The name of the cell to read the files with, e.g. 'CX2_99'.
+    """
+    _check_dir(data_dir)
+    if not isinstance(cell_name, str) or cell_name[:3] not in ['CX2', 'CS2']:
+        raise ValueError("cell_name should start with 'CX2' or 'CS2'")
+    if -(-n_cycles // n_files) * points_per_cycle > _EXCEL_MAX_ROWS:
+        raise ValueError('the files would have more rows than an excel '
+                         'sheet, use more files')
+
+    cell_dir = join(data_dir, cell_name)
+    os.makedirs(cell_dir, exist_ok=True)
+    start_date = options.get('start_date') or _default_start_date()
+    for i, (arrays, start) in enumerate(_synthetic_files(
+            n_cycles, points_per_cycle, n_files, **options)):
+        day = start_date + datetime.timedelta(days=i)
+        file_path = join(cell_dir, '{}_{}_{}_{}.xlsx'.format(
+            cell_name, day.month, day.day, day.strftime('%y')))
+        with pd.ExcelWriter(file_path) as writer:
+            pd.DataFrame({'TEST REPORT': [cell_name]}).to_excel(
+                writer, sheet_name='Info', index=False)
+            _cx2_frame(arrays, start).to_excel(
+                writer, sheet_name='Channel_1-006', index=False)
+    return cell_name
+
+
+def _synthetic_files(n_cycles, points_per_cycle, n_files, capacity_ah=1.1,
+                     fade='linear', end_of_life=0.8, c_rate=0.5,
+                     coulombic_efficiency=0.999, start_date=None, seed=None):
+    """
+    This function generates the points of the cycles of a cell, one file at
+    a time.
+
+    Args:
+        n_cycles (int): Number of cycles of the cell.
+        points_per_cycle (int): Number of points of a cycle.
+        n_files (int): Number of files the cycles are split into.
+        capacity_ah (float): Capacity of the first cycle in Ah.
+        fade (string or callable): Profile of the capacity fade, see
+        'capacity_fade'.
+        end_of_life (float): Capacity of the last cycle as a fraction of the
+        capacity of the first cycle.
+        c_rate (float): Charge and discharge current as a fraction of the
+        capacity of the first cycle per hour.
+        coulombic_efficiency (float): Discharge capacity over charge capacity.
+        start_date (datetime.datetime): Date and time of the first point.
+        seed (int): Seed of the noise.
+
+    Yields:
+        For every file, a dictionary of the arrays of the points and the
+        datetime64 of the start of the file.
+    """
+    if not isinstance(points_per_cycle, int) or points_per_cycle < 2:
+        raise TypeError('points_per_cycle should be an integer of at least 2')
+    if not isinstance(n_files, int) or not 1 <= n_files <= n_cycles:
+        raise TypeError('n_files should be an integer between 1 and n_cycles')
+    if c_rate <= 0:
+        raise ValueError('c_rate should be positive')
+
+    capacities = capacity_fade(n_cycles, capacity_ah, fade, end_of_life)
+    current = c_rate * capacity_ah
+    random = np.random.RandomState(seed)
+    start = np.datetime64(start_date if start_date is not None
+                          else _default_start_date(), 'ns')
+    for file_capacities in np.array_split(capacities, n_files):
+        arrays = _cycle_arrays(file_capacities, points_per_cycle, current,
+                               coulombic_efficiency, capacity_ah, random)
+        yield arrays, start
+        start = start + np.timedelta64(int(arrays['time'][-1] * 1e9), 'ns')
+
+
+def _cycle_arrays(capacities, points_per_cycle, current,
+                  coulombic_efficiency, capacity_ah, random):
+    """
+    This function computes the points of consecutive cycles of a file as
+    arrays of shape [cycles, points_per_cycle], flattened at the end.
+    """
+    n_charge = points_per_cycle // 2
+    n_discharge = points_per_cycle - n_charge
+    point = np.arange(points_per_cycle)
+    charging = point < n_charge
+    # Fraction of the charge or of the discharge done at every point
+    progress = np.where(charging, (point + 1.) / n_charge,
+                        (point - n_charge + 1.) / n_discharge)
+
+    charge_ah = capacities[:, np.newaxis]
+    discharge_ah = charge_ah * coulombic_efficiency
+    # Seconds between the points, a faded cell is charged sooner
+    step_time = np.where(charging, charge_ah * 3600. / current / n_charge,
+                         discharge_ah * 3600. / current / n_discharge)
+    time = np.cumsum(step_time.ravel())
+
+    # The capacities are cumulative over the cycles of the file
+    charge = np.where(charging, charge_ah * progress, charge_ah) + \
+        (np.cumsum(charge_ah) - charge_ah[:, 0])[:, np.newaxis]
+    discharge = np.where(charging, 0., discharge_ah * progress) + \
+        (np.cumsum(discharge_ah) - discharge_ah[:, 0])[:, np.newaxis]
+
+    signed_current = np.where(charging, current, -current) * \
+        np.ones_like(charge_ah)
+    state_of_charge = np.where(charging, progress, 1. - progress) * \
+        np.ones_like(charge_ah)
+    # The resistance grows as the capacity fades
+    resistance = _RESISTANCE * capacity_ah / charge_ah
+    voltage = _open_circuit_voltage(state_of_charge) + \
+        signed_current * resistance
+    shape = signed_current.shape
+
+    return {
+        'time': time,
+        'step_time': (np.cumsum(step_time, axis=1) -
+                      np.where(charging, 0., step_time[:, :n_charge].sum(
+                          axis=1, keepdims=True))).ravel(),
+        'cycle': np.repeat(np.arange(1, len(capacities) + 1),
+                           points_per_cycle),
+        'step': np.tile(np.where(charging, _CHARGE_STEP, _DISCHARGE_STEP),
+                        len(capacities)),
+        'current': (signed_current + random.normal(
+            0., 1e-4 * current, shape)).ravel(),
+        'voltage': (voltage + random.normal(0., 1e-3, shape)).ravel(),
+        'charge': charge.ravel(),
+        'discharge': discharge.ravel()}
+
+
+def _open_circuit_voltage(state_of_charge):
+    # Smooth curve of a lithium-ion cell between about 3.0 and 4.2 V
+    return 3.45 + 0.65 * state_of_charge - \
+        0.45 * np.exp(-15. * state_of_charge) + \
+        0.1 * np.exp(-15. * (1. - state_of_charge))
+
+
+def _pl_frame(arrays, start):
+    """
+    This function returns the dataframe of a PL csv file.
+    """
+    start_datenum = _MATLAB_EPOCH_DATENUM + \
+        (start - np.datetime64(0, 'ns')) / np.timedelta64(1, 'D')
+    return pd.DataFrame({
+        'Time_sec': arrays['time'],
+        'Date_Time': start_datenum + arrays['time'] / 86400.,
+        'Step': arrays['step'],
+        'Cycle': arrays['cycle'],
+        'Current_Amp': arrays['current'],
+        'Voltage_Volt': arrays['voltage'],
+        'Charge_Ah': arrays['charge'],
+        'Discharge_Ah': arrays['discharge']},
+                        columns=['Time_sec', 'Date_Time', 'Step', 'Cycle',
+                                 'Current_Amp', 'Voltage_Volt', 'Charge_Ah',
+                                 'Discharge_Ah'])
+
+
+def _cx2_frame(arrays, start):
+    """
+    This function returns the dataframe of a CX2 excel sheet.
+    """
+    time = arrays['time']
+    power = arrays['current'] * arrays['voltage']
+    energy = power * np.diff(time, prepend=0.) / 3600.
+    voltage_rate = np.diff(arrays['voltage'], prepend=arrays['voltage'][0]) / \
+        np.diff(time, prepend=time[0] - 1.)
+    return pd.DataFrame({
+        'Data_Point': np.arange(1, len(time) + 1),
+        'Test_Time(s)': time,
+        'Date_Time': start + (time * 1e9).astype('timedelta64[ns]'),
+        'Step_Time(s)': arrays['step_time'],
+        'Step_Index': arrays['step'],
+        'Cycle_Index': arrays['cycle'],
+        'Current(A)': arrays['current'],
+        'Voltage(V)': arrays['voltage'],
+        'Charge_Capacity(Ah)': arrays['charge'],
+        'Discharge_Capacity(Ah)': arrays['discharge'],
+        'Charge_Energy(Wh)': np.cumsum(np.where(energy > 0, energy, 0.)),
+        'Discharge_Energy(Wh)': np.cumsum(np.where(energy < 0, -energy, 0.)),
+        'dV/dt(V/s)': voltage_rate},
+                        columns=['Data_Point', 'Test_Time(s)', 'Date_Time',
+                                 'Step_Time(s)', 'Step_Index', 'Cycle_Index',
+                                 'Current(A)', 'Voltage(V)',
+                                 'Charge_Capacity(Ah)',
+                                 'Discharge_Capacity(Ah)',
+                                 'Charge_Energy(Wh)', 'Discharge_Energy(Wh)',
+                                 'dV/dt(V/s)'])
+
+
+def _default_start_date():
+    return datetime.datetime(2012, 1, 30, 17, 51, 10)
+
+
+def _check_dir(data_dir):
+    if not isinstance(data_dir, str):
+        raise TypeError('data_dir is not of type string')
+    if not os.path.isdir(data_dir):
+        raise FileNotFoundError('Directory {} not found'.format(data_dir))
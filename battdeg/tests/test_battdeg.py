@@ -3,6 +3,7 @@ import numpy as np
 import datetime
 import os, sys
 import re
+import subprocess
 from os import listdir
 from os.path import isfile, join
 import pytest # automatic test finder and test runner
@@ -12,21 +13,29 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 import battdeg as bd
 from battdeg import pl_samples_file_reader
+from battdeg import pl_samples_file_stream
 from battdeg import date_time_converter
+from battdeg import datenum_to_datetime64
 from battdeg import get_dict_files
 from battdeg import concat_dict_dataframes
+from battdeg import compact_dtypes
 from battdeg import get_cycle_capacities
 from battdeg import cx2_file_reader
 from battdeg import file_name_sorting
 from battdeg import reading_dataframes
 from battdeg import concat_df
 from battdeg import capacity
+from battdeg import per_cycle_capacities
 from battdeg import data_formatting
 from battdeg import series_to_supervised
+from battdeg import supervised_arrays
+from battdeg import supervised_batches
+from battdeg import feature_array
 from battdeg import long_short_term_memory
 from battdeg import model_training
 from battdeg import model_prediction
 from battdeg import file_reader
+from battdeg import write_pl_files
 
 # Path for data for testing
 base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -36,6 +45,22 @@ data_path = join(module_dir, 'data')
 data_path_pl12_14 = join(data_path,'PL12')
 data_path_cx2 = join(data_path,'CX2_16')
 
+###########################################################################
+####################### Tests for the package import ######################
+###########################################################################
+
+# Importing the package should not import the machine learning libraries,
+# nor h5py which is only needed for the .mat and model files
+def test_import_without_ml():
+
+    code = ("import sys; import battdeg; "
+            "print(','.join(m for m in ('keras', 'tensorflow', 'sklearn', "
+            "'h5py') if m in sys.modules))")
+    output = subprocess.check_output([sys.executable, '-c', code], cwd=base_dir)
+    assert output.decode().strip() == ''
+
+    return
+
 ###########################################################################
 ####################### Tests for `pl_samples_file_reader` ################
 ###########################################################################
@@ -105,6 +130,48 @@ def test_pl_samples_file_reader_Type():
     return 
 
 
+###########################################################################
+####################### Tests for `pl_samples_file_stream` ################
+###########################################################################
+
+# The chunks should add up to the dataframe of `pl_samples_file_reader`
+def test_pl_samples_file_stream_value(tmpdir):
+
+    # Two files of five cycles, with several cycles per file
+    dd1 = str(tmpdir)
+    fnf1 = write_pl_files(dd1, 'PL12', n_cycles=10, points_per_cycle=13,
+                          n_files=2)
+    expected = pl_samples_file_reader(dd1, fnf1, [])
+
+    # Chunk sizes which split the cycles and which hold several cycles
+    for chunksize in [1, 7, 13, 30, 1000]:
+        chunks = list(pl_samples_file_stream(dd1, fnf1, [], chunksize=chunksize))
+        assert all(len(chunk) <= chunksize for chunk in chunks)
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected)
+
+        cycles = list(pl_samples_file_stream(dd1, fnf1, [], chunksize=chunksize,
+                                             by_cycle=True))
+        assert len(cycles) == 10, "There should be one dataframe per cycle"
+        assert all(cycle['Cycle'].nunique() == 1 for cycle in cycles)
+        pd.testing.assert_frame_equal(pd.concat(cycles), expected)
+
+    return
+
+# The wrong type input should raise a TypeError
+def test_pl_samples_file_stream_BadIn():
+
+    with pytest.raises(TypeError):
+        pl_samples_file_stream(123, "PL12(1).csv", [])
+
+    with pytest.raises(TypeError):
+        pl_samples_file_stream(data_path_pl12_14, "PL12(1).csv", [], chunksize=0)
+
+    with pytest.raises(FileNotFoundError):
+        pl_samples_file_stream(data_path_pl12_14, "123", [])
+
+    return
+
+
 ###########################################################################
 ####################### Tests for `date_time_converter()` ################
 ###########################################################################
@@ -131,6 +198,33 @@ def test_date_time_converter_value():
     
     return
 
+# Test the vectorized converter for bad input
+def test_datenum_to_datetime64_BadIn():
+
+    with pytest.raises(TypeError):
+        datenum_to_datetime64(123)
+
+    with pytest.raises(TypeError):
+        datenum_to_datetime64('731885.75')
+
+    return
+
+# Test the vectorized converter agrees with `date_time_converter`
+def test_datenum_to_datetime64_value():
+
+    dt_in = np.array([731885.75, 735817.600845, np.nan])
+
+    result = datenum_to_datetime64(dt_in)
+    expected = date_time_converter(list(dt_in[:2]))
+
+    assert result.dtype == np.dtype('datetime64[ns]')
+    assert result[0] == np.datetime64('2003-10-31T18:00'), "The date time returned is not correct"
+    # The python datetime is only precise to the microsecond
+    assert abs(result[1] - np.datetime64(expected[1])) < np.timedelta64(1, 'us')
+    assert np.isnat(result[2]), "NaN should be converted to NaT"
+
+    return
+
 ###########################################################################
 ####################### Tests for `get_dict_files()` ################
 ###########################################################################
@@ -148,6 +242,67 @@ def test_get_dict_files_Type():
     
     return
 
+# Parsing the files in a process pool should give the same ordered dictionary
+def test_get_dict_files_workers():
+
+    dd1 = data_path_pl12_14
+    fnf1 = "PL12(1).csv"
+
+    expected = get_dict_files(dd1, fnf1, [])
+    result = get_dict_files(dd1, fnf1, [], workers=2)
+
+    assert list(result.keys()) == list(expected.keys()), "The order of the files is not preserved"
+    for key in expected:
+        pd.testing.assert_frame_equal(result[key], expected[key])
+
+    with pytest.raises(TypeError):
+        get_dict_files(dd1, fnf1, [], workers=0)
+
+    return
+
+# Only the requested columns should be parsed, with the compact dtypes
+# in compact mode
+def test_get_dict_files_usecols():
+
+    dd1 = data_path_pl12_14
+    fnf1 = "PL12(1).csv"
+    usecols1 = ['Cycle', 'Voltage_Volt', 'Charge_Ah']
+
+    result = get_dict_files(dd1, fnf1, [], usecols=usecols1, compact=True)
+
+    for df_file in result.values():
+        assert set(df_file.columns) == set(usecols1), "Columns not in usecols were parsed"
+        assert df_file['Cycle'].dtype == np.int32
+        assert df_file['Voltage_Volt'].dtype == np.float32
+        assert df_file['Charge_Ah'].dtype == np.float64
+
+    result = get_dict_files(dd1, fnf1, [], usecols=usecols1)
+    for df_file in result.values():
+        assert df_file['Cycle'].dtype == np.int64
+        assert df_file['Voltage_Volt'].dtype == np.float64
+
+    with pytest.raises(TypeError):
+        get_dict_files(dd1, fnf1, [], usecols='Cycle')
+
+    return
+
+
+# A blank cycle cell should be read like without usecols
+def test_get_dict_files_blank_cycle(tmpdir):
+
+    df_file = pd.read_csv(join(data_path_pl12_14, 'PL12(1).csv'), nrows=20)
+    df_file['Cycle'] = df_file['Cycle'].astype(float)
+    df_file.loc[5, 'Cycle'] = np.nan
+    df_file.to_csv(join(str(tmpdir), 'PL12(1).csv'), index=False)
+
+    for compact in [False, True]:
+        result = get_dict_files(str(tmpdir), 'PL12(1).csv', [],
+                                usecols=['Cycle', 'Voltage_Volt'],
+                                compact=compact)
+        assert result[1]['Cycle'].isnull().sum() == 1
+
+    return
+
 ###########################################################################
 ####################### Tests for `concat_dict_dataframes()` ################
 ###########################################################################
@@ -193,6 +348,73 @@ def test_concat_dict_dataframes_Type():
     return 
 
 
+# Test that the cumulative columns continue across the files and that
+# the input dataframes are left untouched
+def test_concat_dict_dataframes_offsets():
+
+    df1 = pd.DataFrame({'Cycle': [1, 1, 2], 'Time_sec': [10., 20., 30.],
+                        'Charge_Ah': [0., 1., 2.], 'Discharge_Ah': [0., .5, 1.],
+                        'Current_Amp': [1., 1., -1.], 'Voltage_Volt': [3., 4., 3.5]})
+    df2 = df1.copy()
+    dict_ordered = {1: df1, 2: df2}
+
+    result = concat_dict_dataframes(dict_ordered)
+
+    assert list(result['Cycle']) == [1, 1, 2, 3, 3, 4]
+    assert list(result['Time_sec']) == [10., 20., 30., 40., 50., 60.]
+    assert list(result['Charge_Ah']) == [0., 1., 2., 2., 3., 4.]
+    assert list(result['Discharge_Ah']) == [0., .5, 1., 1., 1.5, 2.]
+    pd.testing.assert_frame_equal(df2, df1)
+    assert list(df2['Cycle']) == [1, 1, 2], "The input dataframe was modified"
+
+    return
+
+
+# Test that the compact mode keeps the values with smaller dtypes
+def test_concat_dict_dataframes_compact():
+
+    dict_ordered = get_dict_files(data_path_pl12_14, "PL12(1).csv", [])
+    expected = concat_dict_dataframes(dict_ordered)
+    result = concat_dict_dataframes(dict_ordered, compact=True)
+
+    assert result['Cycle'].dtype == np.int8
+    assert result['Voltage_Volt'].dtype == np.float32
+    assert result['Charge_Ah'].dtype == np.float64
+    assert list(result.columns) == list(expected.columns)
+    for col in expected.columns:
+        np.testing.assert_allclose(result[col], expected[col], rtol=1e-6)
+
+    return
+
+###########################################################################
+####################### Tests for `compact_dtypes()` ######################
+###########################################################################
+
+def test_compact_dtypes_value():
+
+    df1 = pd.DataFrame({'Cycle': [1, 300], 'Step': [1, 2],
+                        'Data_Point': [1, 70000], 'Time_sec': [10., 20.],
+                        'Voltage_Volt': [3., 4.], 'Date_Time': [735818.4, 735818.5],
+                        'Name': ['a', 'b']})
+
+    result = compact_dtypes(df1)
+
+    assert result['Cycle'].dtype == np.int16
+    assert result['Step'].dtype == np.int8
+    assert result['Data_Point'].dtype == np.int32
+    assert result['Voltage_Volt'].dtype == np.float32
+    # The cumulative values and the datenums keep their precision
+    assert result['Time_sec'].dtype == np.float64
+    assert result['Date_Time'].dtype == np.float64
+    assert result['Name'].dtype == df1['Name'].dtype
+    pd.testing.assert_frame_equal(result, df1, check_dtype=False)
+
+    with pytest.raises(TypeError):
+        compact_dtypes([1, 2, 3])
+
+    return
+
+
 ###########################################################################
 ####################### Tests for `get_cycle_capacities()` ################
 ###########################################################################
@@ -215,6 +437,131 @@ def test_get_cycle_capacities_Type():
     
     return
 
+###########################################################################
+####################### Tests for `per_cycle_capacities()` ################
+###########################################################################
+
+# Test that every cycle starts from the last value of the previous cycle
+def test_per_cycle_capacities_value():
+
+    cycle = np.array([1, 1, 2, 2, 2, 3])
+    charge = np.array([1., 2., 2., 3., 5., 6.])
+    discharge = np.array([0., 0., 1., 1., 1., 4.])
+
+    charge_cycle, discharge_cycle, net = per_cycle_capacities(cycle, charge, discharge)
+
+    np.testing.assert_allclose(charge_cycle, [1., 2., 0., 1., 3., 1.])
+    np.testing.assert_allclose(discharge_cycle, [0., 0., 1., 1., 1., 3.])
+    np.testing.assert_allclose(net, charge_cycle - discharge_cycle)
+
+    with pytest.raises(ValueError):
+        per_cycle_capacities(cycle, charge[:-1], discharge)
+
+    return
+
+###########################################################################
+####################### Tests for `supervised_arrays()` ###################
+###########################################################################
+
+# Test that the windows are views of the features with the values of
+# 'series_to_supervised'
+def test_supervised_arrays_value():
+
+    rng = np.random.RandomState(0)
+    df1 = pd.DataFrame({'Current(A)': rng.rand(20), 'Voltage(V)': rng.rand(20),
+                        'discharge_cycle_ah': rng.rand(20)})
+    features = feature_array(df1)
+    assert features.dtype == np.float32 and features.flags['C_CONTIGUOUS']
+    np.testing.assert_array_equal(features, data_formatting(df1).values)
+
+    x1, y1 = supervised_arrays(features)
+    assert x1.shape == (19, 1, 3) and y1.shape == (19,)
+    assert np.shares_memory(x1, features) and np.shares_memory(y1, features)
+    learning_df = series_to_supervised(data_formatting(df1))
+    np.testing.assert_array_equal(x1[:, 0, :], learning_df.values[:, 0:3])
+    np.testing.assert_array_equal(y1, learning_df.values[:, 3])
+
+    x2, y2 = supervised_arrays(features, n_in=4)
+    assert x2.shape == (16, 4, 3)
+    np.testing.assert_array_equal(x2[5], features[5:9])
+    assert y2[5] == features[9, 2]
+
+    x3, y3 = supervised_arrays(features, n_in=2, n_out=3)
+    assert x3.shape == (16, 2, 3) and y3.shape == (16, 3)
+    np.testing.assert_array_equal(y3[5], features[7:10, 2])
+
+    with pytest.raises(TypeError):
+        supervised_arrays(features, n_in=0)
+
+    with pytest.raises(TypeError):
+        supervised_arrays(features, n_out=0)
+
+    return
+
+
+# Test the columns and values for several lags and outputs
+def test_series_to_supervised_windows():
+
+    rng = np.random.RandomState(0)
+    df1 = pd.DataFrame(rng.rand(20, 3).astype(np.float32), index=range(100, 120))
+
+    result = series_to_supervised(df1, n_in=2, n_out=3)
+    assert list(result.columns) == [
+        'Current(t-2)', 'Voltage(t-2)', 'discharge_capacity(t-2)',
+        'Current(t-1)', 'Voltage(t-1)', 'discharge_capacity(t-1)',
+        'discharge_capacity(t)', 'discharge_capacity(t+1)',
+        'discharge_capacity(t+2)']
+    assert list(result.index) == list(range(102, 118))
+    x1, y1 = supervised_arrays(df1.values, n_in=2, n_out=3)
+    np.testing.assert_array_equal(result.values[:, :6], x1.reshape(16, 6))
+    np.testing.assert_array_equal(result.values[:, 6:], y1)
+
+    result = series_to_supervised(df1, n_in=2, n_out=3, dropnan=False)
+    assert len(result) == 20
+    assert result.iloc[:2, 0].isnull().all() and result.iloc[-2:, -1].isnull().all()
+
+    result = series_to_supervised(df1.values[:, :2], n_in=1, n_out=1)
+    assert list(result.columns) == ['var1(t-1)', 'var2(t-1)', 'var2(t)']
+
+    # A list of observations is a single variable
+    result = series_to_supervised([1, 2, 3, 4], n_in=1, n_out=1)
+    assert list(result.columns) == ['var1(t-1)', 'var1(t)']
+    np.testing.assert_array_equal(result.values, [[1, 2], [2, 3], [3, 4]])
+
+    # A series shorter than a window has no rows
+    result = series_to_supervised(df1.values[:2, :2], n_in=2, n_out=1)
+    assert len(result) == 0
+    assert list(result.columns) == ['var1(t-2)', 'var2(t-2)', 'var1(t-1)',
+                                    'var2(t-1)', 'var2(t)']
+
+    with pytest.raises(TypeError):
+        series_to_supervised(df1, n_in=0)
+
+    return
+
+
+# Test that the batches hold every window once
+def test_supervised_batches_value():
+
+    features = np.arange(60, dtype=np.float32).reshape(20, 3)
+    x1, y1 = supervised_arrays(features, n_in=3, n_out=2)
+
+    batches = list(supervised_batches(features, n_in=3, n_out=2, batch_size=4))
+    assert [len(x_batch) for x_batch, _ in batches] == [4, 4, 4, 4]
+    np.testing.assert_array_equal(np.concatenate([b[0] for b in batches]), x1)
+    np.testing.assert_array_equal(np.concatenate([b[1] for b in batches]), y1)
+
+    batches = list(supervised_batches(features, n_in=3, n_out=2, batch_size=5,
+                                      shuffle=True, seed=0))
+    x_shuffled = np.concatenate([b[0] for b in batches])
+    order = np.argsort(x_shuffled[:, 0, 0])
+    np.testing.assert_array_equal(x_shuffled[order], x1)
+
+    with pytest.raises(TypeError):
+        next(supervised_batches(features, batch_size=0))
+
+    return
+
 ###########################################################################
 ####################### Tests for `cx2_file_reader` ###########################
 ###########################################################################
@@ -283,6 +630,22 @@ df = reading_dataframes(file_names, Sheet_Name, path)
 def test_reading_dataframes():
 	assert isinstance(df, dict), 'Output is not a dictionary of dataframes'
 
+# Test that parsing the files in a process pool preserves the order
+def test_reading_dataframes_workers():
+	df_workers = reading_dataframes(file_names, Sheet_Name, path, workers=2)
+	assert list(df_workers.keys()) == list(df.keys()), 'The order of the files is not preserved'
+	for key in df:
+		pd.testing.assert_frame_equal(df_workers[key], df[key])
+
+# Test that only the requested columns are parsed from the sheets
+def test_reading_dataframes_usecols():
+	usecols = ['Cycle_Index', 'Current(A)']
+	df_cols = reading_dataframes(file_names, Sheet_Name, path, usecols=usecols)
+	for key in df:
+		assert list(df_cols[key].columns) == usecols, 'Columns not in usecols were parsed'
+		assert df_cols[key]['Current(A)'].dtype == np.float32
+		np.testing.assert_array_equal(df_cols[key]['Cycle_Index'], df[key]['Cycle_Index'])
+
 # Test the output of the function 'concat_df'
 merged_df = concat_df(df)
 def test_concat_df():
@@ -293,6 +656,16 @@ capacity_df = capacity(merged_df)
 def test_capacity():
 	assert isinstance(capacity_df,pd.DataFrame),'Output is not a dataframe'
 
+# Test that the compact mode uses less memory for the same values
+def test_capacity_compact():
+	compact_df = capacity(concat_df(df, compact=True), compact=True)
+	assert compact_df['Cycle_Index'].dtype == np.int8
+	assert compact_df['capacity_ah'].dtype == np.float32
+	assert not any(dtype == np.dtype('O') for dtype in compact_df.dtypes), 'A column was promoted to object'
+	assert compact_df.memory_usage().sum() < 0.6 * capacity_df.memory_usage().sum()
+	for col in capacity_df.columns.drop('Date_Time'):
+		np.testing.assert_allclose(compact_df[col], capacity_df[col], rtol=1e-5, atol=1e-6)
+
 # Test the output of the function 'data_formatting'
 formatted_df = data_formatting(capacity_df)
 def test_data_formatting():
@@ -325,6 +698,50 @@ def test_model_training():
 	assert isinstance(model_loss, dict),'Loss function is not a dictionary'
 	assert yhat.shape[1] == 1,'The number of columns in the output is not 1 as expected'
 
+# Test the checkpoints and the early stopping of the function 'model_training'
+def test_model_training_checkpoint(tmpdir, monkeypatch):
+	checkpoint_dir = str(tmpdir.join('checkpoints'))
+	loss1, yhat1, model1 = model_training(dd, fnf, sn, epochs=2, patience=50,
+		checkpoint_dir=checkpoint_dir, return_model=True)
+	assert sorted(os.listdir(checkpoint_dir)) == ['best.weights.h5', 'last.weights.h5', 'training_state.json']
+	assert len(loss1['val_loss']) == 2
+	assert yhat1.shape[1] == 1
+	assert hasattr(model1, 'predict')
+
+	# The training goes on from the last checkpoint
+	loss2, yhat2 = model_training(dd, fnf, sn, epochs=4, patience=50, checkpoint_dir=checkpoint_dir)
+	assert len(loss2['val_loss']) == 4
+	assert loss2['val_loss'][:2] == loss1['val_loss']
+
+	# A finished training is not run again
+	loss3, yhat3 = model_training(dd, fnf, sn, epochs=4, patience=50, checkpoint_dir=checkpoint_dir)
+	assert loss3 == loss2
+	np.testing.assert_allclose(yhat3, yhat2, rtol=1e-6)
+
+	# The best checkpoint holds the weights of the lowest validation loss
+	features = feature_array(cx2_file_reader(dd, fnf, sn))
+	model_x, model_y = supervised_arrays(features)
+	from sklearn.model_selection import train_test_split
+	_, test_x, _, test_y = train_test_split(model_x, model_y, test_size=0.2, random_state=944)
+	best_model = bd.battdeg._build_lstm(1, 3, 1)
+	best_model.load_weights(os.path.join(checkpoint_dir, 'best.weights.h5'))
+	best_loss = best_model.evaluate(test_x, test_y, batch_size=72, verbose=0)
+	np.testing.assert_allclose(best_loss, min(loss2['val_loss']), rtol=1e-4)
+	np.testing.assert_allclose(best_model.predict(test_x, verbose=0), yhat3, rtol=1e-5, atol=1e-6)
+
+	# Without learning the validation loss never improves after the first
+	# epoch, so the training stops after 1 + patience epochs
+	build_lstm = bd.battdeg._build_lstm
+	monkeypatch.setattr(bd.battdeg, '_build_lstm',
+		lambda *args, **kwargs: build_lstm(*args, **dict(kwargs, learning_rate=0.)))
+	loss4, _ = model_training(dd, fnf, sn, epochs=10, patience=2)
+	assert len(loss4['val_loss']) == 3
+	assert loss4['val_loss'][1:] == loss4['val_loss'][:1] * 2
+	monkeypatch.undo()
+
+	with pytest.raises(TypeError):
+		model_training(dd, fnf, sn, epochs=1, patience=-1)
+
 # # Test the output of the function 'model_predict'
 y_predicted = model_prediction(formatted_df)
 def test_model_prediction():
@@ -0,0 +1,124 @@
+import pandas as pd
+import numpy as np
+import os, sys
+import time
+from os.path import join
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import SheetCache
+from battdeg import reading_dataframes
+from battdeg import file_name_sorting
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+data_path_cx2 = join(data_path, 'CX2_16')
+
+
+def _write_source(path, n_rows):
+    df_source = pd.DataFrame({'Cycle_Index': np.arange(n_rows),
+                              'Voltage(V)': np.linspace(3.0, 4.2, n_rows)})
+    df_source.to_csv(path, index=False)
+    return df_source
+
+###########################################################################
+####################### Tests for `SheetCache` ############################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_sheet_cache_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        SheetCache(123)
+
+    with pytest.raises(TypeError):
+        SheetCache(str(tmpdir), max_bytes=-1)
+
+    return
+
+
+# A second fetch should return the cached dataframe without parsing
+def test_sheet_cache_hit(tmpdir):
+
+    source = str(tmpdir.join('source.csv'))
+    df_source = _write_source(source, 10)
+    cache = SheetCache(str(tmpdir.join('cache')))
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return pd.read_csv(source)
+
+    first = cache.fetch(source, 1, loader)
+    second = cache.fetch(source, 1, loader)
+
+    assert len(calls) == 1, 'The cached entry was not reused'
+    pd.testing.assert_frame_equal(first, df_source)
+    pd.testing.assert_frame_equal(second, df_source)
+
+    return
+
+
+# Changing the source file should invalidate the entry
+def test_sheet_cache_invalidation(tmpdir):
+
+    source = str(tmpdir.join('source.csv'))
+    _write_source(source, 10)
+    cache = SheetCache(str(tmpdir.join('cache')))
+    cache.fetch(source, 1, lambda: pd.read_csv(source))
+
+    df_changed = _write_source(source, 20)
+    # Make sure the modification time changes even on coarse filesystems
+    stat = os.stat(source)
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert cache.get(source, 1) is None, 'A stale entry was returned'
+    result = cache.fetch(source, 1, lambda: pd.read_csv(source))
+    pd.testing.assert_frame_equal(result, df_changed)
+
+    return
+
+
+# The least recently used entries should be evicted first
+def test_sheet_cache_eviction(tmpdir):
+
+    cache = SheetCache(str(tmpdir.join('cache')))
+    sources = []
+    for i in range(3):
+        source = str(tmpdir.join('source{}.csv'.format(i)))
+        _write_source(source, 1000)
+        sources.append(source)
+        cache.fetch(source, 1, lambda: pd.read_csv(source))
+        time.sleep(0.01)
+
+    entry_size = os.path.getsize(cache.entry_path(sources[0], 1))
+    cache.max_bytes = 2 * entry_size
+    cache.evict()
+
+    assert cache.size() <= cache.max_bytes
+    assert cache.get(sources[0], 1) is None, 'The oldest entry was not evicted'
+    assert cache.get(sources[2], 1) is not None, 'The newest entry was evicted'
+
+    return
+
+
+# Reading the excel files through the cache should match a plain read
+def test_reading_dataframes_cache(tmpdir):
+
+    file_names = file_name_sorting(
+        [f for f in os.listdir(data_path_cx2) if f.endswith('.xlsx')])
+    expected = reading_dataframes(file_names, 1, data_path_cx2)
+    cache_dir = str(tmpdir.join('cache'))
+
+    first = reading_dataframes(file_names, 1, data_path_cx2, cache=cache_dir)
+    second = reading_dataframes(file_names, 1, data_path_cx2, cache=cache_dir)
+
+    assert list(second.keys()) == list(expected.keys())
+    for key in expected:
+        pd.testing.assert_frame_equal(first[key], expected[key])
+        pd.testing.assert_frame_equal(second[key], expected[key])
+
+    return
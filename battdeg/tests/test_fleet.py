@@ -0,0 +1,138 @@
+import pandas as pd
+import numpy as np
+import os, sys
+from os.path import join
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import fleet_reader
+from battdeg import fleet_specs
+from battdeg import cx2_file_reader
+from battdeg import pl_samples_file_reader
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+data_path_pl12 = join(data_path, 'PL12')
+
+###########################################################################
+####################### Tests for `fleet_specs` ###########################
+###########################################################################
+
+# The cell directories of the data directory should be found
+def test_fleet_specs_value(tmpdir):
+
+    specs = fleet_specs(data_path)
+    assert specs == [(data_path, 'CS2_34', 1, []),
+                     (data_path, 'CX2_16', 1, []),
+                     (data_path_pl12, 'PL12(1).csv', 1, [])]
+
+    # Directories without data files are not cells
+    tmpdir.mkdir('empty')
+    assert fleet_specs(str(tmpdir)) == []
+
+    with pytest.raises(TypeError):
+        fleet_specs(123)
+
+    with pytest.raises(FileNotFoundError):
+        fleet_specs(join(data_path, 'abc'))
+
+    return
+
+###########################################################################
+####################### Tests for `fleet_reader` ##########################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_fleet_reader_BadIn():
+
+    with pytest.raises(TypeError):
+        fleet_reader(123)
+
+    with pytest.raises(TypeError):
+        fleet_reader([(data_path, 'CX2_16', 1)])
+
+    with pytest.raises(TypeError):
+        fleet_reader([(data_path, 'CX2_16', 1, [])], workers=0)
+
+    with pytest.raises(ValueError):
+        fleet_reader([(data_path, 'CX2_16', 1, []), (data_path, 'CX2_16', 1, [])])
+
+    return
+
+
+# The fleet dataframe should hold the data of every cell
+def test_fleet_reader_value():
+
+    specs = [(data_path, 'CX2_16', 1, []),
+             (data_path_pl12, 'PL12(1).csv', 1, [2])]
+    expected = {'CX2_16': cx2_file_reader(data_path, 'CX2_16', 1, usecols=[]),
+                'PL12': pl_samples_file_reader(data_path_pl12, 'PL12(1).csv',
+                                               [2], usecols=[]).rename(
+                    columns={'Time_sec': 'Test_Time(s)', 'Cycle': 'Cycle_Index',
+                             'Charge_Ah': 'Charge_Capacity(Ah)',
+                             'Discharge_Ah': 'Discharge_Capacity(Ah)'})}
+
+    for workers in [None, 2]:
+        df_fleet, errors = fleet_reader(specs, workers=workers, usecols=[])
+        assert errors == {}
+        assert df_fleet.columns[0] == 'cell_id'
+        assert list(df_fleet['cell_id'].cat.categories) == ['CX2_16', 'PL12']
+        for id_cell, df_cell in expected.items():
+            result = df_fleet[df_fleet['cell_id'] == id_cell]
+            result = result[df_cell.columns].reset_index(drop=True)
+            pd.testing.assert_frame_equal(result, df_cell, check_dtype=False)
+
+    return
+
+
+# The CX2 and PL cells should share the columns of the same values, without
+# columns promoted to object
+def test_fleet_reader_schema():
+
+    specs = [(data_path, 'CX2_16', 1, []),
+             (data_path_pl12, 'PL12(1).csv', 1, [])]
+
+    df_fleet, errors = fleet_reader(specs, usecols=[], compact=True)
+    assert errors == {}
+    assert list(df_fleet.columns) == [
+        'cell_id', 'Test_Time(s)', 'Cycle_Index', 'Current(A)', 'Voltage(V)',
+        'Charge_Capacity(Ah)', 'Discharge_Capacity(Ah)', 'charge_cycle_ah',
+        'discharge_cycle_ah', 'capacity_ah']
+    assert df_fleet['Cycle_Index'].notnull().all()
+    assert df_fleet['Cycle_Index'].dtype == np.int8
+    assert df_fleet['Voltage(V)'].dtype == np.float32
+    assert df_fleet['Test_Time(s)'].dtype == np.float64
+
+    df_fleet, errors = fleet_reader(specs, compact=True)
+    assert 'Cycle' not in df_fleet and 'Time_sec' not in df_fleet
+    assert df_fleet['Date_Time'].dtype == np.dtype('datetime64[ns]')
+    assert df_fleet['Date_Time'].notnull().all()
+    assert not any(dtype == np.dtype('O') for col, dtype in
+                   df_fleet.dtypes.items() if col != 'cell_id')
+    assert df_fleet['Step_Index'].dtype == np.int8
+
+    return
+
+
+# A cell which can not be read should not stop the other cells
+def test_fleet_reader_errors():
+
+    specs = [(data_path, 'CX2_99', 1, []),
+             (data_path_pl12, 'PL12(1).csv', 1, [])]
+
+    for workers in [None, 2]:
+        df_fleet, errors = fleet_reader(specs, workers=workers)
+        assert list(errors) == ['CX2_99']
+        assert isinstance(errors['CX2_99'], FileNotFoundError)
+        assert set(df_fleet['cell_id']) == {'PL12'}
+        assert len(df_fleet) == len(
+            pl_samples_file_reader(data_path_pl12, 'PL12(1).csv', []))
+
+    df_fleet, errors = fleet_reader(specs[:1])
+    assert df_fleet is None
+    assert list(errors) == ['CX2_99']
+
+    return
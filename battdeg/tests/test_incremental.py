@@ -0,0 +1,77 @@
+import pandas as pd
+import os, sys
+import shutil
+from os.path import join
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import cx2_incremental_reader
+from battdeg import cx2_file_reader
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+data_path_cs2 = join(data_path, 'CS2_34')
+cs2_files = ['CS2_34_8_17_10.xlsx', 'CS2_34_8_18_10.xlsx', 'CS2_34_8_19_10.xlsx']
+
+###########################################################################
+####################### Tests for `cx2_incremental_reader` ################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_cx2_incremental_reader_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        cx2_incremental_reader(data_path, 'CS2_34', 1, 123)
+
+    with pytest.raises(TypeError):
+        cx2_incremental_reader(data_path, 'CS2_34', 1.5, str(tmpdir))
+
+    with pytest.raises(FileNotFoundError):
+        cx2_incremental_reader(data_path, 'abc', 1, str(tmpdir))
+
+    return
+
+
+# Adding the files one by one should give the same data as reading them all
+def test_cx2_incremental_reader_append(tmpdir):
+
+    cell_dir = tmpdir.mkdir('CS2_34')
+    store_path = str(tmpdir.join('store'))
+
+    for i, file_name in enumerate(cs2_files):
+        shutil.copy(join(data_path_cs2, file_name), str(cell_dir))
+        store = cx2_incremental_reader(str(tmpdir), 'CS2_34', 1, store_path,
+                                       usecols=[])
+        expected = cx2_file_reader(str(tmpdir), 'CS2_34', 1, usecols=[])
+        pd.testing.assert_frame_equal(store.to_dataframe(), expected)
+        assert len(store.metadata['files']) == i + 1
+
+    # Without new files the store is returned as it is
+    rows = len(store)
+    store = cx2_incremental_reader(str(tmpdir), 'CS2_34', 1, store_path,
+                                   usecols=[])
+    assert len(store) == rows
+
+    return
+
+
+# A changed file which was already read should rebuild the store
+def test_cx2_incremental_reader_rebuild(tmpdir):
+
+    cell_dir = tmpdir.mkdir('CS2_34')
+    store_path = str(tmpdir.join('store'))
+    for file_name in cs2_files[:2]:
+        shutil.copy(join(data_path_cs2, file_name), str(cell_dir))
+    cx2_incremental_reader(str(tmpdir), 'CS2_34', 1, store_path)
+
+    # Replace the first file with the contents of the third file
+    shutil.copy(join(data_path_cs2, cs2_files[2]),
+                str(cell_dir.join(cs2_files[0])))
+    store = cx2_incremental_reader(str(tmpdir), 'CS2_34', 1, store_path)
+    expected = cx2_file_reader(str(tmpdir), 'CS2_34', 1)
+    pd.testing.assert_frame_equal(store.to_dataframe(), expected)
+
+    return
@@ -0,0 +1,109 @@
+import numpy as np
+import os, sys
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import Instrumentation
+from battdeg import instrumentation
+from battdeg import file_reader
+from battdeg import model_prediction
+from battdeg import write_pl_files
+
+###########################################################################
+####################### Tests for `Instrumentation` #######################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_instrumentation_BadIn():
+
+    with pytest.raises(TypeError):
+        Instrumentation().add_hook('statsd')
+
+    return
+
+
+# A disabled instrumentation should not record anything
+def test_instrumentation_disabled():
+
+    recorder = Instrumentation()
+    with recorder.stage('parsing') as stage:
+        stage.rows = 10
+
+    assert recorder.records() == []
+    assert list(recorder.report().columns) == [
+        'stage', 'seconds', 'rows', 'rows_per_second', 'peak_mb',
+        'max_rss_mb', 'error']
+
+    return
+
+
+# The nested stages should be named after their parents and report the
+# rows and the memory they allocated
+def test_instrumentation_value():
+
+    recorder = Instrumentation(enabled=True)
+    records = []
+    recorder.add_hook(records.append)
+    recorder.add_hook(lambda record: 1 / 0)
+
+    with pytest.warns(UserWarning):
+        with recorder.stage('reader', rows=4):
+            with recorder.stage('parsing') as stage:
+                values = np.ones(10 ** 6)
+                stage.rows = 2
+            del values
+            with pytest.raises(ValueError):
+                with recorder.stage('capacity'):
+                    raise ValueError('bad file')
+
+    df_report = recorder.report()
+    assert list(df_report['stage']) == ['reader', 'reader/parsing',
+                                        'reader/capacity']
+    assert [r['stage'] for r in records] == ['reader/parsing',
+                                             'reader/capacity', 'reader']
+    assert list(df_report['rows'][:2]) == [4, 2]
+    assert df_report['error'].iloc[2] == "ValueError('bad file')"
+    # The 8 MB array counts in the peak of the stage and of its parent
+    assert df_report['peak_mb'].iloc[1] > 7
+    assert df_report['peak_mb'].iloc[0] >= df_report['peak_mb'].iloc[1]
+    assert df_report['peak_mb'].iloc[2] < 1
+
+    df_total = recorder.report(aggregate=True)
+    assert list(df_total['calls']) == [1, 1, 1]
+    assert list(df_total['errors']) == [0, 0, 1]
+
+    return
+
+###########################################################################
+####################### Tests for the instrumented functions ##############
+###########################################################################
+
+# The reader and the prediction should record their stages
+def test_instrumented_functions(tmpdir):
+
+    data_dir = str(tmpdir)
+    write_pl_files(data_dir, n_cycles=10, points_per_cycle=20, n_files=2)
+
+    class ConstantModel(object):
+        def predict(self, x, batch_size=None):
+            return np.zeros((len(x), 1))
+
+    with instrumentation.recording(trace_memory=False) as recorder:
+        df_data = file_reader(data_dir, 'PL99(1).csv', 1, [])
+        model_prediction(df_data, model=ConstantModel())
+    assert not instrumentation.enabled
+
+    df_report = recorder.report().set_index('stage')
+    prefix = 'file_reader/pl_samples_file_reader/'
+    for stage in ['listing', 'parsing', 'stitching', 'capacity']:
+        assert prefix + stage in df_report.index
+    assert df_report.loc[prefix + 'parsing', 'rows'] == 200
+    assert df_report.loc['file_reader', 'rows'] == len(df_data)
+    assert df_report.loc['file_reader/formatting', 'rows'] == len(df_data)
+    assert df_report.loc['model_prediction/predicting', 'rows'] == \
+        len(df_data) - 1
+    assert df_report['peak_mb'].isnull().all()
+
+    return
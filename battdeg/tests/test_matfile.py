@@ -0,0 +1,175 @@
+import pandas as pd
+import numpy as np
+import os, sys
+from os.path import join
+import h5py
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import MatCellFile
+from battdeg import pl_samples_mat_reader
+from battdeg import pl_samples_file_reader
+from battdeg import synthetic_pl_frames
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+data_path_pl12 = join(data_path, 'PL12')
+
+
+def _write_mat(file_path, segments):
+    """
+    Writes the dataframes of the segments like MATLAB saves a cell array of
+    structs with -v7.3: the structs are groups in '#refs#' and the cell array
+    is a dataset of references to them. Vectors are stored as (1, n) datasets.
+    """
+    with h5py.File(file_path, 'w') as mat_file:
+        refs = mat_file.create_group('#refs#')
+        references = []
+        for i, df_segment in enumerate(segments):
+            group = refs.create_group('s{}'.format(i))
+            group.attrs['MATLAB_class'] = np.bytes_('struct')
+            for col in df_segment.columns:
+                dataset = group.create_dataset(
+                    col, data=df_segment[col].values.astype(float)[np.newaxis, :])
+                dataset.attrs['MATLAB_class'] = np.bytes_('double')
+            references.append(group.ref)
+        cell = mat_file.create_dataset(
+            'PL12', data=np.array(references, dtype=h5py.special_dtype(ref=h5py.Reference))[:, np.newaxis])
+        cell.attrs['MATLAB_class'] = np.bytes_('cell')
+    return file_path
+
+
+def _pl12_segments():
+    return [pd.read_csv(join(data_path_pl12, 'PL12({}).csv'.format(i)))
+            for i in range(1, 4)]
+
+
+def _cycling_segments(n_segments=3):
+    # Segments of five cycles of ten points
+    return list(synthetic_pl_frames(n_cycles=5 * n_segments,
+                                    points_per_cycle=10,
+                                    n_files=n_segments).values())
+
+###########################################################################
+####################### Tests for `pl_samples_mat_reader` #################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_pl_samples_mat_reader_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        pl_samples_mat_reader(123)
+
+    with pytest.raises(FileNotFoundError):
+        pl_samples_mat_reader(str(tmpdir.join('abc.mat')))
+
+    # MATLAB 5.0 files and csv files are not HDF5 files
+    with pytest.raises(ValueError):
+        pl_samples_mat_reader(join(data_path_pl12, 'PL12(1).csv'))
+
+    mat_path = _write_mat(str(tmpdir.join('PL12.mat')), _pl12_segments())
+    with pytest.raises(TypeError):
+        pl_samples_mat_reader(mat_path, ignore_file_indices=1)
+
+    with pytest.raises(TypeError):
+        pl_samples_mat_reader(mat_path, cycles=3)
+
+    return
+
+
+# The .mat file should give the same data as the csv files exported from it
+def test_pl_samples_mat_reader_value(tmpdir):
+
+    mat_path = _write_mat(str(tmpdir.join('PL12.mat')), _pl12_segments())
+
+    for ignore in [[], [2]]:
+        expected = pl_samples_file_reader(data_path_pl12, 'PL12(1).csv', ignore)
+        result = pl_samples_mat_reader(mat_path, ignore)
+        pd.testing.assert_frame_equal(result[expected.columns], expected,
+                                      check_dtype=False)
+
+    return
+
+
+# A range of cycles should be the same rows as in the whole data
+def test_pl_samples_mat_reader_cycles(tmpdir):
+
+    mat_path = _write_mat(str(tmpdir.join('PL12.mat')), _cycling_segments())
+    expected = pl_samples_mat_reader(mat_path)
+    assert expected['Cycle'].max() == 15
+
+    # Ranges within a segment, across segments and past the end of the data
+    for first_cycle, last_cycle in [(1, 3), (2, 7), (5, 6), (6, 16), (9, 30)]:
+        result = pl_samples_mat_reader(mat_path, cycles=(first_cycle, last_cycle))
+        rows = (expected['Cycle'] >= first_cycle) & (expected['Cycle'] < last_cycle)
+        pd.testing.assert_frame_equal(
+            result, expected[rows].reset_index(drop=True))
+
+    assert pl_samples_mat_reader(mat_path, cycles=(20, 30)) is None
+
+    return
+
+###########################################################################
+####################### Tests for `MatCellFile` ###########################
+###########################################################################
+
+# Only the channels asked for should be read
+def test_MatCellFile_read_segments(tmpdir):
+
+    segments = _pl12_segments()
+    mat_path = _write_mat(str(tmpdir.join('PL12.mat')), segments)
+
+    with MatCellFile(mat_path) as mat_file:
+        assert mat_file.segment_numbers == [1, 2, 3]
+        assert mat_file.segment_length(2) == len(segments[1])
+
+        dict_segments = mat_file.read_segments(usecols=[])
+        assert list(dict_segments) == [1, 2, 3]
+        assert set(dict_segments[1].columns) == {
+            'Time_sec', 'Cycle', 'Current_Amp', 'Voltage_Volt', 'Charge_Ah',
+            'Discharge_Ah'}
+
+        dict_segments = mat_file.read_segments(usecols=['Date_Time'])
+        assert np.allclose(dict_segments[3]['Date_Time'],
+                           segments[2]['Date_Time'])
+
+        with pytest.raises(KeyError):
+            mat_file.read_segments(usecols=['abc'])
+
+        assert np.array_equal(mat_file.read_channel(1, 'Voltage_Volt', 5, 9),
+                              segments[0]['Voltage_Volt'].values[5:9])
+
+    return
+
+
+# The rows of the cycles should be found in a segment
+def test_MatCellFile_cycle_rows(tmpdir):
+
+    mat_path = _write_mat(str(tmpdir.join('PL12.mat')),
+                          _cycling_segments(n_segments=1))
+
+    with MatCellFile(mat_path) as mat_file:
+        assert mat_file.cycle_rows(1, 1, 2) == (0, 10)
+        assert mat_file.cycle_rows(1, 2, 4) == (10, 30)
+        assert mat_file.cycle_rows(1, 5, 9) == (40, 50)
+        assert mat_file.cycle_rows(1, 7, 9) == (50, 50)
+
+    return
+
+
+# MATLAB tables can not be read and should raise a ValueError
+def test_MatCellFile_table(tmpdir):
+
+    mat_path = str(tmpdir.join('PL03.mat'))
+    with h5py.File(mat_path, 'w') as mat_file:
+        table = mat_file.create_dataset('PL03', data=np.zeros((1, 6), dtype=np.uint32))
+        table.attrs['MATLAB_class'] = np.bytes_('table')
+        table.attrs['MATLAB_object_decode'] = 3
+
+    with pytest.raises(ValueError):
+        MatCellFile(mat_path)
+
+    return
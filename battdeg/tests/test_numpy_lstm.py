@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+import os, sys
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import NumpyLSTM
+from battdeg import export_numpy_model
+from battdeg import model_prediction
+from battdeg import model_prediction_stream
+from battdeg.registry import DEFAULT_MODEL_PATH
+
+
+def _keras_model(n_in=1, recurrent_activation='sigmoid', n_out=1):
+    from keras.models import Sequential
+    from keras.layers import Dense, LSTM
+    model = Sequential()
+    model.add(LSTM(7, input_shape=(n_in, 3),
+                   recurrent_activation=recurrent_activation))
+    model.add(Dense(n_out))
+    # The biases are zero when the model is created
+    model.set_weights([w + np.random.RandomState(i).normal(0, .3, w.shape)
+                       for i, w in enumerate(model.get_weights())])
+    return model
+
+
+def _input_data(n_rows):
+    rng = np.random.RandomState(1)
+    return pd.DataFrame({'Current(A)': rng.uniform(-1, 1, n_rows),
+                         'Voltage(V)': rng.uniform(3, 4.2, n_rows),
+                         'discharge_cycle_ah': rng.uniform(0, 1, n_rows)})
+
+###########################################################################
+####################### Tests for `NumpyLSTM` #############################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_NumpyLSTM_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        NumpyLSTM.load(123)
+
+    with pytest.raises(FileNotFoundError):
+        NumpyLSTM.load(str(tmpdir.join('abc.h5')))
+
+    with pytest.raises(ValueError):
+        NumpyLSTM([{'class_name': 'GRU', 'weights': []}])
+
+    with pytest.raises(ValueError):
+        NumpyLSTM.load(DEFAULT_MODEL_PATH).predict(np.zeros((4, 3)))
+
+    return
+
+
+# The predictions should match the keras predictions
+def test_NumpyLSTM_value(tmpdir):
+
+    for n_in, recurrent_activation, n_out in [(1, 'sigmoid', 1), (4, 'sigmoid', 2),
+                                              (3, 'hard_sigmoid', 1)]:
+        model = _keras_model(n_in, recurrent_activation, n_out)
+        model_path = str(tmpdir.join('model_{}.h5'.format(n_in)))
+        model.save(model_path)
+        x = np.random.RandomState(2).uniform(-2, 2, (500, n_in, 3)).astype(np.float32)
+        expected = model.predict(x, verbose=0)
+
+        for numpy_model in [NumpyLSTM.from_h5(model_path), NumpyLSTM.from_keras(model),
+                            NumpyLSTM.load(export_numpy_model(
+                                model_path, str(tmpdir.join('model_{}'.format(n_in)))))]:
+            result = numpy_model.predict(x, batch_size=64)
+            assert result.dtype == np.float32
+            np.testing.assert_allclose(result, expected, rtol=1e-5, atol=1e-5)
+
+    return
+
+
+# The shipped model should predict without keras through 'model_prediction'
+def test_NumpyLSTM_model_prediction(tmpdir):
+
+    npz_path = export_numpy_model(DEFAULT_MODEL_PATH, str(tmpdir.join('lstm.npz')))
+    assert npz_path.endswith('.npz')
+    numpy_model = NumpyLSTM.load(npz_path)
+    assert [layer['class_name'] for layer in numpy_model.layers] == ['LSTM', 'Dense']
+    assert numpy_model.layers[0]['recurrent_activation'] == 'hard_sigmoid'
+
+    input_data = _input_data(1000)
+    y_predicted = model_prediction(input_data, model=numpy_model)
+    assert y_predicted.shape == (999, 1)
+    batches = model_prediction_stream([input_data[:300], input_data[300:]],
+                                      model=numpy_model, batch_size=128)
+    np.testing.assert_array_equal(np.concatenate(list(batches)), y_predicted)
+
+    # Forward pass of the keras 2 LSTM cell for the first window, with zero states
+    kernel, _, bias = numpy_model.layers[0]['weights']
+    dense_kernel, dense_bias = numpy_model.layers[1]['weights']
+    z = input_data.values[0].astype(np.float32).dot(kernel) + bias
+    gate = lambda v: np.clip(0.2 * v + 0.5, 0, 1)
+    cell = gate(z[:50]) * np.tanh(z[100:150])
+    hidden = gate(z[150:]) * np.tanh(cell)
+    np.testing.assert_allclose(y_predicted[0], hidden.dot(dense_kernel) + dense_bias,
+                               rtol=1e-5)
+
+    return
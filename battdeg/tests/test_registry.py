@@ -0,0 +1,178 @@
+import pandas as pd
+import numpy as np
+import os, sys
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import ModelRegistry
+from battdeg import model_prediction
+from battdeg import model_prediction_stream
+from battdeg import feature_array
+
+
+class CountingLoader(object):
+    """
+    Loader returning a new object for every call, counting the calls.
+    """
+    def __init__(self):
+        self.paths = []
+
+    def __call__(self, path):
+        self.paths.append(path)
+        return object()
+
+
+def _lstm_model():
+    from keras.models import Sequential
+    from keras.layers import Dense, LSTM
+
+    model = Sequential()
+    model.add(LSTM(4, input_shape=(1, 3)))
+    model.add(Dense(1))
+    return model
+
+
+def _input_data(n_rows):
+    rng = np.random.RandomState(0)
+    return pd.DataFrame(rng.rand(n_rows, 3).astype(np.float32),
+                        columns=['Current(A)', 'Voltage(V)', 'discharge_cycle_ah'])
+
+
+def _write_model_file(tmpdir, name, content='model'):
+    model_file = tmpdir.join(name)
+    model_file.write(content)
+    return str(model_file)
+
+###########################################################################
+####################### Tests for `ModelRegistry` #########################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_ModelRegistry_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        ModelRegistry(max_models=0)
+
+    registry = ModelRegistry(loader=CountingLoader())
+    with pytest.raises(TypeError):
+        registry.get(123)
+
+    with pytest.raises(FileNotFoundError):
+        registry.get(str(tmpdir.join('abc.h5')))
+
+    with pytest.raises(TypeError):
+        registry.resolve(123)
+
+    return
+
+
+# A model file should be loaded once, and again when it is modified
+def test_ModelRegistry_reload(tmpdir):
+
+    loader = CountingLoader()
+    registry = ModelRegistry(loader=loader)
+    path = _write_model_file(tmpdir, 'a.h5')
+
+    model = registry.get(path)
+    assert registry.get(path) is model
+    assert registry.resolve(path) is model
+    assert len(loader.paths) == 1
+
+    # A new modification time reloads the model
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10 ** 9))
+    assert registry.get(path) is not model
+    assert len(loader.paths) == 2
+
+    registry.evict(path)
+    assert path not in registry
+    registry.get(path)
+    assert len(loader.paths) == 3
+
+    # A model object is used as it is
+    class Model(object):
+        def predict(self, x):
+            return x
+    own_model = Model()
+    assert registry.resolve(own_model) is own_model
+
+    return
+
+
+# The least recently used model should be dropped first
+def test_ModelRegistry_lru(tmpdir):
+
+    loader = CountingLoader()
+    registry = ModelRegistry(max_models=2, loader=loader)
+    paths = [_write_model_file(tmpdir, name) for name in ['a.h5', 'b.h5', 'c.h5']]
+
+    registry.get(paths[0])
+    registry.get(paths[1])
+    registry.get(paths[0])
+    registry.get(paths[2])
+    assert len(registry) == 2
+    assert paths[0] in registry and paths[2] in registry
+    assert paths[1] not in registry
+    assert len(loader.paths) == 3
+
+    registry.clear()
+    assert len(registry) == 0
+
+    return
+
+
+# A saved keras model should be usable by 'model_prediction'
+def test_model_prediction_model_path(tmpdir):
+
+    model = _lstm_model()
+    path = str(tmpdir.join('model.h5'))
+    model.save(path)
+
+    input_data = _input_data(30)
+    expected = model_prediction(input_data, model=model)
+    assert expected.shape == (29, 1)
+    np.testing.assert_allclose(model_prediction(input_data, model=path),
+                               expected, rtol=1e-5)
+
+    return
+
+###########################################################################
+####################### Tests for `model_prediction_stream` ###############
+###########################################################################
+
+# The predictions of the chunks should be the predictions of the whole data
+def test_model_prediction_stream_value(tmpdir):
+
+    model = _lstm_model()
+    input_data = _input_data(500)
+    expected = model_prediction(input_data, model=model, batch_size=64)
+
+    # Chunks smaller and larger than the batches, and of a single point
+    for chunksize in [1, 50, 64, 333, 1000]:
+        chunks = [input_data.iloc[i:i + chunksize]
+                  for i in range(0, len(input_data), chunksize)]
+        batches = list(model_prediction_stream(chunks, model=model,
+                                               batch_size=64))
+        assert all(len(y_batch) <= 64 for y_batch in batches)
+        np.testing.assert_array_equal(np.concatenate(batches), expected)
+
+    # A memory-mapped array written to a memory-mapped output
+    features = np.memmap(str(tmpdir.join('x.bin')), dtype=np.float32,
+                         mode='w+', shape=(500, 3))
+    features[:] = feature_array(input_data)
+    out = np.memmap(str(tmpdir.join('y.bin')), dtype=np.float32,
+                    mode='w+', shape=(499, 1))
+    result = model_prediction_stream(features, model=model, batch_size=64,
+                                     out=out)
+    assert result is out
+    np.testing.assert_array_equal(out, expected)
+
+    with pytest.raises(TypeError):
+        model_prediction_stream([input_data], model=model, batch_size=0)
+
+    with pytest.raises(ValueError):
+        model_prediction_stream([input_data], model=model,
+                                out=np.zeros((10, 1)))
+
+    return
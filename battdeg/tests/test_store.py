@@ -0,0 +1,173 @@
+import pandas as pd
+import numpy as np
+import os, sys
+from os.path import join
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import battdeg.store
+from battdeg import CellStore
+from battdeg import pl_samples_file_reader
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+data_path_pl12 = join(data_path, 'PL12')
+
+
+def _cell_data():
+    n_points = [3, 5, 2, 4]
+    cycle = np.repeat(np.arange(1, len(n_points) + 1), n_points).astype(np.int32)
+    return pd.DataFrame({
+        'Cycle_Index': cycle,
+        'Test_Time(s)': np.arange(len(cycle), dtype=np.float64),
+        'Voltage(V)': np.linspace(3, 4.2, len(cycle)).astype(np.float32),
+        'Date_Time': pd.date_range('2012-01-12', periods=len(cycle), freq='s')})
+
+###########################################################################
+####################### Tests for `CellStore` #############################
+###########################################################################
+
+# The wrong type input should raise an exception
+def test_cell_store_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        CellStore.write(123, _cell_data())
+
+    with pytest.raises(TypeError):
+        CellStore.write(str(tmpdir), [1, 2, 3])
+
+    with pytest.raises(TypeError):
+        CellStore.write(str(tmpdir), pd.DataFrame({'Cycle': [1], 'a': ['x']}))
+
+    with pytest.raises(Exception, match="the dataframe doesnt have the cycle column"):
+        CellStore.write(str(tmpdir), pd.DataFrame({'a': [1, 2]}))
+
+    with pytest.raises(FileNotFoundError):
+        CellStore.open(str(tmpdir.join('missing')))
+
+    return
+
+
+# The columns read back should be memory-mapped copies of the dataframe
+def test_cell_store_roundtrip(tmpdir):
+
+    df_cell = _cell_data()
+    path = str(tmpdir.join('store'))
+    CellStore.write(path, df_cell)
+    store = CellStore.open(path)
+
+    assert store.columns == list(df_cell.columns)
+    assert len(store) == len(df_cell)
+    assert isinstance(store['Voltage(V)'], np.memmap), 'The column is not memory-mapped'
+    pd.testing.assert_frame_equal(store.to_dataframe(), df_cell)
+
+    # An existing store is only replaced if asked for
+    with pytest.raises(FileExistsError):
+        CellStore.write(path, df_cell)
+    CellStore.write(path, df_cell.iloc[:3], overwrite=True)
+    assert len(CellStore.open(path)) == 3
+
+    return
+
+
+# Overwriting a store with fewer columns should remove the files of the
+# columns which are not written again
+def test_cell_store_overwrite(tmpdir):
+
+    df_cell = _cell_data()
+    path = str(tmpdir.join('store'))
+    CellStore.write(path, df_cell)
+    assert len([f for f in os.listdir(path) if f.startswith('col_')]) == 4
+
+    df_fewer = df_cell[['Cycle_Index', 'Voltage(V)']]
+    store = CellStore.write(path, df_fewer, overwrite=True)
+
+    assert sorted(f for f in os.listdir(path) if f.startswith('col_')) == \
+        ['col_0.bin', 'col_1.bin']
+    pd.testing.assert_frame_equal(store.to_dataframe(), df_fewer)
+
+    return
+
+
+# The cycle index should give the rows of a range of cycles
+def test_cell_store_cycles(tmpdir):
+
+    df_cell = _cell_data()
+    store = CellStore.write(str(tmpdir), df_cell)
+
+    assert store.n_cycles == 4
+    assert store.cycle_rows(2) == (3, 8)
+    assert store.cycle_rows(2, 4) == (3, 10)
+    assert store.cycle_rows(5, 7) == (14, 14)
+
+    cycles = store.cycles(2, 4, columns=['Cycle_Index', 'Test_Time(s)'])
+    assert list(cycles['Cycle_Index']) == [2] * 5 + [3] * 2
+    np.testing.assert_array_equal(cycles['Test_Time(s)'], np.arange(3, 10))
+
+    return
+
+
+# The output of the PL reader should be stored and read back unchanged
+def test_cell_store_pl_samples(tmpdir):
+
+    df_pl = pl_samples_file_reader(data_path_pl12, 'PL12(1).csv', [])
+    store = CellStore.write(str(tmpdir), df_pl)
+
+    assert store.cycle_column == 'Cycle'
+    pd.testing.assert_frame_equal(store.to_dataframe(), df_pl)
+
+    return
+
+
+# Appending rows should extend the columns and continue the last cycle
+def test_cell_store_append(tmpdir):
+
+    df_cell = _cell_data()
+    store = CellStore.write(str(tmpdir), df_cell.iloc[:5], metadata={'files': 1})
+    old_voltage = store['Voltage(V)']
+
+    store = store.append(df_cell.iloc[5:], metadata={'files': 2})
+
+    pd.testing.assert_frame_equal(store.to_dataframe(), df_cell)
+    assert store.metadata == {'files': 2}
+    assert store.n_cycles == 4, 'The cycle split by the append was counted twice'
+    assert store.cycle_rows(2) == (3, 8)
+    # Arrays mapped before the append are still valid
+    np.testing.assert_array_equal(old_voltage, df_cell['Voltage(V)'].values[:5])
+
+    with pytest.raises(ValueError):
+        store.append(df_cell[['Cycle_Index']])
+
+    return
+
+
+# An append interrupted before the manifest is replaced should leave the
+# store with its previous rows and cycle index
+def test_cell_store_append_interrupted(tmpdir, monkeypatch):
+
+    df_cell = _cell_data()
+    CellStore.write(str(tmpdir), df_cell.iloc[:5])
+    store = CellStore.open(str(tmpdir))
+
+    def crash(path, manifest):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(battdeg.store, '_write_manifest', crash)
+    with pytest.raises(KeyboardInterrupt):
+        store.append(df_cell.iloc[5:])
+    monkeypatch.undo()
+
+    store = CellStore.open(str(tmpdir))
+    pd.testing.assert_frame_equal(store.to_dataframe(), df_cell.iloc[:5])
+    assert store.n_cycles == 2
+    assert store.cycle_rows(2) == (3, 5)
+
+    store = store.append(df_cell.iloc[5:])
+    pd.testing.assert_frame_equal(store.to_dataframe(), df_cell)
+    assert sorted(name for name in os.listdir(str(tmpdir))
+                  if name.startswith('cycle_')) == ['cycle_numbers.2.bin',
+                                                    'cycle_starts.2.bin']
+
+    return
@@ -0,0 +1,116 @@
+import pandas as pd
+import numpy as np
+import os, sys
+from os.path import join
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import cycle_summary
+from battdeg import pl_samples_cycle_summary
+from battdeg import pl_samples_file_reader
+from battdeg import cx2_file_reader
+from battdeg import write_pl_files
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+data_path_pl12 = join(data_path, 'PL12')
+
+
+def _write_pl_files(tmpdir):
+    # Two files of five cycles each
+    write_pl_files(str(tmpdir), 'PL12', n_cycles=10, points_per_cycle=13,
+                   n_files=2)
+    return str(tmpdir)
+
+
+def _groupby_summary(df_data, cycle, time):
+    """
+    The summary computed with pandas on the whole dataframe.
+    """
+    power = df_data['Voltage(V)'] * df_data['Current(A)']
+    energy = power * df_data[time].diff().fillna(0) / 3600.
+    grouped = pd.DataFrame({
+        cycle: df_data[cycle], 'time': df_data[time],
+        'charge': df_data['charge_cycle_ah'],
+        'discharge': df_data['discharge_cycle_ah'],
+        'voltage': df_data['Voltage(V)'],
+        'charge_energy': energy.clip(lower=0),
+        'discharge_energy': (-energy).clip(lower=0)}).groupby(cycle, sort=False)
+    expected = pd.DataFrame({
+        cycle: grouped[cycle].first().values,
+        'n_points': grouped.size().values,
+        'duration_s': (grouped['time'].last() - grouped['time'].first()).values,
+        'charge_ah': grouped['charge'].max().values,
+        'discharge_ah': grouped['discharge'].max().values,
+        'min_voltage': grouped['voltage'].min().values,
+        'max_voltage': grouped['voltage'].max().values,
+        'charge_energy_wh': grouped['charge_energy'].sum().values,
+        'discharge_energy_wh': grouped['discharge_energy'].sum().values})
+    expected['coulombic_efficiency'] = \
+        expected['discharge_ah'] / expected['charge_ah']
+    return expected
+
+###########################################################################
+####################### Tests for `cycle_summary` #########################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_cycle_summary_BadIn():
+
+    with pytest.raises(TypeError):
+        cycle_summary(123)
+
+    with pytest.raises(TypeError):
+        cycle_summary([123])
+
+    with pytest.raises(Exception):
+        cycle_summary(pd.DataFrame({'Cycle': [1, 2]}))
+
+    assert cycle_summary([]) is None
+
+    return
+
+
+# The summary should be the same as with a pandas groupby
+def test_cycle_summary_value(tmpdir):
+
+    dd1 = _write_pl_files(tmpdir)
+    df_pl = pl_samples_file_reader(dd1, 'PL12(1).csv', [])
+    result = cycle_summary(df_pl)
+    expected = _groupby_summary(df_pl, 'Cycle', 'Time_sec')
+    assert len(result) == 10
+    pd.testing.assert_frame_equal(result[expected.columns], expected,
+                                  check_dtype=False)
+
+    df_cx2 = cx2_file_reader(data_path, 'CX2_16', 1, usecols=[])
+    result = cycle_summary(df_cx2)
+    expected = _groupby_summary(df_cx2, 'Cycle_Index', 'Test_Time(s)')
+    assert list(result.columns[:2]) == ['Cycle_Index', 'n_points']
+    pd.testing.assert_frame_equal(result[expected.columns], expected,
+                                  check_dtype=False)
+
+    return
+
+
+# The summary of the chunks should be the summary of the whole data
+def test_cycle_summary_chunks(tmpdir):
+
+    dd1 = _write_pl_files(tmpdir)
+    expected = cycle_summary(pl_samples_file_reader(dd1, 'PL12(1).csv', []))
+
+    # Chunk sizes which split the cycles and which hold several cycles
+    for chunksize in [1, 7, 13, 30, 1000]:
+        result = pl_samples_cycle_summary(dd1, 'PL12(1).csv', [],
+                                          chunksize=chunksize)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    expected = cycle_summary(pl_samples_file_reader(data_path_pl12,
+                                                    'PL12(1).csv', []))
+    result = pl_samples_cycle_summary(data_path_pl12, 'PL12(1).csv', [],
+                                      chunksize=500)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    return
@@ -0,0 +1,113 @@
+import numpy as np
+import os, sys
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import grid_trials
+from battdeg import random_trials
+from battdeg import hyperparameter_sweep
+
+
+def _features(n_rows=120):
+    rng = np.random.RandomState(0)
+    return rng.uniform(0, 1, (n_rows, 3)).astype(np.float32)
+
+###########################################################################
+####################### Tests for `grid_trials` and `random_trials` #######
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_trials_BadIn():
+
+    with pytest.raises(TypeError):
+        grid_trials([('units', [10, 20])])
+
+    with pytest.raises(ValueError):
+        grid_trials({'layers': [1, 2]})
+
+    with pytest.raises(TypeError):
+        random_trials({'units': [10, 20]}, 0)
+
+    return
+
+
+# The trials should cover the space with the defaults for the other values
+def test_trials_value():
+
+    trials = grid_trials({'units': [10, 20], 'n_in': [1, 2, 4]})
+    assert len(trials) == 6
+    assert {(t['units'], t['n_in']) for t in trials} == {
+        (u, n) for u in [10, 20] for n in [1, 2, 4]}
+    assert all(t['epochs'] == 50 and t['batch_size'] == 72 for t in trials)
+
+    trials = random_trials({'units': (10, 20), 'learning_rate': (1e-4, 1e-2),
+                            'batch_size': [16, 32]}, 20, seed=0)
+    assert trials == random_trials({'units': (10, 20), 'learning_rate': (1e-4, 1e-2),
+                                    'batch_size': [16, 32]}, 20, seed=0)
+    assert all(10 <= t['units'] <= 20 and isinstance(t['units'], int) for t in trials)
+    assert all(1e-4 <= t['learning_rate'] <= 1e-2 for t in trials)
+    assert {t['batch_size'] for t in trials} == {16, 32}
+
+    return
+
+###########################################################################
+####################### Tests for `hyperparameter_sweep` ##################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_hyperparameter_sweep_BadIn():
+
+    with pytest.raises(TypeError):
+        hyperparameter_sweep('abc', [{}])
+
+    with pytest.raises(TypeError):
+        hyperparameter_sweep(_features(), [])
+
+    with pytest.raises(ValueError):
+        hyperparameter_sweep(_features(), [{'layers': 2}])
+
+    with pytest.raises(TypeError):
+        hyperparameter_sweep(_features(), [{}], workers=0)
+
+    return
+
+
+# Every trial should be run in the worker processes and ranked
+def test_hyperparameter_sweep_value(tmpdir):
+
+    trials = grid_trials({'units': [4, 8], 'n_in': [1, 3], 'epochs': [2],
+                          'batch_size': [32], 'learning_rate': [1e-3]})
+    # A window longer than the data makes its trial fail
+    trials.append(dict(trials[0], n_in=500))
+    df_results = hyperparameter_sweep(_features(), trials, workers=2,
+                                      scratch_dir=str(tmpdir))
+
+    assert list(df_results['rank']) == [1, 2, 3, 4, 5]
+    assert len(df_results) == 5
+    finished = df_results[df_results['error'].isnull()]
+    assert len(finished) == 4
+    assert finished['val_loss'].is_monotonic_increasing
+    assert (finished['best_val_loss'] <= finished['val_loss']).all()
+    assert (df_results['wall_time_s'] > 0).all()
+    assert df_results['error'].iloc[-1] is not None
+    assert df_results['n_in'].iloc[-1] == 500
+    # The scratch files are removed after the sweep
+    assert os.listdir(str(tmpdir)) == []
+
+    return
+
+
+# A sweep with a single worker should not limit the threads of the caller
+def test_hyperparameter_sweep_threads():
+
+    environ = dict(os.environ)
+    trials = [dict(units=4, epochs=1, batch_size=32)]
+    df_results = hyperparameter_sweep(_features(), trials, workers=1,
+                                      threads_per_worker=1)
+
+    assert df_results['error'].isnull().all()
+    assert dict(os.environ) == environ
+
+    return
@@ -0,0 +1,154 @@
+import pandas as pd
+import numpy as np
+import os, sys
+from os.path import join
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import capacity_fade
+from battdeg import synthetic_pl_frames
+from battdeg import synthetic_cx2_frames
+from battdeg import write_pl_files
+from battdeg import write_cx2_files
+from battdeg import concat_dict_dataframes
+from battdeg import get_cycle_capacities
+from battdeg import pl_samples_file_reader
+from battdeg import concat_df
+from battdeg import capacity
+from battdeg import cx2_file_reader
+from battdeg import CX2_COLUMNS
+
+# Path for data for testing
+module_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(module_dir, 'data')
+
+###########################################################################
+####################### Tests for `capacity_fade` #########################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_capacity_fade_BadIn():
+
+    with pytest.raises(TypeError):
+        capacity_fade(0)
+
+    with pytest.raises(ValueError):
+        capacity_fade(10, profile='abc')
+
+    with pytest.raises(ValueError):
+        capacity_fade(10, end_of_life=1.5)
+
+    return
+
+
+# The capacity should fade from the capacity to the end of life
+def test_capacity_fade_value():
+
+    for profile in ['linear', 'sqrt', 'knee', lambda t: t ** 2]:
+        capacities = capacity_fade(50, capacity_ah=2., profile=profile, end_of_life=0.7)
+        assert len(capacities) == 50
+        assert np.isclose(capacities[0], 2.) and np.isclose(capacities[-1], 1.4)
+        assert (np.diff(capacities) <= 0).all()
+
+    np.testing.assert_allclose(capacity_fade(3, 1., 'linear', 0.8), [1., 0.9, 0.8])
+
+    return
+
+###########################################################################
+####################### Tests for the synthetic frames ####################
+###########################################################################
+
+# The PL frames should have the columns of the csv files and the capacities of the fade
+def test_synthetic_pl_frames_value():
+
+    frames = synthetic_pl_frames(n_cycles=30, points_per_cycle=40, n_files=4,
+                                 fade='sqrt', coulombic_efficiency=0.99, seed=0)
+    assert list(frames) == [1, 2, 3, 4]
+    columns = pd.read_csv(join(data_path, 'PL12', 'PL12(1).csv'), nrows=1).columns
+    assert all(list(df.columns) == list(columns) for df in frames.values())
+    assert sum(len(df) for df in frames.values()) == 30 * 40
+    # Every file restarts the cycles and the cumulative values
+    assert all(df['Cycle'].iloc[0] == 1 and df['Charge_Ah'].iloc[0] < 0.1
+               for df in frames.values())
+
+    df_cycles = get_cycle_capacities(concat_dict_dataframes(frames))
+    per_cycle = df_cycles.groupby('Cycle')[['charge_cycle_ah', 'discharge_cycle_ah']].max()
+    expected = capacity_fade(30, profile='sqrt')
+    np.testing.assert_allclose(per_cycle['charge_cycle_ah'], expected)
+    np.testing.assert_allclose(per_cycle['discharge_cycle_ah'], expected * 0.99)
+    assert df_cycles['Voltage(V)'].between(2.5, 4.5).all()
+
+    # The same seed gives the same data
+    pd.testing.assert_frame_equal(
+        synthetic_pl_frames(5, 10, seed=3)[1], synthetic_pl_frames(5, 10, seed=3)[1])
+
+    return
+
+
+# The CX2 frames should have the columns of the excel sheets and the capacities of the fade
+def test_synthetic_cx2_frames_value():
+
+    frames = synthetic_cx2_frames(n_cycles=12, points_per_cycle=20, n_files=3, seed=0)
+    assert list(frames) == [0, 1, 2]
+    assert all(set(CX2_COLUMNS) <= set(df.columns) for df in frames.values())
+
+    df_capacity = capacity(concat_df(frames))
+    assert df_capacity['Cycle_Index'].max() == 12
+    per_cycle = df_capacity.groupby('Cycle_Index')['charge_cycle_ah'].max()
+    np.testing.assert_allclose(per_cycle, capacity_fade(12))
+
+    with pytest.raises(TypeError):
+        synthetic_cx2_frames(n_cycles=2, n_files=3)
+
+    return
+
+###########################################################################
+####################### Tests for the synthetic files #####################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_write_files_BadIn(tmpdir):
+
+    with pytest.raises(TypeError):
+        write_pl_files(123)
+
+    with pytest.raises(FileNotFoundError):
+        write_pl_files(str(tmpdir.join('abc')))
+
+    with pytest.raises(ValueError):
+        write_pl_files(str(tmpdir), cell_name='PL100')
+
+    with pytest.raises(ValueError):
+        write_cx2_files(str(tmpdir), cell_name='AB1_1')
+
+    with pytest.raises(ValueError):
+        write_cx2_files(str(tmpdir), n_cycles=1000, points_per_cycle=2000)
+
+    return
+
+
+# The files should be read back like the bundled files
+def test_write_files_value(tmpdir):
+
+    file_name_format = write_pl_files(str(tmpdir), n_cycles=8, points_per_cycle=30,
+                                      n_files=3, seed=0)
+    assert file_name_format == 'PL99(1).csv'
+    df_pl = pl_samples_file_reader(str(tmpdir), file_name_format, [])
+    df_expected = get_cycle_capacities(concat_dict_dataframes(
+        synthetic_pl_frames(8, 30, 3, seed=0)))
+    np.testing.assert_allclose(df_pl['discharge_cycle_ah'], df_expected['discharge_cycle_ah'])
+    assert df_pl['Cycle'].max() == 8
+
+    pytest.importorskip('openpyxl')
+    cell_name = write_cx2_files(str(tmpdir), n_cycles=6, points_per_cycle=20,
+                                n_files=2, seed=0)
+    assert sorted(os.listdir(str(tmpdir.join(cell_name)))) == [
+        'CX2_99_1_30_12.xlsx', 'CX2_99_1_31_12.xlsx']
+    df_cx2 = cx2_file_reader(str(tmpdir), cell_name, 1)
+    assert len(df_cx2) == 6 * 20
+    np.testing.assert_allclose(df_cx2.groupby('Cycle_Index')['charge_cycle_ah'].max(),
+                               capacity_fade(6))
+
+    return
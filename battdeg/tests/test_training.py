@@ -0,0 +1,108 @@
+import pandas as pd
+import numpy as np
+import os, sys
+import pytest # automatic test finder and test runner
+
+# To import files from the parent directory
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import WindowSequence
+from battdeg import sequence_training
+from battdeg import supervised_arrays
+from battdeg import CellStore
+
+
+def _cell_data(n_rows, seed=0):
+    rng = np.random.RandomState(seed)
+    return pd.DataFrame({
+        'Cycle_Index': np.repeat(np.arange(1, n_rows // 10 + 2), 10)[:n_rows],
+        'Current(A)': rng.uniform(-1, 1, n_rows),
+        'Voltage(V)': rng.uniform(3, 4.2, n_rows),
+        'discharge_cycle_ah': rng.uniform(0, 1, n_rows)})
+
+
+def _features(df_data):
+    return df_data[['Current(A)', 'Voltage(V)', 'discharge_cycle_ah']].values.astype(np.float32)
+
+###########################################################################
+####################### Tests for `WindowSequence` ########################
+###########################################################################
+
+# The wrong type input should raise a TypeError
+def test_WindowSequence_BadIn():
+
+    with pytest.raises(TypeError):
+        WindowSequence('abc')
+
+    with pytest.raises(TypeError):
+        WindowSequence(np.zeros(10))
+
+    with pytest.raises(TypeError):
+        WindowSequence(np.zeros((10, 3)), batch_size=0)
+
+    with pytest.raises(Exception):
+        WindowSequence(pd.DataFrame({'abc': [1., 2.]}))
+
+    return
+
+
+# The batches should hold the windows of 'supervised_arrays'
+def test_WindowSequence_value(tmpdir):
+
+    df_data = _cell_data(103)
+    features = _features(df_data)
+    store = CellStore.write(str(tmpdir.join('cell')), df_data)
+
+    for source in [features, df_data, store]:
+        for n_in, n_out in [(1, 1), (4, 3)]:
+            sequence = WindowSequence(source, n_in=n_in, n_out=n_out, batch_size=16)
+            x_expected, y_expected = supervised_arrays(features, n_in, n_out)
+            assert len(sequence) == int(np.ceil(len(x_expected) / 16.))
+            x_batches, y_batches = zip(*[sequence[i] for i in range(len(sequence))])
+            assert np.array_equal(np.concatenate(x_batches), x_expected)
+            assert np.array_equal(np.concatenate(y_batches), y_expected)
+
+    return
+
+
+# The windows should not span two cells and the split should use every batch once
+def test_WindowSequence_cells():
+
+    cells = [_features(_cell_data(50, seed)) for seed in range(3)]
+    sequence = WindowSequence(cells, n_in=3, batch_size=8, shuffle=True, seed=1)
+    assert sequence.batches == sequence.all_batches()
+    x_all = np.concatenate([sequence[i][0] for i in range(len(sequence))])
+    assert len(x_all) == 3 * 47
+
+    x_expected = np.concatenate([supervised_arrays(cell, 3)[0] for cell in cells])
+    assert sorted(map(bytes, x_all)) == sorted(map(bytes, x_expected))
+
+    train, test = sequence.split_batches(0.25, seed=0)
+    assert len(test) == round(0.25 * len(sequence.batches))
+    assert sorted(train + test) == sorted(sequence.batches)
+    assert len(sequence.subset(test)) == len(test)
+
+    return
+
+###########################################################################
+####################### Tests for `sequence_training` #####################
+###########################################################################
+
+# The model should be trained and tested on the batches of the cells
+def test_sequence_training_value(tmpdir):
+
+    df_data = _cell_data(200)
+    store = CellStore.write(str(tmpdir.join('cell')), df_data)
+    model_loss, y_hat, model = sequence_training(
+        [store, df_data], n_in=2, n_out=3, batch_size=20, epochs=2,
+        validation_split=0.2, workers=2)
+
+    assert len(model_loss['loss']) == 2
+    assert len(model_loss['val_loss']) == 2
+    assert y_hat.shape[1] == 3
+    assert y_hat.shape[0] == 4 * 20
+
+    with pytest.raises(ValueError):
+        sequence_training(df_data[:5], batch_size=20, epochs=1)
+
+    return
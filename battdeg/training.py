@@ -0,0 +1,276 @@
+"""
+This module trains the LSTM model on data which does not fit in memory. The
+input windows are built batch by batch from the feature columns of the cells,
+which can be memory-mapped CellStore columns, and fed to keras through a
+keras sequence. Keras prefetches the next batches in background workers
+while the model trains on the current one, and every batch only reads the
+rows of its own windows.
+"""
+
+import copy
+import re
+import numpy as np
+import pandas as pd
+
+from .battdeg import _build_lstm, _check_window, _windows
+from .store import CellStore
+
+# Regular expression of the feature columns, as in 'data_formatting'
+_FEATURE_REGEX = 'Current|Voltage|discharge_cycle_ah'
+
+
+# Subclass of 'keras.utils.Sequence' built on first use by 'keras_sequence'
+_KERAS_SEQUENCE = None
+
+
+class WindowSequence(object):
+    """
+    Sequence of the batches of input windows and targets of one or several
+    cells, as framed by 'supervised_arrays'. The windows of a cell never
+    include points of another cell. 'keras_sequence' returns the keras
+    sequence to pass to the training and prediction functions of a model.
+
+    Args:
+        sources: Data of a cell or list of the data of several cells. The
+        data of a cell is a CellStore, a dataframe with the current, voltage
+        and discharge capacity columns or an array of shape [samples,
+        features] whose last feature is the target, e.g. a numpy.memmap.
+        n_in (int): Number of lag observations as input.
+        n_out (int): Number of future values of the target as output.
+        batch_size (int): Number of windows in a batch.
+        batches (list): The (cell, first window, window after the last)
+        tuples of the batches to use, e.g. from 'split_batches'. Defaults to
+        all the batches of the cells.
+        shuffle (bool): Whether to shuffle the order of the batches after
+        every epoch. The windows of a batch stay next to each other, so that
+        the rows of a batch are read in one go.
+        seed (int): Seed of the shuffling.
+    """
+
+    def __init__(self, sources, n_in=1, n_out=1, batch_size=72, batches=None,
+                 shuffle=False, seed=None):
+        _check_window(n_in, n_out)
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise TypeError('batch_size should be a positive integer')
+
+        if not isinstance(sources, list):
+            sources = [sources]
+        self.columns = [_feature_columns(source) for source in sources]
+        self.n_in = n_in
+        self.n_out = n_out
+        self.batch_size = batch_size
+        if batches is None:
+            batches = self.all_batches()
+        self.batches = list(batches)
+        self.shuffle = shuffle
+        self._random = np.random.RandomState(seed)
+        self._order = np.arange(len(self.batches))
+        if shuffle:
+            self._random.shuffle(self._order)
+
+    def all_batches(self):
+        """
+        This function returns the (cell, first window, window after the last)
+        tuples of all the batches of the cells.
+        """
+        batches = []
+        for cell, columns in enumerate(self.columns):
+            n_windows = max(len(columns[0]) - self.n_in - self.n_out + 1, 0)
+            batches += [(cell, start, min(start + self.batch_size, n_windows))
+                        for start in range(0, n_windows, self.batch_size)]
+        return batches
+
+    def split_batches(self, validation_split=0.2, seed=None):
+        """
+        This function splits the batches at random into training and
+        validation batches.
+
+        Args:
+            validation_split (float): Fraction of the batches used for
+            validation.
+            seed (int): Seed of the random split.
+
+        Returns:
+            The lists of the training batches and of the validation batches.
+        """
+        order = np.random.RandomState(seed).permutation(len(self.batches))
+        n_validation = int(round(validation_split * len(self.batches)))
+        validation = set(order[len(order) - n_validation:])
+        train = [batch for i, batch in enumerate(self.batches)
+                 if i not in validation]
+        test = [batch for i, batch in enumerate(self.batches)
+                if i in validation]
+        return train, test
+
+    def subset(self, batches, shuffle=False, seed=None):
+        """
+        This function returns a sequence of the same cells with other batches,
+        e.g. the training or validation batches of 'split_batches'.
+        """
+        sequence = copy.copy(self)
+        sequence.batches = list(batches)
+        sequence.shuffle = shuffle
+        sequence._random = np.random.RandomState(seed)
+        sequence._order = np.arange(len(sequence.batches))
+        if shuffle:
+            sequence._random.shuffle(sequence._order)
+        return sequence
+
+    def __len__(self):
+        return len(self.batches)
+
+    def __getitem__(self, index):
+        cell, start, stop = self.batches[self._order[index]]
+        length = self.n_in + self.n_out
+        # Only the rows of the windows of the batch are read
+        block = np.empty((stop - start + length - 1, len(self.columns[cell])),
+                         dtype=np.float32)
+        for i, column in enumerate(self.columns[cell]):
+            block[:, i] = column[start:stop + length - 1]
+        windows = _windows(block, length)
+        x_batch = np.ascontiguousarray(windows[:, :self.n_in, :])
+        if self.n_out == 1:
+            y_batch = np.ascontiguousarray(windows[:, self.n_in, -1])
+        else:
+            y_batch = np.ascontiguousarray(windows[:, self.n_in:, -1])
+        return x_batch, y_batch
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self._random.shuffle(self._order)
+
+    def keras_sequence(self, workers=1, max_queue_size=10):
+        """
+        This function returns this sequence as a 'keras.utils.Sequence'.
+        keras is only imported by this function, so that the batches can be
+        built without it.
+
+        Args:
+            workers (int): Number of threads preparing the batches, for the
+            versions of keras where the sequence holds this setting. These
+            versions only prepare the batches in advance with 2 or more
+            workers.
+            max_queue_size (int): Number of batches prepared in advance, for
+            the versions of keras where the sequence holds this setting.
+
+        Returns:
+            The keras sequence reading its batches from this sequence.
+        """
+        global _KERAS_SEQUENCE
+        if _KERAS_SEQUENCE is None:
+            _KERAS_SEQUENCE = _keras_sequence_class()
+        return _KERAS_SEQUENCE(self, workers, max_queue_size)
+
+
+def sequence_training(sources, n_in=1, n_out=1, batch_size=72, epochs=50,
+                      validation_split=0.2, seed=944, workers=2,
+                      max_queue_size=10):
+    """
+    This function trains and tests the LSTM model of 'long_short_term_memory'
+    with batches built on the fly, so that the data of the cells does not need
+    to fit in memory.
+
+    Args:
+        sources: Data of a cell or list of the data of several cells, see
+        'WindowSequence'. CellStore data is read from the disk batch by batch.
+        n_in (int): Number of lag observations as input.
+        n_out (int): Number of future values of the target as output.
+        batch_size (int): Number of windows in a batch.
+        epochs (int): Number of epochs of training.
+        validation_split (float): Fraction of the batches used for testing.
+        seed (int): Seed of the split of the batches and of their order.
+        workers (int): Number of threads preparing the batches in advance,
+        while the model trains on the previous batches. keras 3 only
+        prepares the batches in advance with 2 or more workers, with 1 worker
+        every batch is read when the model needs it.
+        max_queue_size (int): Number of batches prepared in advance.
+
+    Returns:
+        model_loss(dictionary): Returns the history dictionary.
+        y_hat(array): Predicted response for the testing batches.
+        model: The trained model.
+    """
+    sequence = WindowSequence(sources, n_in=n_in, n_out=n_out,
+                              batch_size=batch_size)
+    train_batches, test_batches = sequence.split_batches(validation_split,
+                                                         seed=seed)
+    if not train_batches or not test_batches:
+        raise ValueError('not enough data for a training and a testing batch')
+    train_sequence = sequence.subset(
+        train_batches, shuffle=True, seed=seed).keras_sequence(
+            workers, max_queue_size)
+    test_sequence = sequence.subset(test_batches).keras_sequence(
+        workers, max_queue_size)
+
+    model = _build_lstm(n_in, len(sequence.columns[0]), n_out)
+    if hasattr(model, 'fit_generator'):
+        # The older keras API takes the prefetching settings when fitting
+        history = model.fit_generator(
+            train_sequence, epochs=epochs, validation_data=test_sequence,
+            workers=workers, max_queue_size=max_queue_size, shuffle=False,
+            verbose=0)
+        y_hat = model.predict_generator(test_sequence, workers=workers,
+                                        max_queue_size=max_queue_size)
+    else:
+        history = model.fit(train_sequence, epochs=epochs,
+                            validation_data=test_sequence, shuffle=False,
+                            verbose=0)
+        y_hat = model.predict(test_sequence, verbose=0)
+    return history.history, y_hat, model
+
+
+def _keras_sequence_class():
+    """
+    This function imports keras and defines the keras sequence wrapping a
+    WindowSequence.
+    """
+    from keras.utils import Sequence
+
+    class _KerasWindowSequence(Sequence):
+        """
+        Keras sequence reading its batches from a WindowSequence.
+        """
+
+        def __init__(self, windows, workers=1, max_queue_size=10):
+            try:
+                super(_KerasWindowSequence, self).__init__(
+                    workers=workers, max_queue_size=max_queue_size)
+            except TypeError:
+                # Older keras sequences take no arguments, the workers are
+                # given to 'fit_generator' instead
+                super(_KerasWindowSequence, self).__init__()
+            self.windows = windows
+
+        def __len__(self):
+            return len(self.windows)
+
+        def __getitem__(self, index):
+            return self.windows[index]
+
+        def on_epoch_end(self):
+            self.windows.on_epoch_end()
+
+    return _KerasWindowSequence
+
+
+def _feature_columns(source):
+    """
+    This function returns the feature columns of the data of a cell as a
+    list of 1-D arrays, without copying the data.
+    """
+    if isinstance(source, CellStore):
+        names = [col for col in source.columns if re.search(_FEATURE_REGEX, col)]
+        columns = [source[col] for col in names]
+    elif isinstance(source, pd.DataFrame):
+        names = [col for col in source.columns
+                 if re.search(_FEATURE_REGEX, str(col))]
+        columns = [source[col].values for col in names]
+    elif isinstance(source, np.ndarray) and source.ndim == 2:
+        columns = [source[:, i] for i in range(source.shape[1])]
+    else:
+        raise TypeError('the data of a cell should be a CellStore, a pandas '
+                        'dataframe or a 2-D array')
+    if not columns:
+        raise Exception("the dataframe doesnt have the columns 'Current', " +
+                        "'Voltage', 'discharge_cycle_ah'")
+    return columns
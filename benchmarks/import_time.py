@@ -0,0 +1,85 @@
+"""
+Benchmark of the time and memory taken by 'import battdeg'. Reading and
+processing the cycling data does not need keras, tensorflow or scikit-learn,
+which are only imported when a model is trained or used for prediction. The
+import of the package is timed in fresh interpreters, and the benchmark fails
+if one of the machine learning libraries is imported with it.
+
+Usage:
+    python benchmarks/import_time.py [--repeat 5] [--max-seconds S]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Libraries which should only be imported on first use of the models
+ML_MODULES = ['keras', 'tensorflow', 'sklearn']
+
+# Statements timed in a fresh interpreter, the first one being the package
+STATEMENTS = [
+    ('import battdeg', 'import battdeg'),
+    ('ML stack', 'import battdeg; from battdeg.battdeg import _build_lstm; '
+                 '_build_lstm(1, 3, 1)'),
+]
+
+_CHILD = '''
+import json, resource, sys, time
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.
+print(json.dumps({{'seconds': seconds, 'max_rss_mb': rss_mb,
+                  'ml_modules': [m for m in {ml_modules!r} if m in sys.modules]}}))
+'''
+
+
+def measure(statement):
+    """
+    This function runs a statement in a fresh interpreter and returns its
+    wall time, the peak memory of the interpreter and the machine learning
+    libraries it imported.
+    """
+    code = _CHILD.format(statement=statement, ml_modules=ML_MODULES)
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=base_dir, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='number of fresh interpreters per statement')
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help='fail if importing battdeg takes longer')
+    parser.add_argument('--skip-ml', action='store_true',
+                        help='do not time the import of the ML stack')
+    args = parser.parse_args()
+
+    statements = STATEMENTS[:1] if args.skip_ml else STATEMENTS
+    print('{:>16} {:>10} {:>14}  {}'.format(
+        'statement', 'time (s)', 'max RSS (MB)', 'ML modules imported'))
+    results = {}
+    for name, statement in statements:
+        runs = [measure(statement) for _ in range(args.repeat)]
+        best = min(runs, key=lambda run: run['seconds'])
+        results[name] = best
+        print('{:>16} {:>10.3f} {:>14.1f}  {}'.format(
+            name, best['seconds'], best['max_rss_mb'],
+            ', '.join(best['ml_modules']) or '-'))
+
+    package = results['import battdeg']
+    if package['ml_modules']:
+        sys.exit('import battdeg imported {}'.format(
+            ', '.join(package['ml_modules'])))
+    if args.max_seconds is not None and package['seconds'] > args.max_seconds:
+        sys.exit('import battdeg took {:.3f} s, more than {} s'.format(
+            package['seconds'], args.max_seconds))
+
+
+if __name__ == '__main__':
+    main()
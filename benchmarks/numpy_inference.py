@@ -0,0 +1,120 @@
+"""
+Benchmark of the numpy LSTM inference of 'NumpyLSTM' against the keras
+model used by 'model_prediction'. The cold start is the time taken by a fresh
+interpreter to import battdeg, load the model and predict a few points, and
+the throughput is the number of rows predicted per second by
+'model_prediction' once the model is loaded.
+
+Usage:
+    python benchmarks/numpy_inference.py [--model PATH] [--rows 1000000]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import NumpyLSTM, export_numpy_model, model_prediction  # noqa
+from battdeg.registry import DEFAULT_MODEL_PATH  # noqa
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Statement loading the model in a fresh interpreter, for every engine
+LOADERS = {
+    'keras': 'model = {path!r}',
+    'numpy': 'model = battdeg.NumpyLSTM.load({path!r})',
+}
+
+_CHILD = '''
+import json, time
+start = time.perf_counter()
+import numpy as np, pandas as pd
+import battdeg
+{loader}
+data = pd.DataFrame(np.random.rand(10, 3), columns=['Current(A)',
+                    'Voltage(V)', 'discharge_cycle_ah'])
+battdeg.model_prediction(data, model=model)
+print(json.dumps({{'seconds': time.perf_counter() - start}}))
+'''
+
+
+def input_data(n_rows):
+    """
+    This function returns random formatted data of 'n_rows' points.
+    """
+    rng = np.random.RandomState(0)
+    return pd.DataFrame({'Current(A)': rng.uniform(-2, 2, n_rows),
+                         'Voltage(V)': rng.uniform(2.7, 4.2, n_rows),
+                         'discharge_cycle_ah': rng.uniform(0, 1.1, n_rows)})
+
+
+def cold_start(engine, path):
+    """
+    This function returns the seconds taken by a fresh interpreter to import
+    battdeg, load the model with an engine and predict 10 points.
+    """
+    code = _CHILD.format(loader=LOADERS[engine].format(path=path))
+    output = subprocess.check_output([sys.executable, '-c', code],
+                                     cwd=base_dir, stderr=subprocess.DEVNULL)
+    return json.loads(output.decode().strip().splitlines()[-1])['seconds']
+
+
+def best_time(func, repeat):
+    """
+    This function returns the best wall time out of 'repeat' calls of func.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH,
+                        help='keras HDF5 model file')
+    parser.add_argument('--rows', type=int, default=1000000,
+                        help='number of rows predicted for the throughput')
+    parser.add_argument('--batch-size', type=int, default=4096,
+                        help='number of rows predicted at a time')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='battdeg_bench_')
+    npz_path = export_numpy_model(args.model, os.path.join(tmp_dir, 'model'))
+    data = input_data(args.rows)
+
+    print('{:>8} {:>16} {:>14}'.format('engine', 'cold start (s)',
+                                      'rows/second'))
+    models = {'keras': args.model, 'numpy': NumpyLSTM.load(npz_path)}
+    paths = {'keras': args.model, 'numpy': npz_path}
+    for engine in ['keras', 'numpy']:
+        try:
+            start_time = min(cold_start(engine, paths[engine])
+                             for _ in range(args.repeat))
+            seconds = best_time(
+                lambda: model_prediction(data, model=models[engine],
+                                         batch_size=args.batch_size),
+                args.repeat)
+        except Exception as error:
+            # e.g. a keras version which can not read the model file
+            print('{:>8} failed: {}'.format(engine, type(error).__name__))
+            continue
+        print('{:>8} {:>16.3f} {:>14.0f}'.format(engine, start_time,
+                                                 args.rows / seconds))
+    os.remove(npz_path)
+    os.rmdir(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
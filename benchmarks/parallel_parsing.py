@@ -0,0 +1,103 @@
+"""
+Benchmark of the process-pool file parsing in 'reading_dataframes' and
+'get_dict_files'. The bundled CX2_16 and PL12 files are copied many times
+into a temporary directory to simulate a cell directory with dozens of daily
+files, and the parsing time is measured for 1 to N worker processes.
+
+Usage:
+    python benchmarks/parallel_parsing.py [--copies 24] [--max-workers N]
+"""
+
+import argparse
+import os
+from os.path import join
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from battdeg import get_dict_files  # noqa
+from battdeg import reading_dataframes  # noqa
+
+data_path = join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                 'battdeg', 'data')
+
+
+def make_cx2_dir(tmp_dir, copies):
+    """
+    This function copies the bundled CX2 excel file into 'copies' daily files
+    and returns the sorted list of file names.
+    """
+    source = join(data_path, 'CX2_16', 'CX2_16_2_6_12.xlsx')
+    file_names = []
+    for i in range(copies):
+        # One file per day starting from the 1st of January 2012
+        file_name = 'CX2_16_{}_{}_12.xlsx'.format(1 + i // 28, 1 + i % 28)
+        shutil.copy(source, join(tmp_dir, file_name))
+        file_names.append(file_name)
+    return file_names
+
+
+def make_pl_dir(tmp_dir, copies):
+    """
+    This function copies the bundled PL12 csv file into 'copies' files.
+    """
+    source = join(data_path, 'PL12', 'PL12(2).csv')
+    for i in range(copies):
+        shutil.copy(source, join(tmp_dir, 'PL12({}).csv'.format(i + 1)))
+
+
+def best_time(func, repeat):
+    """
+    This function returns the best wall time out of 'repeat' calls of func.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--copies', type=int, default=24,
+                        help='number of files in the simulated cell directory')
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count(),
+                        help='largest number of worker processes to try')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs per worker count')
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp(prefix='battdeg_bench_')
+    try:
+        cx2_dir = join(tmp_dir, 'CX2_16')
+        pl_dir = join(tmp_dir, 'PL12')
+        os.makedirs(cx2_dir)
+        os.makedirs(pl_dir)
+        file_names = make_cx2_dir(cx2_dir, args.copies)
+        make_pl_dir(pl_dir, args.copies)
+
+        print('{:>8} {:>14} {:>9} {:>14} {:>9}'.format(
+            'workers', 'xlsx time (s)', 'speedup', 'csv time (s)', 'speedup'))
+        base_xlsx = base_csv = None
+        for workers in range(1, args.max_workers + 1):
+            xlsx_time = best_time(
+                lambda: reading_dataframes(file_names, 1, cx2_dir,
+                                           workers=workers), args.repeat)
+            csv_time = best_time(
+                lambda: get_dict_files(pl_dir, 'PL12(1).csv', [],
+                                       workers=workers), args.repeat)
+            if base_xlsx is None:
+                base_xlsx, base_csv = xlsx_time, csv_time
+            print('{:>8} {:>14.3f} {:>8.2f}x {:>14.3f} {:>8.2f}x'.format(
+                workers, xlsx_time, base_xlsx / xlsx_time,
+                csv_time, base_csv / csv_time))
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
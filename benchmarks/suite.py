@@ -0,0 +1,337 @@
+"""
+Benchmark suite of the reading, stitching, capacity, framing and prediction
+functions. Every case runs on the bundled 'battdeg/data' cells (scale 1) and
+on inputs scaled up by repeating the bundled files or sheets (scale N: N
+times as many files or rows). The timings are written to a JSON file with the
+commit and the versions of the libraries, and a previous JSON file can be
+given to compare the medians and flag the regressions.
+
+Usage:
+    python benchmarks/suite.py [--scales 1 8] [--output results.json]
+        [--cases capacity concat_df] [--compare base.json]
+"""
+
+import argparse
+import datetime
+import json
+import os
+from os.path import join
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import battdeg  # noqa
+from battdeg import capacity, concat_df, concat_dict_dataframes  # noqa
+from battdeg import data_formatting, file_name_sorting, file_reader  # noqa
+from battdeg import get_cycle_capacities, get_dict_files  # noqa
+from battdeg import model_prediction, reading_dataframes  # noqa
+from battdeg import series_to_supervised  # noqa
+
+base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+data_path = join(base_dir, 'battdeg', 'data')
+
+# Bundled cells used by the cases
+CX2_CELL = 'CX2_16'
+PL_CELL = 'PL12'
+SHEET_NAME = 1
+
+
+class Inputs(object):
+    """
+    Inputs of the cases at one scale. The files are copied into a temporary
+    directory and the dataframes are computed once, on first use.
+
+    Args:
+        scale (int): Number of times the bundled files are repeated. Scale 1
+        uses the bundled files in place.
+        tmp_dir (string): Directory for the copies of the files.
+    """
+
+    def __init__(self, scale, tmp_dir):
+        self.scale = scale
+        self.tmp_dir = tmp_dir
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def cx2_root(self):
+        """
+        Directory holding the CX2 cell directory, as passed to 'file_reader'.
+        """
+        return self._get('cx2_root', self._copy_cx2)
+
+    @property
+    def pl_dir(self):
+        """
+        Directory of the PL csv files.
+        """
+        return self._get('pl_dir', self._copy_pl)
+
+    @property
+    def cx2_files(self):
+        return file_name_sorting(os.listdir(join(self.cx2_root, CX2_CELL)))
+
+    @property
+    def cx2_sheets(self):
+        """
+        Dictionary of the parsed excel sheets, the input of 'concat_df'.
+        """
+        return self._get('cx2_sheets', lambda: reading_dataframes(
+            self.cx2_files, SHEET_NAME, join(self.cx2_root, CX2_CELL)))
+
+    @property
+    def pl_files(self):
+        """
+        Dictionary of the csv files, the input of 'concat_dict_dataframes'.
+        """
+        return self._get('pl_files', lambda: get_dict_files(
+            self.pl_dir, PL_CELL + '(1).csv', []))
+
+    @property
+    def cx2_concat(self):
+        return self._get('cx2_concat', lambda: concat_df(self.cx2_sheets))
+
+    @property
+    def pl_concat(self):
+        return self._get('pl_concat',
+                         lambda: concat_dict_dataframes(self.pl_files))
+
+    @property
+    def formatted(self):
+        """
+        Current, voltage and discharge capacity, the input of the framing.
+        """
+        return self._get('formatted', lambda: data_formatting(
+            capacity(self.cx2_concat)))
+
+    def _copy_cx2(self):
+        source = join(data_path, CX2_CELL)
+        if self.scale == 1:
+            return data_path
+        root = join(self.tmp_dir, 'cx2')
+        os.makedirs(join(root, CX2_CELL))
+        names = file_name_sorting(os.listdir(source))
+        for i in range(self.scale * len(names)):
+            # One file per day, the dates keep the files in order
+            shutil.copy(join(source, names[i % len(names)]),
+                        join(root, CX2_CELL, '{}_{}_{}_12.xlsx'.format(
+                            CX2_CELL, 1 + i // 28, 1 + i % 28)))
+        return root
+
+    def _copy_pl(self):
+        source = join(data_path, PL_CELL)
+        if self.scale == 1:
+            return source
+        pl_dir = join(self.tmp_dir, 'pl')
+        os.makedirs(pl_dir)
+        n_files = len(os.listdir(source))
+        for i in range(self.scale * n_files):
+            shutil.copy(join(source, '{}({}).csv'.format(PL_CELL,
+                                                        1 + i % n_files)),
+                        join(pl_dir, '{}({}).csv'.format(PL_CELL, i + 1)))
+        return pl_dir
+
+
+# Every case returns the function to time and the number of rows it handles
+
+def case_get_dict_files(inputs, model=None):
+    n_rows = sum(len(df) for df in inputs.pl_files.values())
+    return (lambda: get_dict_files(inputs.pl_dir, PL_CELL + '(1).csv', []),
+            n_rows)
+
+
+def case_reading_dataframes(inputs, model=None):
+    n_rows = sum(len(df) for df in inputs.cx2_sheets.values())
+    path = join(inputs.cx2_root, CX2_CELL)
+    return (lambda: reading_dataframes(inputs.cx2_files, SHEET_NAME, path),
+            n_rows)
+
+
+def case_concat_df(inputs, model=None):
+    return (lambda: concat_df(inputs.cx2_sheets), len(inputs.cx2_concat))
+
+
+def case_concat_dict_dataframes(inputs, model=None):
+    return (lambda: concat_dict_dataframes(inputs.pl_files),
+            len(inputs.pl_concat))
+
+
+def case_capacity(inputs, model=None):
+    return lambda: capacity(inputs.cx2_concat), len(inputs.cx2_concat)
+
+
+def case_get_cycle_capacities(inputs, model=None):
+    return (lambda: get_cycle_capacities(inputs.pl_concat),
+            len(inputs.pl_concat))
+
+
+def case_series_to_supervised(inputs, model=None):
+    return (lambda: series_to_supervised(inputs.formatted),
+            len(inputs.formatted))
+
+
+def case_model_prediction(inputs, model=None):
+    # The model is loaded once, before the timed runs
+    model = battdeg.model_registry.resolve(model)
+    return (lambda: model_prediction(inputs.formatted, model=model),
+            len(inputs.formatted))
+
+
+def case_file_reader_cx2(inputs, model=None):
+    return (lambda: file_reader(inputs.cx2_root, CX2_CELL, SHEET_NAME, []),
+            len(inputs.cx2_concat))
+
+
+def case_file_reader_pl(inputs, model=None):
+    return (lambda: file_reader(inputs.pl_dir, PL_CELL + '(1).csv',
+                                SHEET_NAME, []),
+            len(inputs.pl_concat))
+
+
+CASES = [
+    ('get_dict_files', case_get_dict_files),
+    ('reading_dataframes', case_reading_dataframes),
+    ('concat_df', case_concat_df),
+    ('concat_dict_dataframes', case_concat_dict_dataframes),
+    ('capacity', case_capacity),
+    ('get_cycle_capacities', case_get_cycle_capacities),
+    ('series_to_supervised', case_series_to_supervised),
+    ('model_prediction', case_model_prediction),
+    ('file_reader_cx2', case_file_reader_cx2),
+    ('file_reader_pl', case_file_reader_pl),
+]
+
+
+def run_case(case, inputs, repeat, model=None):
+    """
+    This function times a case and returns its result, with the error
+    instead of the timings if the case failed.
+    """
+    result = {'case': case[0], 'scale': inputs.scale, 'rows': None,
+              'times': [], 'min': None, 'median': None, 'error': None}
+    try:
+        func, result['rows'] = case[1](inputs, model)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            result['times'].append(time.perf_counter() - start)
+    except Exception as error:
+        result['error'] = repr(error)
+        return result
+    result['min'] = min(result['times'])
+    result['median'] = float(np.median(result['times']))
+    return result
+
+
+def metadata():
+    """
+    This function returns the commit and the environment of the run.
+    """
+    try:
+        commit = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=base_dir,
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'date': datetime.datetime.now().isoformat(),
+            'battdeg': battdeg.__version__,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()}
+
+
+def compare(results, base_results, threshold):
+    """
+    This function prints the ratio of the median times to the medians of a
+    previous run and returns the number of cases slower than 'threshold'.
+    """
+    base = {(r['case'], r['scale']): r for r in base_results
+            if r['median'] is not None}
+    print('\n{:>24} {:>6} {:>12} {:>12} {:>8}'.format(
+        'case', 'scale', 'base (s)', 'now (s)', 'ratio'))
+    regressions = 0
+    for result in results:
+        previous = base.get((result['case'], result['scale']))
+        if previous is None or result['median'] is None:
+            continue
+        ratio = result['median'] / previous['median']
+        flag = ''
+        if ratio > threshold:
+            regressions += 1
+            flag = '  regression'
+        print('{:>24} {:>6} {:>12.4f} {:>12.4f} {:>7.2f}x{}'.format(
+            result['case'], result['scale'], previous['median'],
+            result['median'], ratio, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 8],
+                        help='numbers of times the bundled files are repeated')
+    parser.add_argument('--cases', nargs='+', default=None,
+                        choices=[name for name, _ in CASES],
+                        help='cases to run, all by default')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of timed runs per case')
+    parser.add_argument('--model', default=None,
+                        help='model file for model_prediction, defaults to '
+                             'the shipped model')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='JSON file the results are written to')
+    parser.add_argument('--compare', default=None,
+                        help='JSON file of a previous run to compare with')
+    parser.add_argument('--threshold', type=float, default=1.2,
+                        help='ratio of the medians flagged as a regression')
+    args = parser.parse_args()
+
+    cases = [case for case in CASES
+             if args.cases is None or case[0] in args.cases]
+    results = []
+    print('{:>24} {:>6} {:>10} {:>12} {:>12}'.format(
+        'case', 'scale', 'rows', 'median (s)', 'rows/second'))
+    for scale in args.scales:
+        tmp_dir = tempfile.mkdtemp(prefix='battdeg_bench_')
+        try:
+            inputs = Inputs(scale, tmp_dir)
+            for case in cases:
+                result = run_case(case, inputs, args.repeat, args.model)
+                results.append(result)
+                if result['error'] is not None:
+                    print('{:>24} {:>6} failed: {}'.format(
+                        case[0], scale, result['error'][:60]))
+                    continue
+                print('{:>24} {:>6} {:>10} {:>12.4f} {:>12.0f}'.format(
+                    case[0], scale, result['rows'], result['median'],
+                    result['rows'] / result['median']))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    with open(args.output, 'w') as output_file:
+        json.dump({'metadata': metadata(), 'results': results}, output_file,
+                  indent=2)
+    print('\nResults written to {}'.format(args.output))
+
+    if args.compare is not None:
+        with open(args.compare) as base_file:
+            base_results = json.load(base_file)['results']
+        if compare(results, base_results, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()